@@ -0,0 +1,90 @@
+# ann_recall.py
+"""
+Recall-vs-exact report for the IVF index.
+
+For each synthetic gallery size it measures recall@1 against exact search
+and the mean per-query latency over a grid of nprobe values, and prints a
+Markdown table that can be used to choose Config.ANN_NLIST / ANN_NPROBE.
+
+Usage:
+    python -m benchmarks.ann_recall --sizes 10000 100000 --output docs/ann_recall.md
+"""
+import time
+import argparse
+import numpy as np
+from core.ann_index import IVFIndex, top_k_indices
+from benchmarks.synthetic import synthetic_embeddings, synthetic_queries
+
+
+def exact_search(matrix, query):
+    distances = 1.0 - matrix @ query
+    return top_k_indices(distances, 1)[0]
+
+
+def measure(size, nprobes, nlist=None, queries=500):
+    """
+    Builds an index over a synthetic gallery and measures it.
+
+    Args:
+        size (int): Gallery size
+        nprobes (list): nprobe values to evaluate
+        nlist (int, optional): Number of cells; defaults to about 4 * sqrt(size)
+        queries (int): Number of probe queries
+
+    Returns:
+        list: Markdown table rows
+    """
+    gallery = synthetic_embeddings(size)
+    probes, _ = synthetic_queries(gallery, queries)
+
+    index = IVFIndex(nlist=nlist)
+    start = time.perf_counter()
+    index.build(gallery)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact = [exact_search(gallery, query) for query in probes]
+    exact_ms = (time.perf_counter() - start) / queries * 1000
+
+    rows = [f"| {size} | {index.nlist} | exact | 1.000 | {exact_ms:.3f} | 1.0x | {build_seconds:.1f} |"]
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            continue
+        start = time.perf_counter()
+        found = [index.search(gallery, query, k=1, nprobe=nprobe)[0][0] for query in probes]
+        ann_ms = (time.perf_counter() - start) / queries * 1000
+        recall = np.mean(np.array(found) == np.array(exact))
+        rows.append(
+            f"| {size} | {index.nlist} | {nprobe} | {recall:.3f} | {ann_ms:.3f} | "
+            f"{exact_ms / ann_ms:.1f}x | |"
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF recall-vs-exact report")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--output", help="Also write the table to this Markdown file")
+    args = parser.parse_args()
+
+    lines = [
+        "| Gallery size | nlist | nprobe | Recall@1 | ms/query | Speed-up | Build (s) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for size in args.sizes:
+        lines.extend(measure(size, args.nprobe, nlist=args.nlist, queries=args.queries))
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write("# IVF recall vs exact search\n\n")
+            f.write("Generated by `python -m benchmarks.ann_recall` on synthetic 128-d galleries.\n\n")
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench_batch_embedding.py
+"""
+Embedding throughput for batch sizes 1 to 64, comparing one
+DeepFace.represent call per face (the old per-face path) with
+BatchEmbedder's single forward pass per batch.
+
+Requires DeepFace and the Facenet weights. Faces are aligned crops from
+sample_images/ (repeated to fill the batch), so no camera is needed.
+Force CPU execution with CUDA_VISIBLE_DEVICES="".
+
+Usage:
+    python -m benchmarks.bench_batch_embedding --repeats 5
+"""
+import os
+import glob
+import time
+import argparse
+import cv2
+from deepface import DeepFace
+from core.embedding import BatchEmbedder
+from core.face_detector import face_to_bgr
+
+
+def load_faces(directory="sample_images"):
+    faces = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jpg"))):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        for face in DeepFace.extract_faces(img_path=image, enforce_detection=False):
+            faces.append(face["face"])
+    return faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched embedding throughput")
+    parser.add_argument("--model", default="Facenet")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    faces = load_faces()
+    if not faces:
+        raise SystemExit("No faces found in sample_images/")
+
+    embedder = BatchEmbedder(args.model, max_batch_size=max(args.batch_sizes))
+    embedder.embed(faces[:1])  # Build the model and trace the graph once
+
+    print(f"{'batch':>5}  {'per-face represent':>20}  {'batched':>14}  {'speed-up':>8}")
+    for batch_size in args.batch_sizes:
+        batch = [faces[i % len(faces)] for i in range(batch_size)]
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            for face in batch:
+                DeepFace.represent(
+                    img_path=face_to_bgr(face),
+                    model_name=args.model,
+                    detector_backend="skip",
+                    enforce_detection=False
+                )
+        single_rate = batch_size * args.repeats / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            embedder.embed(batch)
+        batch_rate = batch_size * args.repeats / (time.perf_counter() - start)
+
+        print(
+            f"{batch_size:>5}  {single_rate:>14.1f} faces/s  {batch_rate:>8.1f} faces/s  "
+            f"{batch_rate / single_rate:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# bench_db_connections.py
+"""
+Per-call overhead of the database lookups done on every analysis tick,
+before (a new sqlite3 connection per call, as RecognitionManager used to do)
+and after (ConnectionManager's persistent per-thread WAL connections).
+
+It also measures reader latency while another thread keeps enrolling faces,
+to show that readers do not block behind writes.
+
+Usage:
+    python -m benchmarks.bench_db_connections --faces 5000 --calls 5000
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+import numpy as np
+from utils.utils import serialize_embedding_blob
+from utils.database_utils import ConnectionManager
+
+SELECT_PERSON_SQL = "SELECT name, gender, age, ethnicity FROM faces WHERE name = ?"
+INSERT_FACE_SQL = "INSERT INTO faces (name, gender, age, ethnicity, embedding) VALUES (?, ?, ?, ?, ?)"
+
+
+def create_database(db_path, faces):
+    rng = np.random.default_rng(0)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE faces (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                gender TEXT,
+                age INTEGER,
+                ethnicity TEXT,
+                embedding BLOB NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX idx_faces_name ON faces (name)")
+        conn.executemany(
+            INSERT_FACE_SQL,
+            [(f"person_{i}", "Male", 30, "White", serialize_embedding_blob(rng.normal(size=128))) for i in range(faces)]
+        )
+
+
+def lookup_per_call_connection(db_path, name):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(SELECT_PERSON_SQL, (name,))
+        return cursor.fetchone()
+
+
+def lookup_persistent(manager, name):
+    return manager.connection().execute(SELECT_PERSON_SQL, (name,)).fetchone()
+
+
+def time_calls(lookup, names):
+    latencies = np.empty(len(names))
+    for i, name in enumerate(names):
+        start = time.perf_counter()
+        lookup(name)
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6
+
+
+def time_calls_during_writes(lookup, names, write):
+    """Reader latencies while a second thread keeps inserting rows"""
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            write(i)
+            i += 1
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        return time_calls(lookup, names)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def report(label, latencies):
+    print(
+        f"{label:<44} mean {latencies.mean():8.1f} us   p50 {np.percentile(latencies, 50):8.1f} us   "
+        f"p99 {np.percentile(latencies, 99):8.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite connection overhead benchmark")
+    parser.add_argument("--faces", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    embedding_blob = serialize_embedding_blob(rng.normal(size=128))
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "legacy.db")
+        managed_path = os.path.join(directory, "managed.db")
+        create_database(legacy_path, args.faces)
+        create_database(managed_path, args.faces)
+        names = [f"person_{i}" for i in rng.integers(args.faces, size=args.calls)]
+
+        manager = ConnectionManager(managed_path)
+        writer_manager = ConnectionManager(managed_path)
+
+        def legacy_write(i):
+            with sqlite3.connect(legacy_path) as conn:
+                conn.execute(INSERT_FACE_SQL, (f"new_{i}", None, None, None, embedding_blob))
+
+        def managed_write(i):
+            with writer_manager.write() as conn:
+                conn.execute(INSERT_FACE_SQL, (f"new_{i}", None, None, None, embedding_blob))
+
+        report("get_person_details, connection per call", time_calls(lambda n: lookup_per_call_connection(legacy_path, n), names))
+        report("get_person_details, persistent WAL", time_calls(lambda n: lookup_persistent(manager, n), names))
+        report(
+            "  ...during enrollment writes, per call",
+            time_calls_during_writes(lambda n: lookup_per_call_connection(legacy_path, n), names, legacy_write)
+        )
+        report(
+            "  ...during enrollment writes, persistent WAL",
+            time_calls_during_writes(lambda n: lookup_persistent(manager, n), names, managed_write)
+        )
+
+        manager.close_all()
+        writer_manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
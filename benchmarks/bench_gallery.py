@@ -0,0 +1,285 @@
+# bench_gallery.py
+"""
+Gallery benchmark suite on synthetic galleries.
+
+For each gallery size it generates a face database offline (synthetic
+128-d embeddings, no models needed) and measures:
+
+- match latency: RecognitionManager.match_embedding, i.e. recognize_face
+  without the embedding model forward pass
+- serialize/deserialize throughput of the legacy JSON/base64 format
+  (serialize_embedding / deserialize_embedding) and of the BLOB format
+- DB load time: building the gallery from the database, per backend
+- memory: bytes held by the loaded gallery and the peak while loading
+
+Results are written as JSON with the git commit, so runs on two commits can
+be compared with --baseline.
+
+Usage:
+    python -m benchmarks.bench_gallery --sizes 1000 10000 100000 1000000 --workdir /tmp/galleries
+    python -m benchmarks.bench_gallery --sizes 1000 10000 --baseline benchmarks/results/gallery-abc1234.json
+"""
+import os
+import gc
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+from config import Config
+from core.recognition_manager import RecognitionManager, INSERT_FACE_SQL
+from utils.utils import (
+    serialize_embedding,
+    deserialize_embedding,
+    serialize_embedding_blob,
+    deserialize_embedding_blob
+)
+from utils.database_utils import set_embedding_metadata, fetch_faces_by_id
+from benchmarks.synthetic import synthetic_embeddings, synthetic_queries
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_commit():
+    """Returns the current commit hash (with a -dirty suffix for uncommitted changes), or None"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], stderr=subprocess.DEVNULL) != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(samples):
+    samples = np.asarray(samples)
+    return {
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+        'mean': float(samples.mean()),
+    }
+
+
+def create_database(db_path, size, chunk_size=50000):
+    """
+    Writes a face database with `size` synthetic identities, unless one
+    with that many rows already exists at db_path.
+    """
+    manager = RecognitionManager(db_path)
+    try:
+        count = manager.db.connection().execute("SELECT COUNT(*) FROM faces").fetchone()[0]
+        if count == size:
+            return
+        embeddings = synthetic_embeddings(size)
+        with manager.db.write() as conn:
+            conn.execute("DELETE FROM faces")
+            for start in range(0, size, chunk_size):
+                conn.executemany(INSERT_FACE_SQL, (
+                    (f"person_{i}", "Male", 30, "White", serialize_embedding_blob(embeddings[i]))
+                    for i in range(start, min(start + chunk_size, size))
+                ))
+            set_embedding_metadata(conn, manager.model_name, embeddings.shape[1])
+    finally:
+        manager.close()
+
+
+def load_queries(manager, count, seed=1):
+    """
+    Probe embeddings: noisy re-captures of random enrolled faces, read back
+    from the database so the full gallery need not be regenerated.
+    """
+    ids = [row[0] for row in manager.db.connection().execute("SELECT id FROM faces")]
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(ids, size=min(count, len(ids)), replace=False).tolist()
+    stored = np.stack([deserialize_embedding_blob(row[2]) for row in fetch_faces_by_id(manager.db.connection(), sample)])
+    queries, _ = synthetic_queries(stored, count, seed=seed)
+    return queries
+
+
+def measure_load(db_path, backend):
+    """
+    Loads the gallery the way the application does on its first match.
+
+    Returns:
+        tuple: (RecognitionManager with the loaded gallery, seconds)
+    """
+    manager = RecognitionManager(db_path, gallery_backend=backend)
+    start = time.perf_counter()
+    manager.gallery
+    return manager, time.perf_counter() - start
+
+
+def measure_memory(db_path, backend):
+    """
+    Returns:
+        dict: Heap bytes held by the loaded gallery and the peak during loading.
+              Memory-mapped snapshots are page cache, not heap, so they are not counted.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        manager = RecognitionManager(db_path, gallery_backend=backend)
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        manager.gallery
+        current, peak = tracemalloc.get_traced_memory()
+        manager.close()
+    finally:
+        tracemalloc.stop()
+    return {'gallery_bytes': current - baseline, 'load_peak_bytes': peak - baseline}
+
+
+def measure_matching(manager, queries):
+    """Per-query match latency in microseconds"""
+    manager.match_embedding(queries[0])  # First call checks for database changes
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        manager.match_embedding(query)
+        latencies[i] = time.perf_counter() - start
+    return percentiles(latencies * 1e6)
+
+
+def measure_serialization(embeddings):
+    """Embeddings per second for each storage format"""
+    def rate(function, items):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        return len(items) / (time.perf_counter() - start)
+
+    # Embeddings come back from the model as float64
+    embeddings = [embedding.astype(np.float64) for embedding in embeddings]
+    json_strings = [serialize_embedding(embedding) for embedding in embeddings]
+    blobs = [serialize_embedding_blob(embedding) for embedding in embeddings]
+    return {
+        'json_serialize_per_s': rate(serialize_embedding, embeddings),
+        'json_deserialize_per_s': rate(deserialize_embedding, json_strings),
+        'blob_serialize_per_s': rate(serialize_embedding_blob, embeddings),
+        'blob_deserialize_per_s': rate(deserialize_embedding_blob, blobs),
+    }
+
+
+def run_size(size, workdir, backends, queries, serialization_samples):
+    db_path = os.path.join(workdir, f"gallery_{size}.db")
+    start = time.perf_counter()
+    create_database(db_path, size)
+    result = {'size': size, 'create_seconds': time.perf_counter() - start, 'backends': {}}
+
+    probes = None
+    for backend in backends:
+        manager, load_seconds = measure_load(db_path, backend)
+        try:
+            if probes is None:
+                probes = load_queries(manager, queries)
+            match_us = measure_matching(manager, probes)
+        finally:
+            manager.close()
+            del manager
+        result['backends'][backend] = {
+            'load_seconds': load_seconds,
+            'match_us': match_us,
+            **measure_memory(db_path, backend),
+        }
+
+    sample = synthetic_embeddings(min(size, serialization_samples), seed=2)
+    result['serialization'] = measure_serialization(sample)
+    return result
+
+
+def flatten(result, prefix=""):
+    """Flattens nested result dicts into {"a.b.c": number}"""
+    flat = {}
+    for key, value in result.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline):
+    """
+    Prints the relative change of every metric present in both reports.
+    Times and bytes are better when lower, *_per_s rates when higher.
+    """
+    baseline_by_size = {result['size']: flatten(result) for result in baseline['results']}
+    print(f"\nChange vs {baseline.get('commit')}:")
+    for result in current['results']:
+        old = baseline_by_size.get(result['size'])
+        if old is None:
+            continue
+        for name, value in flatten(result).items():
+            if name == 'size' or name == 'create_seconds' or not old.get(name):
+                continue
+            change = (value - old[name]) / old[name] * 100
+            print(f"  {result['size']:>8} {name:<45} {old[name]:>14.3f} -> {value:>14.3f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallery matching, serialization, load time and memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--backends", nargs="+", default=["memory", "memmap"], choices=["memory", "memmap"])
+    parser.add_argument("--queries", type=int, default=1000, help="Match queries per gallery")
+    parser.add_argument("--serialization-samples", type=int, default=10000)
+    parser.add_argument("--workdir", help="Keep generated databases here and reuse them (default: temporary)")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/gallery-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    # Matching is measured as configured, but an index build would dominate the load time
+    if Config.ANN_ENABLED:
+        print("Note: ANN_ENABLED is set; load times include building or loading the IVF index")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_gallery_")
+    os.makedirs(workdir, exist_ok=True)
+    commit = git_commit()
+    report = {
+        'benchmark': 'gallery',
+        'commit': commit,
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'ann_enabled': Config.ANN_ENABLED,
+        'results': [],
+    }
+    try:
+        for size in args.sizes:
+            result = run_size(size, workdir, args.backends, args.queries, args.serialization_samples)
+            report['results'].append(result)
+            for backend, stats in result['backends'].items():
+                print(
+                    f"{size:>8} {backend:<7} load {stats['load_seconds']:7.3f}s  "
+                    f"match p50 {stats['match_us']['p50']:9.1f}us p99 {stats['match_us']['p99']:9.1f}us  "
+                    f"heap {stats['gallery_bytes'] / 2**20:8.1f} MiB (peak {stats['load_peak_bytes'] / 2**20:.1f})"
+                )
+            serialization = result['serialization']
+            print(
+                f"{size:>8} serialize/s json {serialization['json_serialize_per_s']:,.0f} "
+                f"blob {serialization['blob_serialize_per_s']:,.0f}  deserialize/s json "
+                f"{serialization['json_deserialize_per_s']:,.0f} blob {serialization['blob_deserialize_per_s']:,.0f}"
+            )
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"gallery-{(commit or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
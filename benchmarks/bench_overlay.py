@@ -0,0 +1,86 @@
+# bench_overlay.py
+"""
+Overlay drawing cost per frame: the per-label draw_text_with_background
+that MainApplication used (a full-frame copy and blend for every line)
+against OverlayRenderer (ROI-only blending, cached text sprites, one
+compositing pass per frame).
+
+Each face gets the 5 stored + 5 predicted lines drawn for a recognized
+person. Only OpenCV and NumPy are needed.
+
+Usage:
+    python -m benchmarks.bench_overlay --faces 1 3 5 --repeats 50
+"""
+import time
+import argparse
+import cv2
+import numpy as np
+from core.overlay_renderer import OverlayRenderer
+
+FONT = cv2.FONT_HERSHEY_DUPLEX
+RESOLUTIONS = {'720p': (720, 1280), '1080p': (1080, 1920)}
+
+
+def legacy_draw_text_with_background(frame, text, position, scale=0.6, color=(255, 255, 0)):
+    """MainApplication.draw_text_with_background before OverlayRenderer"""
+    (text_width, text_height), baseline = cv2.getTextSize(text, FONT, scale, 1)
+    padding = 5
+    bg_rect_pt1 = (position[0], position[1] - text_height - padding)
+    bg_rect_pt2 = (position[0] + text_width + padding, position[1] + padding)
+    overlay = frame.copy()
+    cv2.rectangle(overlay, bg_rect_pt1, bg_rect_pt2, (0, 0, 0), -1)
+    cv2.addWeighted(overlay, 0.5, frame, 0.5, 0, frame)
+    cv2.putText(frame, text, position, FONT, scale, color, 1, cv2.LINE_AA)
+
+
+def face_labels(index, frame_width):
+    """The ten labels drawn for one recognized face, spread across the frame"""
+    x = 200 + index * (frame_width - 400) // 5
+    y = 300
+    stored = ["Stored Data:", f"Name: Person {index}", "Age: 31", "Gender: Male", "Ethnicity: White"]
+    predictions = ["Predictions:", "Age: 30", "Gender: Male (99.12%)", "Race: White", "Emotion: Happy"]
+    labels = []
+    for i, text in enumerate(stored):
+        labels.append((text, (x - 60, y + i * 25), (0, 255, 0)))
+    for i, text in enumerate(predictions):
+        labels.append((text, (x + 60, y + i * 25), (255, 255, 0)))
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlay renderer micro-benchmark")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':>10}  {'faces':>5}  {'legacy ms':>9}  {'renderer ms':>11}  {'speed-up':>8}")
+    for resolution, shape in RESOLUTIONS.items():
+        base = rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+        for faces in args.faces:
+            labels = [label for index in range(faces) for label in face_labels(index, shape[1])]
+
+            frame = base.copy()
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                for text, position, color in labels:
+                    legacy_draw_text_with_background(frame, text, position, color=color)
+            legacy_ms = (time.perf_counter() - start) * 1000 / args.repeats
+
+            renderer = OverlayRenderer(FONT)
+            frame = base.copy()
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                for text, position, color in labels:
+                    renderer.add_text(text, position, color=color)
+                renderer.render(frame)
+            renderer_ms = (time.perf_counter() - start) * 1000 / args.repeats
+
+            print(
+                f"{resolution:>10}  {faces:>5}  {legacy_ms:>9.2f}  {renderer_ms:>11.2f}  "
+                f"{legacy_ms / renderer_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
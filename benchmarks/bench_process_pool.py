@@ -0,0 +1,85 @@
+# bench_process_pool.py
+"""
+Frame throughput of ProcessInferencePool for 1 to N worker processes.
+
+Each worker loads its own embedding and attribute models (DeepFace is
+required). Faces are detected once, up front, in the images in
+sample_images/ resized to one camera resolution; each frame's faces are
+then submitted with every model due, as fast as free ring slots allow, so
+the numbers show how far inference scales with cores, not the camera rate.
+
+Usage:
+    python -m benchmarks.bench_process_pool --max-workers 8 --frames 200
+"""
+import os
+import glob
+import time
+import argparse
+import cv2
+from config import Config
+from core.frame_pipeline import FaceModels
+from core.process_pool import ProcessInferencePool
+
+
+def load_requests(directory="sample_images", size=(640, 480)):
+    """Detects the faces of each image and returns one FaceModels.infer request per image that has any"""
+    from deepface import DeepFace
+
+    requests = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jpg"))):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        faces = DeepFace.extract_faces(
+            cv2.resize(image, size), detector_backend=Config.DETECTOR_BACKEND, enforce_detection=False
+        )
+        if faces:
+            indices = list(range(len(faces)))
+            requests.append((
+                [face['face'] for face in faces],
+                [face['facial_area'] for face in faces],
+                indices,
+                [(tuple(FaceModels.ATTRIBUTE_ACTIONS), indices)]
+            ))
+    return requests
+
+
+def run(pool, requests, count):
+    """Submits `count` frames' faces and returns frames per second once all results are back"""
+    submitted = 0
+    received = 0
+    start = time.perf_counter()
+    while received < count:
+        while submitted < count and pool.submit(*requests[submitted % len(requests)]) is not None:
+            submitted += 1
+        received += len(pool.collect(timeout=0.01))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process-pool inference scaling")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    requests = load_requests()
+    if not requests:
+        raise SystemExit("No faces found in sample_images/")
+
+    print(f"{'workers':>7}  {'frames/s':>9}  {'speed-up':>8}")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        pool = ProcessInferencePool(workers)
+        try:
+            # One frame per worker first, so model loading is not timed
+            run(pool, requests, 2 * workers)
+            rate = run(pool, requests, args.frames)
+        finally:
+            pool.close()
+
+        baseline = baseline or rate
+        print(f"{workers:>7}  {rate:>9.1f}  {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
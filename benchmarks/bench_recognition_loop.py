@@ -0,0 +1,66 @@
+# bench_recognition_loop.py
+"""
+Recognition loop throughput on recorded footage, without a camera.
+
+Frames come from a FrameSource (a video file, an image directory or a
+loopback stream URL), decoded on the source's own thread as fast as the
+loop consumes them, and every frame goes through FramePipeline.process.
+Requires DeepFace and the configured database.
+
+Usage:
+    python -m benchmarks.bench_recognition_loop recording.mp4 --frames 500
+    python -m benchmarks.bench_recognition_loop sample_images --loop --frames 200
+"""
+import time
+import argparse
+import numpy as np
+from config import Config
+from core.frame_source import open_frame_source
+from core.recognition_manager import RecognitionManager
+from core.frame_pipeline import FramePipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognition loop throughput on recorded footage")
+    parser.add_argument("source", help="Video file, image directory or tcp://host:port")
+    parser.add_argument("--frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--loop", action="store_true", help="Restart the source when it ends")
+    parser.add_argument("--realtime", action="store_true", help="Pace frames at the source frame rate")
+    args = parser.parse_args()
+
+    pipeline = FramePipeline(RecognitionManager(Config.DATABASE_PATH, Config.MODEL_NAME))
+    source = open_frame_source(args.source, realtime=args.realtime, loop=args.loop)
+    if not source.isOpened():
+        raise SystemExit(f"Could not open {args.source}")
+
+    ret, frame = source.read()
+    if ret:
+        pipeline.process(frame)  # Build the models outside the timed loop
+
+    latencies = []
+    faces = 0
+    start = time.perf_counter()
+    try:
+        while args.frames is None or len(latencies) < args.frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            frame_start = time.perf_counter()
+            faces += len(pipeline.process(frame))
+            latencies.append(time.perf_counter() - frame_start)
+    finally:
+        source.release()
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        raise SystemExit("No frames read")
+    latencies = np.array(latencies) * 1000
+    print(f"frames: {len(latencies)}  faces: {faces}  fps: {len(latencies) / elapsed:.1f}")
+    print(
+        f"latency ms: p50 {np.percentile(latencies, 50):.1f}  p95 {np.percentile(latencies, 95):.1f}  "
+        f"p99 {np.percentile(latencies, 99):.1f}  max {latencies.max():.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
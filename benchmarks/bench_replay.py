@@ -0,0 +1,250 @@
+# bench_replay.py
+"""
+End-to-end replay of the recognition loop without a camera.
+
+Frames from a recorded clip or an image directory go through the same work
+as MainApplication.run, serially: capture, detection, recognition
+(embedding and gallery matching), attribute analysis and the overlay. Frame
+timestamps are synthetic (frame index / --fps), so tracking, identity
+caching and attribute scheduling make the same decisions however fast the
+machine is.
+
+Each model backend runs in its own process against a fresh database
+enrolled from the first frames of the input:
+
+- stub: the deterministic models of core.stub_models; hermetic, needs no weights
+- deepface: the real models, skipped when DeepFace is not installed
+
+Reports frames per second, per-stage latency percentiles and peak RSS, and
+writes them as JSON tagged with the git commit.
+
+Usage:
+    python -m benchmarks.bench_replay sample_images --frames 300
+    python -m benchmarks.bench_replay recording.mp4 --models stub --frames 1000
+"""
+import os
+import time
+import json
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import importlib.util
+import multiprocessing
+import numpy as np
+from config import Config
+from benchmarks.bench_gallery import git_commit
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+STAGES = ["capture", "detect", "embed", "match", "analyze", "overlay", "frame"]
+
+
+class StageTimer:
+    """Collects per-call latencies of named stages"""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    def wrap(self, stage, function):
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def report(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = np.array(samples) * 1000
+            report[stage] = {
+                'calls': len(samples),
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p95_ms': float(np.percentile(ms, 95)),
+                'p99_ms': float(np.percentile(ms, 99)),
+                'mean_ms': float(ms.mean()),
+            }
+        return report
+
+
+def build_pipeline(backend, db_path, faces_per_frame):
+    if backend == "stub":
+        from core.stub_models import build_stub_pipeline
+        return build_stub_pipeline(db_path, faces_per_frame)
+    from core.recognition_manager import RecognitionManager
+    from core.frame_pipeline import FramePipeline
+    return FramePipeline(RecognitionManager(db_path, Config.MODEL_NAME))
+
+
+def enroll(pipeline, frames):
+    """
+    Enrolls the first detected face of each frame as a new person, so the
+    replay exercises both matches and unknown faces.
+    """
+    from core.recognition_manager import INSERT_FACE_SQL
+    from utils.utils import serialize_embedding_blob
+    from utils.database_utils import set_embedding_metadata
+
+    manager = pipeline.recognition_manager
+    rows = []
+    for i, frame in enumerate(frames):
+        faces = pipeline.detect(frame)
+        if faces:
+            embedding = manager.represent_batch([faces[0]['face']])[0]
+            rows.append((f"person_{i}", "Man", 30, "white", serialize_embedding_blob(embedding)))
+    if rows:
+        with manager.db.write() as conn:
+            conn.executemany(INSERT_FACE_SQL, rows)
+            set_embedding_metadata(conn, manager.model_name, len(embedding))
+        manager.refresh_gallery(force=True)
+    return len(rows)
+
+
+def run_replay(backend, source_spec, frames, fps, enroll_frames, faces_per_frame):
+    """
+    Replays `frames` frames through one model backend.
+
+    Returns:
+        dict: fps, per-stage latency percentiles, peak RSS and face counts
+    """
+    from core.frame_source import open_frame_source
+    from core.main_application import MainApplication
+
+    workdir = tempfile.mkdtemp(prefix="bench_replay_")
+    try:
+        pipeline = build_pipeline(backend, os.path.join(workdir, "faces.db"), faces_per_frame)
+
+        source = open_frame_source(source_spec, realtime=False, loop=False)
+        enrollment = []
+        while len(enrollment) < enroll_frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            enrollment.append(frame)
+        source.release()
+        enrolled = enroll(pipeline, enrollment)
+
+        source = open_frame_source(source_spec, realtime=False, loop=True)
+        if not source.isOpened():
+            raise RuntimeError(f"Could not open {source_spec}")
+        app = MainApplication(video_capture=source, pipeline=pipeline)
+
+        # The first frame builds the models; it is not timed
+        ret, frame = source.read()
+        pipeline.process(frame, now=0.0)
+
+        timer = StageTimer()
+        manager = pipeline.recognition_manager
+        read = timer.wrap("capture", source.read)
+        pipeline.detect = timer.wrap("detect", pipeline.detect)
+        pipeline.models.analyze_batch = timer.wrap("analyze", pipeline.models.analyze_batch)
+        manager.embedder.embed = timer.wrap("embed", manager.embedder.embed)
+        manager.match_embeddings = timer.wrap("match", manager.match_embeddings)
+        overlay_samples = timer.samples["overlay"]
+        frame_samples = timer.samples["frame"]
+
+        faces = recognized = 0
+        start = time.perf_counter()
+        for i in range(1, frames + 1):
+            frame_start = time.perf_counter()
+            ret, frame = read()
+            if not ret:
+                break
+            results = pipeline.process(frame, now=i / fps)
+
+            overlay_start = time.perf_counter()
+            for result in results:
+                app.draw_face_result(frame, result)
+            app.renderer.render(frame)
+            overlay_samples.append(time.perf_counter() - overlay_start)
+            frame_samples.append(time.perf_counter() - frame_start)
+
+            faces += len(results)
+            recognized += sum(result['name'] != "Unknown" for result in results)
+        elapsed = time.perf_counter() - start
+        source.release()
+        manager.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    processed = len(frame_samples)
+    return {
+        'backend': backend,
+        'frames': processed,
+        'fps': processed / elapsed if elapsed > 0 else 0.0,
+        'faces': faces,
+        'recognized': recognized,
+        'enrolled': enrolled,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'stages': timer.report(),
+    }
+
+
+def available_backends(requested):
+    backends = []
+    for backend in requested:
+        if backend == "deepface" and importlib.util.find_spec("deepface") is None:
+            print("Skipping deepface backend: DeepFace is not installed")
+            continue
+        backends.append(backend)
+    return backends
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the full recognition loop")
+    parser.add_argument("source", nargs="?", default="sample_images", help="Video file or image directory")
+    parser.add_argument("--models", nargs="+", default=["stub", "deepface"], choices=["stub", "deepface"])
+    parser.add_argument("--frames", type=int, default=300, help="Frames to replay (the source loops)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate of the synthetic timestamps")
+    parser.add_argument("--enroll-frames", type=int, default=4, help="Frames whose first face is enrolled")
+    parser.add_argument("--faces-per-frame", type=int, default=2, help="Faces the stub detector finds per frame")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/replay-<commit>.json)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        'benchmark': 'replay',
+        'commit': commit,
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'source': args.source,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': [],
+    }
+
+    # A fresh process per backend keeps peak RSS and model caches separate
+    context = multiprocessing.get_context("spawn")
+    for backend in available_backends(args.models):
+        with context.Pool(1) as pool:
+            result = pool.apply(
+                run_replay,
+                (backend, args.source, args.frames, args.fps, args.enroll_frames, args.faces_per_frame)
+            )
+        report['results'].append(result)
+        print(
+            f"{backend}: {result['frames']} frames at {result['fps']:.1f} fps, {result['faces']} faces "
+            f"({result['recognized']} recognized), peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB"
+        )
+        for stage, stats in result['stages'].items():
+            print(
+                f"  {stage:<8} calls {stats['calls']:6d}  p50 {stats['p50_ms']:8.2f}ms  "
+                f"p95 {stats['p95_ms']:8.2f}ms  p99 {stats['p99_ms']:8.2f}ms"
+            )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"replay-{(commit or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# synthetic.py
+import numpy as np
+
+
+def synthetic_embeddings(size, dim=128, latent_dim=32, seed=0):
+    """
+    Generates a synthetic gallery of L2-normalized face-like embeddings.
+
+    Real face embeddings occupy a low-dimensional manifold rather than being
+    uniform on the sphere, so each vector is a random projection of a
+    `latent_dim` Gaussian code plus a little isotropic noise.
+
+    Args:
+        size (int): Number of identities
+        dim (int): Embedding dimension (128 for Facenet)
+        latent_dim (int): Intrinsic dimension of the generated gallery
+        seed (int): Random seed
+
+    Returns:
+        numpy.ndarray: (size, dim) float32 matrix with unit-length rows
+    """
+    rng = np.random.default_rng(seed)
+    projection = rng.normal(size=(latent_dim, dim)).astype(np.float32)
+    embeddings = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 65536):
+        end = min(start + 65536, size)
+        codes = rng.normal(size=(end - start, latent_dim)).astype(np.float32)
+        noise = rng.normal(scale=0.5, size=(end - start, dim)).astype(np.float32)
+        embeddings[start:end] = codes @ projection + noise
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+def synthetic_queries(gallery, count, noise=0.05, seed=1):
+    """
+    Generates probe embeddings: noisy re-captures of random gallery members.
+
+    Args:
+        gallery (numpy.ndarray): (N, D) normalized gallery
+        count (int): Number of queries
+        noise (float): Per-dimension noise, added before re-normalizing
+        seed (int): Random seed
+
+    Returns:
+        tuple: (queries, true row indices)
+    """
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(len(gallery), size=count)
+    queries = gallery[targets] + rng.normal(scale=noise, size=(count, gallery.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries, targets
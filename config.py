@@ -5,15 +5,74 @@ class Config:
     """
     # Database configuration
     DATABASE_PATH = "facial_db/facial_data.db"
+    # Embedding gallery backend: "memory" (per-process heap) or "memmap"
+    # (memory-mapped snapshot next to the database, shared across processes)
+    GALLERY_BACKEND = "memory"
+    GALLERY_REFRESH_INTERVAL = 1.0  # Seconds between checks for faces enrolled by other processes
+
+    # Approximate nearest-neighbour (IVF) index settings
+    ANN_ENABLED = False
+    ANN_NLIST = None  # Number of IVF cells (None = about 4 * sqrt(gallery size))
+    ANN_NPROBE = 8  # Cells scanned per query (higher = better recall, slower)
+    ANN_MIN_SIZE = 10000  # Galleries smaller than this use exact search
 
     # DeepFace settings
     MODEL_NAME = "Facenet"
     DETECTOR_BACKEND = "opencv"
+    MODEL_BACKEND = "deepface"  # "stub" swaps in the deterministic models of core.stub_models (no weights needed)
+    WARMUP_MODELS = True  # Build and trace all models in the background at startup
 
     # Video settings
     CAMERA_INDEX = 0  # Default camera index
+    # Frame source: None (camera CAMERA_INDEX), a camera index, a video file,
+    # an image directory, or "tcp://host:port" for a loopback stream
+    FRAME_SOURCE = None
+    FRAME_SOURCE_REALTIME = True  # Pace recorded sources at their frame rate (False = as fast as possible)
+    FRAME_SOURCE_LOOP = False  # Restart recorded sources when they end
     FRAME_ANALYSIS_INTERVAL = 0.5  # Interval for detailed face analysis (in seconds)
 
+    # Capture / inference / render pipeline (queues drop their oldest frame when full)
+    RENDER_QUEUE_SIZE = 2  # Frames buffered between capture and display
+    INFERENCE_QUEUE_SIZE = 1  # Frames buffered between capture and inference
+    PIPELINE_STATS_INTERVAL = 10.0  # Seconds between queue depth/drop log lines (0 disables)
+    INFERENCE_WORKERS = 0  # Worker processes for inference (0 = inference thread in this process)
+    INFERENCE_TASK_TIMEOUT = 60.0  # Seconds before a frame sent to a worker is given up (covers model loading)
+    BATCH_WORKERS = None  # Worker processes for core.batch_processor (None = one per core)
+    MULTI_STREAM_BATCH_FRAMES = 4  # Frames from different streams processed together by core.multi_stream
+
+    # Stage metrics (utils.metrics): summarized every PIPELINE_STATS_INTERVAL seconds
+    METRICS_ENABLED = True  # Record per-stage latency histograms and counters
+    METRICS_WINDOW = 1024  # Recent observations kept per histogram for p50/p95/p99
+    METRICS_PORT = None  # Serve Prometheus text at http://127.0.0.1:<port>/metrics (None = no endpoint)
+
+    # Profiling mode (utils.profiling): also enabled by the FACEREC_PROFILE=1 environment variable
+    PROFILING_ENABLED = False
+    PROFILE_SAMPLE_EVERY = 50  # Profile one analysis tick in this many with cProfile
+    PROFILE_DUMP_EVERY = 10  # Sampled ticks aggregated into each logs/profile_*.prof
+    PROFILE_SNAPSHOT_INTERVAL = 60.0  # Seconds between tracemalloc diff reports (0 disables tracemalloc)
+    PROFILE_TRACEMALLOC_FRAMES = 1  # Stack frames traced per allocation (more = slower)
+    PROFILE_MAX_FILES = 20  # Reports of each kind kept in logs/
+
+    # Face tracking (follows faces across frames so results can be reused per track)
+    TRACK_IOU_THRESHOLD = 0.3  # Minimum box overlap to continue a track
+    TRACK_MAX_MISSES = 3  # Detection rounds a face may go unseen before its track is dropped
+    TRACK_CONFIDENCE_HALF_LIFE = 5.0  # Seconds for confidence in a track's recognition to halve
+    TRACK_MIN_CONFIDENCE = 0.5  # Tracks below this confidence have their frozen attributes re-checked
+    TRACK_FOLLOW_BOXES = True  # Move drawn boxes with the faces on every frame between analysis ticks
+    TRACK_FOLLOW_MIN_SCORE = 0.5  # Lowest template-match score (-1 to 1) that moves a drawn box
+
+    # Per-track identity cache (skips embedding and database lookups for recognized tracks)
+    IDENTITY_CACHE_TTL = 10.0  # Seconds a track's identity is trusted before re-verification
+    IDENTITY_UNKNOWN_TTL = 1.0  # Seconds an "Unknown" result is trusted before the face is matched again
+    IDENTITY_REVERIFY_TICKS = 20  # Re-verify every Nth inference tick (0 = only on TTL or box change)
+    IDENTITY_MAX_BOX_CHANGE = 0.3  # Relative change in box area or aspect ratio that forces re-verification
+
+    # Per-track attribute scheduling
+    EMOTION_INTERVAL = 1.0  # Seconds between emotion predictions for a face
+    ATTRIBUTE_STABLE_SAMPLES = 3  # Agreeing predictions after which age/gender/race are frozen
+    AGE_TOLERANCE = 4  # Largest age spread (years) considered stable
+    USE_STORED_ATTRIBUTES = False  # Show stored gender/ethnicity of recognized people (marked "stored") instead of predicting them
+
     # Logging settings
     LOG_LEVEL = "INFO"
 
@@ -24,8 +83,49 @@ class Config:
         """
         print("Configuration:")
         print(f"DATABASE_PATH: {Config.DATABASE_PATH}")
+        print(f"GALLERY_BACKEND: {Config.GALLERY_BACKEND}")
+        print(f"GALLERY_REFRESH_INTERVAL: {Config.GALLERY_REFRESH_INTERVAL}")
+        print(f"ANN_ENABLED: {Config.ANN_ENABLED}")
+        print(f"ANN_NLIST: {Config.ANN_NLIST}")
+        print(f"ANN_NPROBE: {Config.ANN_NPROBE}")
+        print(f"ANN_MIN_SIZE: {Config.ANN_MIN_SIZE}")
         print(f"MODEL_NAME: {Config.MODEL_NAME}")
         print(f"DETECTOR_BACKEND: {Config.DETECTOR_BACKEND}")
+        print(f"MODEL_BACKEND: {Config.MODEL_BACKEND}")
+        print(f"WARMUP_MODELS: {Config.WARMUP_MODELS}")
         print(f"CAMERA_INDEX: {Config.CAMERA_INDEX}")
+        print(f"FRAME_SOURCE: {Config.FRAME_SOURCE}")
+        print(f"FRAME_SOURCE_REALTIME: {Config.FRAME_SOURCE_REALTIME}")
+        print(f"FRAME_SOURCE_LOOP: {Config.FRAME_SOURCE_LOOP}")
         print(f"FRAME_ANALYSIS_INTERVAL: {Config.FRAME_ANALYSIS_INTERVAL}")
+        print(f"RENDER_QUEUE_SIZE: {Config.RENDER_QUEUE_SIZE}")
+        print(f"INFERENCE_QUEUE_SIZE: {Config.INFERENCE_QUEUE_SIZE}")
+        print(f"PIPELINE_STATS_INTERVAL: {Config.PIPELINE_STATS_INTERVAL}")
+        print(f"INFERENCE_WORKERS: {Config.INFERENCE_WORKERS}")
+        print(f"INFERENCE_TASK_TIMEOUT: {Config.INFERENCE_TASK_TIMEOUT}")
+        print(f"BATCH_WORKERS: {Config.BATCH_WORKERS}")
+        print(f"MULTI_STREAM_BATCH_FRAMES: {Config.MULTI_STREAM_BATCH_FRAMES}")
+        print(f"METRICS_ENABLED: {Config.METRICS_ENABLED}")
+        print(f"METRICS_WINDOW: {Config.METRICS_WINDOW}")
+        print(f"METRICS_PORT: {Config.METRICS_PORT}")
+        print(f"PROFILING_ENABLED: {Config.PROFILING_ENABLED}")
+        print(f"PROFILE_SAMPLE_EVERY: {Config.PROFILE_SAMPLE_EVERY}")
+        print(f"PROFILE_DUMP_EVERY: {Config.PROFILE_DUMP_EVERY}")
+        print(f"PROFILE_SNAPSHOT_INTERVAL: {Config.PROFILE_SNAPSHOT_INTERVAL}")
+        print(f"PROFILE_TRACEMALLOC_FRAMES: {Config.PROFILE_TRACEMALLOC_FRAMES}")
+        print(f"PROFILE_MAX_FILES: {Config.PROFILE_MAX_FILES}")
+        print(f"TRACK_IOU_THRESHOLD: {Config.TRACK_IOU_THRESHOLD}")
+        print(f"TRACK_MAX_MISSES: {Config.TRACK_MAX_MISSES}")
+        print(f"TRACK_CONFIDENCE_HALF_LIFE: {Config.TRACK_CONFIDENCE_HALF_LIFE}")
+        print(f"TRACK_MIN_CONFIDENCE: {Config.TRACK_MIN_CONFIDENCE}")
+        print(f"TRACK_FOLLOW_BOXES: {Config.TRACK_FOLLOW_BOXES}")
+        print(f"TRACK_FOLLOW_MIN_SCORE: {Config.TRACK_FOLLOW_MIN_SCORE}")
+        print(f"IDENTITY_CACHE_TTL: {Config.IDENTITY_CACHE_TTL}")
+        print(f"IDENTITY_UNKNOWN_TTL: {Config.IDENTITY_UNKNOWN_TTL}")
+        print(f"IDENTITY_REVERIFY_TICKS: {Config.IDENTITY_REVERIFY_TICKS}")
+        print(f"IDENTITY_MAX_BOX_CHANGE: {Config.IDENTITY_MAX_BOX_CHANGE}")
+        print(f"EMOTION_INTERVAL: {Config.EMOTION_INTERVAL}")
+        print(f"ATTRIBUTE_STABLE_SAMPLES: {Config.ATTRIBUTE_STABLE_SAMPLES}")
+        print(f"AGE_TOLERANCE: {Config.AGE_TOLERANCE}")
+        print(f"USE_STORED_ATTRIBUTES: {Config.USE_STORED_ATTRIBUTES}")
         print(f"LOG_LEVEL: {Config.LOG_LEVEL}")
\ No newline at end of file
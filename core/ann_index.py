@@ -0,0 +1,241 @@
+import os
+import time
+import logging
+import threading
+import numpy as np
+
+
+def ann_index_path(db_path):
+    """
+    Returns where the ANN index for a database is persisted.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        str: Path of the .ivf.npz file beside the database
+    """
+    return os.path.splitext(db_path)[0] + ".ivf.npz"
+
+
+def top_k_indices(distances, k):
+    """
+    Indices of the k smallest distances, sorted ascending.
+
+    Args:
+        distances (numpy.ndarray): 1-D array of distances
+        k (int): Number of indices to return
+
+    Returns:
+        numpy.ndarray: Indices into distances
+    """
+    k = min(k, len(distances))
+    if k == 1:
+        return np.array([np.argmin(distances)])
+    if k < len(distances):
+        candidates = np.argpartition(distances, k - 1)[:k]
+    else:
+        candidates = np.arange(len(distances))
+    return candidates[np.argsort(distances[candidates], kind="stable")]
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalized embeddings.
+
+    A spherical k-means coarse quantizer splits the gallery into `nlist`
+    cells and records which gallery rows fall in each one. A query is
+    compared against the centroids and only the rows of the `nprobe` closest
+    cells are scanned, so the work per query is roughly nprobe / nlist of an
+    exact scan. The index stores row numbers only, never a second copy of
+    the embeddings, so it works unchanged over a memory-mapped gallery.
+
+    Recall/latency knobs:
+        nlist:  number of cells. More cells make each probe cheaper but
+                need a larger nprobe for the same recall.
+        nprobe: number of cells scanned per query. Higher is slower and
+                more accurate; nprobe == nlist is an exact search.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, train_iterations=20, max_train_points=64, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.max_train_points = max_train_points
+        self.seed = seed
+
+        self.centroids = None
+        self.list_offsets = None
+        self.row_ids = None
+        self.ids = None
+
+    @property
+    def size(self):
+        """Number of gallery rows covered by the index"""
+        return 0 if self.row_ids is None else len(self.row_ids)
+
+    @staticmethod
+    def default_nlist(size):
+        """A common rule of thumb: about 4 * sqrt(N) cells"""
+        return max(1, int(4 * np.sqrt(size)))
+
+    def build(self, matrix, ids=None):
+        """
+        Trains the coarse quantizer and assigns every row to a cell.
+
+        Args:
+            matrix (numpy.ndarray): (N, D) L2-normalized embeddings
+            ids (numpy.ndarray, optional): Database ids of the rows, stored so a
+                                           persisted index can be checked against the gallery
+        """
+        start = time.perf_counter()
+        size = len(matrix)
+        nlist = min(self.nlist or self.default_nlist(size), size)
+        self.nlist = nlist
+
+        self.centroids = self._train(matrix, nlist)
+        assignments = self._assign(matrix)
+
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.row_ids = order.astype(np.int64)
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int64).copy()
+
+        logging.info(
+            f"Built IVF index over {size} embeddings with {nlist} cells "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def _train(self, matrix, nlist):
+        """Spherical k-means on a random subsample of the gallery"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(matrix), nlist * self.max_train_points)
+        sample = np.asarray(matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(assignments, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            order = np.argsort(assignments, kind="stable")
+            occupied = counts > 0
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[occupied]
+            sums[occupied] = np.add.reduceat(sample[order], starts, axis=0)
+
+            # Re-seed empty cells with random sample points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        return centroids.astype(np.float32)
+
+    def _assign(self, matrix, chunk_size=65536):
+        """Nearest centroid for every row, computed in chunks to bound memory"""
+        assignments = np.empty(len(matrix), dtype=np.int64)
+        for start in range(0, len(matrix), chunk_size):
+            chunk = matrix[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignments
+
+    def search(self, matrix, query, k=1, nprobe=None, excluded=None):
+        """
+        Approximate k nearest neighbours by cosine distance.
+
+        Args:
+            matrix (numpy.ndarray): The (N, D) normalized embeddings the index was built over
+            query (numpy.ndarray): L2-normalized (D,) query
+            k (int): Number of neighbours to return
+            nprobe (int, optional): Cells to scan; defaults to self.nprobe
+            excluded (numpy.ndarray, optional): Boolean mask of deleted rows to skip
+
+        Returns:
+            tuple: (row indices into the indexed matrix, cosine distances),
+                   both sorted by ascending distance
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        if nprobe < len(centroid_scores):
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(len(centroid_scores))
+
+        candidate_rows, candidate_distances = [], []
+        for cell in probes:
+            start, end = self.list_offsets[cell], self.list_offsets[cell + 1]
+            if start == end:
+                continue
+            cell_rows = self.row_ids[start:end]
+            cell_distances = 1.0 - matrix[cell_rows] @ query
+            if excluded is not None:
+                cell_distances[excluded[cell_rows]] = np.inf
+            candidate_rows.append(cell_rows)
+            candidate_distances.append(cell_distances)
+
+        if not candidate_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows = np.concatenate(candidate_rows)
+        distances = np.concatenate(candidate_distances)
+        top = top_k_indices(distances, k)
+        return rows[top], distances[top]
+
+    def save(self, path):
+        """
+        Persists the index.
+
+        Args:
+            path (str): Destination .npz file
+        """
+        # Unique per thread too, since galleries build indexes in the background
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            temp_path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            row_ids=self.row_ids,
+            ids=self.ids if self.ids is not None else np.empty(0, dtype=np.int64),
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Loads a persisted index.
+
+        Args:
+            path (str): The .npz file written by save()
+            **kwargs: Search settings such as nprobe
+
+        Returns:
+            IVFIndex: The loaded index
+        """
+        index = cls(**kwargs)
+        with np.load(path) as data:
+            index.centroids = data["centroids"]
+            index.list_offsets = data["list_offsets"]
+            index.row_ids = data["row_ids"]
+            index.ids = data["ids"]
+        index.nlist = len(index.centroids)
+        return index
+
+    def covers(self, ids):
+        """
+        Checks that the index was built over exactly these leading gallery rows.
+
+        Args:
+            ids (numpy.ndarray): Gallery ids in row order
+
+        Returns:
+            bool: True if the first `size` gallery ids match the indexed ids
+        """
+        return (
+            self.ids is not None
+            and len(self.ids) == self.size
+            and len(ids) >= self.size
+            and np.array_equal(np.asarray(ids[:self.size]), self.ids)
+        )
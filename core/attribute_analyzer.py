@@ -0,0 +1,128 @@
+import cv2
+import logging
+import numpy as np
+from core.face_detector import face_to_bgr
+from core.embedding import fit_to_input
+from core.model_registry import build_model, keras_model
+
+
+class BatchAttributeAnalyzer:
+    """
+    Predicts age, gender, race and emotion for many aligned faces, running
+    each attribute model once over the whole batch instead of once per face.
+
+    Faces are preprocessed like DeepFace.analyze with detector_backend="skip"
+    (BGR, fitted to 224x224, scaled to [0, 1]; emotion uses a 48x48 grayscale
+    version), and the outputs are post-processed into the same dict layout
+    DeepFace.analyze returns, so existing overlay code keeps working.
+    """
+
+    MODEL_NAMES = {
+        'age': "Age",
+        'gender': "Gender",
+        'race': "Race",
+        'emotion': "Emotion",
+    }
+    GENDER_LABELS = ["Woman", "Man"]
+    RACE_LABELS = ["asian", "indian", "black", "white", "middle eastern", "latino hispanic"]
+    EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+    INPUT_SIZE = (224, 224)
+    EMOTION_INPUT_SIZE = (48, 48)
+
+    def __init__(self, actions=('age', 'gender', 'race', 'emotion'), max_batch_size=64):
+        """
+        Args:
+            actions (tuple): Attributes predicted when analyze() is not given any
+            max_batch_size (int): Largest batch sent to a model at once
+        """
+        self.actions = tuple(actions)
+        self.max_batch_size = max_batch_size
+
+    def model(self, action):
+        """
+        Returns the Keras model for an attribute, building it on first use.
+
+        Args:
+            action (str): "age", "gender", "race" or "emotion"
+
+        Returns:
+            keras.Model: The attribute model
+        """
+        return keras_model(build_model(self.MODEL_NAMES[action], task="facial_attribute"))
+
+    def preprocess(self, face):
+        """
+        Converts an aligned face into the attribute models' input layout.
+
+        Args:
+            face (numpy.ndarray): Aligned face from extract_faces
+
+        Returns:
+            numpy.ndarray: (224, 224, 3) float32 BGR image in [0, 1]
+        """
+        return fit_to_input(face_to_bgr(face), self.INPUT_SIZE).astype(np.float32) / 255.0
+
+    def _predict(self, action, batch):
+        """Runs one attribute model over a preprocessed batch, chunked by max_batch_size"""
+        network = self.model(action)
+        if action == 'emotion':
+            batch = np.stack([
+                cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), self.EMOTION_INPUT_SIZE)
+                for image in batch
+            ])[..., np.newaxis]
+
+        predictions = []
+        for start in range(0, len(batch), self.max_batch_size):
+            predictions.append(np.asarray(network.predict_on_batch(batch[start:start + self.max_batch_size])))
+        return np.concatenate(predictions)
+
+    @staticmethod
+    def _percentages(labels, scores, normalize=False):
+        if normalize:
+            scores = scores / scores.sum()
+        return {label: float(100 * score) for label, score in zip(labels, scores)}
+
+    def analyze(self, faces, actions=None, regions=None):
+        """
+        Analyzes a batch of aligned faces.
+
+        Args:
+            faces (list): Aligned faces from extract_faces
+            actions (tuple, optional): Subset of age/gender/race/emotion to predict;
+                                       defaults to the analyzer's actions
+            regions (list, optional): facial_area dict per face, copied into the results
+
+        Returns:
+            list: One dict per face with the keys DeepFace.analyze produces for
+                  the requested actions (age, gender, dominant_gender, race,
+                  dominant_race, emotion, dominant_emotion, region)
+        """
+        actions = self.actions if actions is None else tuple(actions)
+        results = [{'region': region} for region in (regions or [None] * len(faces))]
+        if len(faces) == 0 or not actions:
+            return results
+
+        batch = np.stack([self.preprocess(face) for face in faces])
+
+        for action in actions:
+            try:
+                predictions = self._predict(action, batch)
+            except Exception as e:
+                logging.error(f"Error in batched {action} analysis: {e}")
+                continue
+
+            for result, scores in zip(results, predictions):
+                if action == 'age':
+                    result['age'] = int(np.sum(scores * np.arange(len(scores))))
+                elif action == 'gender':
+                    result['gender'] = self._percentages(self.GENDER_LABELS, scores)
+                    result['dominant_gender'] = self.GENDER_LABELS[int(np.argmax(scores))]
+                elif action == 'race':
+                    result['race'] = self._percentages(self.RACE_LABELS, scores, normalize=True)
+                    result['dominant_race'] = self.RACE_LABELS[int(np.argmax(scores))]
+                elif action == 'emotion':
+                    result['emotion'] = self._percentages(self.EMOTION_LABELS, scores, normalize=True)
+                    result['dominant_emotion'] = self.EMOTION_LABELS[int(np.argmax(scores))]
+
+        return results
@@ -0,0 +1,173 @@
+import time
+from collections import deque
+import numpy as np
+from config import Config
+
+
+class _TrackAttributes:
+    """Attribute history and current values for one track"""
+
+    def __init__(self, window):
+        self.samples = {action: deque(maxlen=window) for action in AttributeScheduler.SLOW_ACTIONS}
+        self.frozen = set()
+        self.values = {}
+        self.emotion_at = None
+
+
+class AttributeScheduler:
+    """
+    Decides which attribute models to run for each tracked face.
+
+    Age, gender and race do not change while a person stays in view, so
+    their predictions are smoothed over the last `window` samples and frozen
+    once the window is full and stable: ages within `age_tolerance` years,
+    and the same dominant gender or race throughout. Frozen attributes are
+    not predicted again until the track is reset. Emotion is predicted at
+    its own rate. For recognized people, gender and race can be taken from
+    their stored details instead of being predicted at all; those come
+    without scores and are listed under 'stored_attributes' so they are not
+    shown as predictions.
+    """
+
+    SLOW_ACTIONS = ('age', 'gender', 'race')
+    STORED_GENDERS = {'male': "Man", 'female': "Woman"}
+    RACE_LABELS = ["asian", "indian", "black", "white", "middle eastern", "latino hispanic"]
+
+    def __init__(self, emotion_interval=None, window=None, age_tolerance=None, use_stored=None):
+        """
+        Args:
+            emotion_interval (float, optional): Seconds between emotion predictions;
+                                                defaults to Config.EMOTION_INTERVAL
+            window (int, optional): Samples an attribute must agree over before it is frozen;
+                                    defaults to Config.ATTRIBUTE_STABLE_SAMPLES
+            age_tolerance (float, optional): Largest age spread, in years, considered stable;
+                                             defaults to Config.AGE_TOLERANCE
+            use_stored (bool, optional): Use stored gender/ethnicity of recognized people instead
+                                         of predicting them; defaults to Config.USE_STORED_ATTRIBUTES
+        """
+        self.emotion_interval = Config.EMOTION_INTERVAL if emotion_interval is None else emotion_interval
+        self.window = Config.ATTRIBUTE_STABLE_SAMPLES if window is None else window
+        self.age_tolerance = Config.AGE_TOLERANCE if age_tolerance is None else age_tolerance
+        self.use_stored = Config.USE_STORED_ATTRIBUTES if use_stored is None else use_stored
+        self._tracks = {}
+
+    def _state(self, track_id):
+        state = self._tracks.get(track_id)
+        if state is None:
+            state = self._tracks[track_id] = _TrackAttributes(self.window)
+        return state
+
+    def _stored(self, person_details):
+        """Returns the dominant_* fields that the stored details can stand in for"""
+        if not self.use_stored or not person_details:
+            return {}
+        stored = {}
+        gender = self.STORED_GENDERS.get(str(person_details.get('gender') or "").lower())
+        if gender:
+            stored['dominant_gender'] = gender
+        race = str(person_details.get('ethnicity') or "").lower()
+        if race in self.RACE_LABELS:
+            stored['dominant_race'] = race
+        return stored
+
+    def due(self, track_id, person_details=None, reset=False, now=None):
+        """
+        Lists the attributes that should be predicted for a track this tick.
+
+        Args:
+            track_id (int): Track id from FaceTracker
+            person_details (dict, optional): Stored details if the track is a recognized person
+            reset (bool): Forget frozen values first, e.g. when the track may have changed faces
+            now (float, optional): Current time; defaults to time.time()
+
+        Returns:
+            tuple: Subset of ('age', 'gender', 'race', 'emotion')
+        """
+        now = time.time() if now is None else now
+        state = self._state(track_id)
+        if reset:
+            state.frozen.clear()
+            for samples in state.samples.values():
+                samples.clear()
+
+        stored = self._stored(person_details)
+        actions = [
+            action for action in self.SLOW_ACTIONS
+            if action not in state.frozen and f"dominant_{action}" not in stored
+        ]
+        if state.emotion_at is None or now - state.emotion_at >= self.emotion_interval:
+            actions.append('emotion')
+        return tuple(actions)
+
+    def update(self, track_id, analysis, actions, person_details=None, now=None):
+        """
+        Folds new predictions into a track's attributes.
+
+        Args:
+            track_id (int): Track id from FaceTracker
+            analysis (dict): Analyzer output for the predicted actions
+            actions (tuple): The actions that were predicted
+            person_details (dict, optional): Stored details if the track is a recognized person
+            now (float, optional): Current time; defaults to time.time()
+
+        Returns:
+            dict: Smoothed analysis in DeepFace.analyze layout with the latest
+                  emotion, or None until every attribute has a value
+        """
+        now = time.time() if now is None else now
+        state = self._state(track_id)
+        values = state.values
+
+        if 'age' in actions:
+            samples = state.samples['age']
+            samples.append(analysis['age'])
+            values['age'] = float(np.mean(samples))
+            if len(samples) == self.window and max(samples) - min(samples) <= self.age_tolerance:
+                state.frozen.add('age')
+
+        for action in ('gender', 'race'):
+            if action not in actions:
+                continue
+            samples = state.samples[action]
+            samples.append((analysis[action], analysis[f"dominant_{action}"]))
+            labels = samples[-1][0].keys()
+            values[action] = {label: float(np.mean([scores[label] for scores, _ in samples])) for label in labels}
+            values[f"dominant_{action}"] = max(values[action], key=values[action].get)
+            if len(samples) == self.window and len({dominant for _, dominant in samples}) == 1:
+                state.frozen.add(action)
+
+        if 'emotion' in actions:
+            values['emotion'] = analysis['emotion']
+            values['dominant_emotion'] = analysis['dominant_emotion']
+            state.emotion_at = now
+
+        if 'region' in analysis:
+            values['region'] = analysis['region']
+
+        merged = dict(values)
+        stored = self._stored(person_details)
+        if stored:
+            # Stored values have no scores; drop any predicted ones they replace
+            attributes = tuple(key[len("dominant_"):] for key in stored)
+            for attribute in attributes:
+                merged.pop(attribute, None)
+            merged.update(stored)
+            merged['stored_attributes'] = attributes
+        if all(key in merged for key in ('age', 'dominant_gender', 'dominant_race', 'dominant_emotion')):
+            return merged
+        return None
+
+    def frozen(self, track_id):
+        """
+        Returns:
+            set: Attributes no longer predicted for a track
+        """
+        state = self._tracks.get(track_id)
+        return set(state.frozen) if state else set()
+
+    def evict(self, track_ids):
+        """
+        Drops the state of tracks that no longer exist.
+        """
+        for track_id in track_ids:
+            self._tracks.pop(track_id, None)
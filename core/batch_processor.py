@@ -0,0 +1,248 @@
+"""
+Headless batch analysis of an image directory.
+
+Walks a directory, runs detection, recognition and attribute analysis on
+every image with a pool of worker processes, and streams one JSON line per
+face to the output file. Images without faces get a single line with
+"face_count": 0, so every processed image is recorded and a rerun with the
+same output file skips them. Images that failed get an "error" line and
+are retried on the next run.
+
+Usage:
+    python -m core.batch_processor sample_images --output results.jsonl --workers 8
+"""
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import multiprocessing
+from config import Config
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Per-process pipeline, built by _init_worker
+_pipeline = None
+
+
+def find_images(directory):
+    """
+    Lists the images under a directory, recursively, in a stable order.
+
+    Args:
+        directory (str): Directory to walk
+
+    Returns:
+        list: Image paths relative to the directory
+    """
+    images = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.relpath(os.path.join(root, name), directory))
+    return images
+
+
+def load_completed(output_path):
+    """
+    Reads an existing output file and returns the images it fully covers.
+
+    An image is complete once all `face_count` of its lines are present.
+    Lines of incomplete images (and a truncated last line) are left over
+    from an interrupted run, and error records mark images that failed
+    (unreadable, or an exception in the models); the file is rewritten
+    without either so those images are processed again without
+    duplicating lines.
+
+    Args:
+        output_path (str): JSONL output of a previous run
+
+    Returns:
+        set: Relative paths of completed images
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    records = []
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    seen = {}
+    for record in records:
+        seen.setdefault(record['image'], set()).add(record.get('face_index'))
+    expected = {record['image']: record['face_count'] for record in records}
+    failed = {record['image'] for record in records if 'error' in record}
+    completed = {
+        image for image, indices in seen.items()
+        if image not in failed and (expected[image] == 0 or len(indices - {None}) == expected[image])
+    }
+
+    kept = [record for record in records if record['image'] in completed]
+    if len(kept) != len(records) or not _ends_with_newline(output_path):
+        logging.info(f"Dropping {len(records) - len(kept)} lines of incomplete or failed images from {output_path}")
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in kept)
+    return completed
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _init_worker(db_path, model_name, detector_backend, threads):
+    """Builds this worker's models, limiting each worker to its share of the cores"""
+    global _pipeline
+    # TensorFlow reads these when it is first imported, which happens lazily below
+    os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+
+    import cv2
+    from core.recognition_manager import RecognitionManager
+    from core.frame_pipeline import FramePipeline
+
+    cv2.setNumThreads(threads)
+    _pipeline = FramePipeline(RecognitionManager(db_path, model_name), detector_backend)
+
+
+def _json_number(value):
+    """Converts numpy scalars to floats; infinite distances become null"""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _analysis_fields(analysis):
+    if not analysis:
+        return {}
+    return {
+        'age': _json_number(analysis['age']),
+        'gender': analysis['dominant_gender'],
+        'gender_scores': {k: _json_number(v) for k, v in analysis['gender'].items()},
+        'race': analysis['dominant_race'],
+        'race_scores': {k: _json_number(v) for k, v in analysis['race'].items()},
+        'emotion': analysis['dominant_emotion'],
+        'emotion_scores': {k: _json_number(v) for k, v in analysis['emotion'].items()},
+    }
+
+
+def process_image(task):
+    """
+    Analyzes one image in a worker process.
+
+    Args:
+        task (tuple): (directory, relative image path)
+
+    Returns:
+        list: JSON-serializable records, one per face, or a single
+              face_count 0 record if the image has no faces or cannot be read
+    """
+    import cv2
+
+    directory, image = task
+    frame = cv2.imread(os.path.join(directory, image))
+    if frame is None:
+        return [{'image': image, 'face_count': 0, 'error': "unreadable image"}]
+
+    try:
+        height, width = frame.shape[:2]
+        # With enforce_detection=False DeepFace returns the whole image when it finds no face
+        faces = [
+            face for face in _pipeline.detect(frame)
+            if (face['facial_area']['w'], face['facial_area']['h']) != (width, height)
+        ]
+        aligned_faces = [face['face'] for face in faces]
+        identities = _pipeline.recognition_manager.recognize_batch(aligned_faces)
+        analyses = _pipeline.analyze_batch(aligned_faces, [face['facial_area'] for face in faces])
+    except Exception as e:
+        logging.error(f"Error processing {image}: {e}")
+        return [{'image': image, 'face_count': 0, 'error': str(e)}]
+
+    if not faces:
+        return [{'image': image, 'face_count': 0}]
+
+    records = []
+    for index, (face, (name, distance), analysis) in enumerate(zip(faces, identities, analyses)):
+        area = face['facial_area']
+        record = {
+            'image': image,
+            'face_index': index,
+            'face_count': len(faces),
+            'box': {key: int(area[key]) for key in ('x', 'y', 'w', 'h')},
+            'name': name,
+            'distance': _json_number(distance),
+        }
+        record.update(_analysis_fields(analysis))
+        records.append(record)
+    return records
+
+
+def run_batch(directory, output_path, workers=None, db_path=None, chunksize=4):
+    """
+    Processes every image under a directory that the output file does not
+    already cover, appending the results as they arrive.
+
+    Args:
+        directory (str): Directory of images
+        output_path (str): JSONL file to append to
+        workers (int, optional): Worker processes; defaults to Config.BATCH_WORKERS or one per core
+        db_path (str, optional): Face database; defaults to Config.DATABASE_PATH
+        chunksize (int): Images handed to a worker at a time
+
+    Returns:
+        int: Number of images processed in this run
+    """
+    workers = workers or Config.BATCH_WORKERS or os.cpu_count()
+    completed = load_completed(output_path)
+    images = [image for image in find_images(directory) if image not in completed]
+    logging.info(f"{len(images)} images to process ({len(completed)} already done) with {workers} workers")
+    if not images:
+        return 0
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context("spawn")
+    initargs = (db_path or Config.DATABASE_PATH, Config.MODEL_NAME, Config.DETECTOR_BACKEND, threads)
+    start = time.perf_counter()
+    processed = 0
+    with context.Pool(workers, initializer=_init_worker, initargs=initargs) as pool, \
+            open(output_path, "a", encoding="utf-8") as output:
+        tasks = ((directory, image) for image in images)
+        for records in pool.imap_unordered(process_image, tasks, chunksize=chunksize):
+            # All lines of an image go out in one write, so a rerun sees it whole or not at all
+            output.write("".join(json.dumps(record) + "\n" for record in records))
+            output.flush()
+            processed += 1
+            if processed % 100 == 0 or processed == len(images):
+                rate = processed / (time.perf_counter() - start)
+                logging.info(f"Processed {processed}/{len(images)} images ({rate:.1f} images/s)")
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze every face in a directory of images")
+    parser.add_argument("directory", help="Directory of images (searched recursively)")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--db", default=None, help="Face database (default: Config.DATABASE_PATH)")
+    parser.add_argument("--chunksize", type=int, default=4, help="Images handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=Config.LOG_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+    run_batch(args.directory, args.output, args.workers, args.db, args.chunksize)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
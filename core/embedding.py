@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+from core.face_detector import face_to_bgr
+from core.model_registry import build_model, keras_model, input_size
+
+
+def fit_to_input(image, target_size):
+    """
+    Resizes an image to a model's input size the way DeepFace does: scale to
+    fit while keeping the aspect ratio, then pad with black to the exact size.
+
+    Args:
+        image (numpy.ndarray): (H, W, 3) image
+        target_size (tuple): (height, width) expected by the model
+
+    Returns:
+        numpy.ndarray: (height, width, 3) image
+    """
+    factor = min(target_size[0] / image.shape[0], target_size[1] / image.shape[1])
+    resized = cv2.resize(image, (int(image.shape[1] * factor), int(image.shape[0] * factor)))
+
+    diff_0 = target_size[0] - resized.shape[0]
+    diff_1 = target_size[1] - resized.shape[1]
+    padded = np.pad(
+        resized,
+        ((diff_0 // 2, diff_0 - diff_0 // 2), (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)),
+        "constant"
+    )
+    if padded.shape[0:2] != tuple(target_size):
+        padded = cv2.resize(padded, (target_size[1], target_size[0]))
+    return padded
+
+
+class BatchEmbedder:
+    """
+    Embeds many faces with a single forward pass of the recognition model.
+
+    Faces are preprocessed the way DeepFace.represent preprocesses the
+    faces its detector finds, which is how enrolled embeddings were made:
+    BGR, fitted to the model input and scaled to [0, 1]. They are stacked
+    into one tensor and passed through the Keras model in one call, so the
+    embeddings are interchangeable with enrolled ones. (DeepFace.represent
+    with detector_backend="skip" flips a BGR image to RGB instead, so its
+    embeddings of the same crop do not match enrolled ones as closely.)
+    """
+
+    def __init__(self, model_name="Facenet", max_batch_size=64):
+        """
+        Args:
+            model_name (str): DeepFace recognition model
+            max_batch_size (int): Largest batch sent to the model at once
+        """
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self._model = None
+
+    @property
+    def model(self):
+        """The DeepFace model, built on first use"""
+        if self._model is None:
+            self._model = build_model(self.model_name)
+        return self._model
+
+    def preprocess(self, face, aligned=True):
+        """
+        Converts one face into the model's input layout.
+
+        Args:
+            face (numpy.ndarray): Aligned face from extract_faces, or a BGR crop
+            aligned (bool): True if face is an aligned extract_faces result
+
+        Returns:
+            numpy.ndarray: (height, width, 3) float32 BGR image in [0, 1]
+        """
+        bgr = face_to_bgr(face) if aligned else face
+        return fit_to_input(bgr, input_size(self.model)).astype(np.float32) / 255.0
+
+    def embed(self, faces, aligned=True):
+        """
+        Embeds a list of faces.
+
+        Args:
+            faces (list): Aligned faces from extract_faces, or BGR crops
+            aligned (bool): True if the faces are aligned extract_faces results
+
+        Returns:
+            numpy.ndarray: (N, D) float32 embeddings, one row per face
+        """
+        if len(faces) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        network = keras_model(self.model)
+        batches = []
+        for start in range(0, len(faces), self.max_batch_size):
+            batch = np.stack([self.preprocess(face, aligned) for face in faces[start:start + self.max_batch_size]])
+            batches.append(np.asarray(network.predict_on_batch(batch), dtype=np.float32))
+        return np.concatenate(batches)
@@ -1,5 +1,5 @@
 import cv2
-from deepface import DeepFace
+import numpy as np
 
 def detect_faces(frame, detector_backend="opencv"):
     """
@@ -14,6 +14,8 @@ def detect_faces(frame, detector_backend="opencv"):
             - frame (numpy.ndarray): The frame with bounding boxes drawn around detected faces.
             - face_objs (list): A list of dictionaries containing information about each detected face.
     """
+    from deepface import DeepFace
+
     try:
         # Detect and extract faces from the frame using DeepFace
         face_objs = DeepFace.extract_faces(img_path=frame, detector_backend=detector_backend, enforce_detection=False)
@@ -31,6 +33,23 @@ def detect_faces(frame, detector_backend="opencv"):
         return frame, []
 
 
+def face_to_bgr(face):
+    """
+    Converts an aligned face returned by DeepFace.extract_faces (RGB floats in
+    [0, 1]) into the BGR uint8 layout DeepFace expects for in-memory images,
+    so it can be passed on with detector_backend="skip".
+
+    Args:
+        face (numpy.ndarray): The "face" entry of an extract_faces result.
+
+    Returns:
+        numpy.ndarray: The face as a BGR uint8 image.
+    """
+    if face.dtype != np.uint8:
+        face = np.clip(face * 255.0, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(face[:, :, ::-1])
+
+
 def test_face_detector():
     """
     Tests the face detector with a live webcam feed.
@@ -0,0 +1,307 @@
+import time
+import itertools
+from collections import deque
+import cv2
+import numpy as np
+from config import Config
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    Intersection over union between two sets of (x, y, w, h) boxes.
+
+    Args:
+        boxes_a (numpy.ndarray): (N, 4) boxes
+        boxes_b (numpy.ndarray): (M, 4) boxes
+
+    Returns:
+        numpy.ndarray: (N, M) IoU matrix
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    left = np.maximum(a[..., 0], b[..., 0])
+    top = np.maximum(a[..., 1], b[..., 1])
+    right = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2])
+    bottom = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def _centroid_distance(boxes_a, boxes_b):
+    """Centroid distance between boxes, relative to the size of the boxes in boxes_a"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    dx = (a[..., 0] + a[..., 2] / 2) - (b[..., 0] + b[..., 2] / 2)
+    dy = (a[..., 1] + a[..., 3] / 2) - (b[..., 1] + b[..., 3] / 2)
+    scale = np.sqrt(np.maximum(a[..., 2] * a[..., 3], 1.0))
+    return np.hypot(dx, dy) / scale
+
+
+def _greedy_pairs(scores, valid, higher_is_better=True):
+    """Pairs rows with columns greedily by score, skipping pairs where valid is False"""
+    order = np.argsort(-scores if higher_is_better else scores, axis=None)
+    rows, cols = np.unravel_index(order, scores.shape)
+    used_rows, used_cols, pairs = set(), set(), []
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        if not valid[row, col] or row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((row, col))
+    return pairs
+
+
+class Track:
+    """
+    One face followed across frames, with the last recognition and analysis
+    results computed for it.
+    """
+
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.misses = 0
+
+        # Results of the last recognize/analyze pass for this track
+        self.name = "Unknown"
+        self.distance = float('inf')
+        self.analysis = None
+        self.person_details = None
+        self.refreshed_at = None
+        # Scaled down when the track is matched by position only, since the
+        # face under the box may then not be the one that was recognized
+        self.confidence_scale = 0.0
+
+    @property
+    def facial_area(self):
+        x, y, w, h = self.box
+        return {'x': x, 'y': y, 'w': w, 'h': h}
+
+
+class FaceTracker:
+    """
+    Associates detections across frames so each face keeps a stable track id.
+
+    Detections are matched to existing tracks by IoU first, then by centroid
+    distance for faces that moved too far for their boxes to overlap. Each
+    track carries a confidence in its last results that halves every
+    `confidence_half_life` seconds (and immediately on position-only
+    matches); a track needs refreshing when it is new or its confidence
+    drops below `min_confidence`.
+    """
+
+    def __init__(self, iou_threshold=None, max_centroid_distance=0.5, max_misses=None,
+                 confidence_half_life=None, min_confidence=None):
+        """
+        Args:
+            iou_threshold (float, optional): Minimum IoU for a match; defaults to Config.TRACK_IOU_THRESHOLD
+            max_centroid_distance (float): Largest centroid shift, relative to the face size,
+                                           accepted for a position-only match
+            max_misses (int, optional): Detection rounds a track may go unseen before it is
+                                        dropped; defaults to Config.TRACK_MAX_MISSES
+            confidence_half_life (float, optional): Seconds for confidence to halve;
+                                                    defaults to Config.TRACK_CONFIDENCE_HALF_LIFE
+            min_confidence (float, optional): Confidence below which a track needs refreshing;
+                                              defaults to Config.TRACK_MIN_CONFIDENCE
+        """
+        self.iou_threshold = Config.TRACK_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_misses = Config.TRACK_MAX_MISSES if max_misses is None else max_misses
+        self.confidence_half_life = (
+            Config.TRACK_CONFIDENCE_HALF_LIFE if confidence_half_life is None else confidence_half_life
+        )
+        self.min_confidence = Config.TRACK_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.tracks = {}
+        self.lost = []
+        self._ids = itertools.count(1)
+
+    def update(self, facial_areas, now=None):
+        """
+        Matches a frame's detections to tracks, starting new tracks for
+        unmatched detections and dropping tracks unseen for too long.
+
+        Args:
+            facial_areas (list): facial_area dicts (x, y, w, h) of this frame's faces
+            now (float, optional): Timestamp of the frame; defaults to time.time()
+
+        Returns:
+            list: The Track for each detection, in the same order
+        """
+        now = time.time() if now is None else now
+        boxes = [(area['x'], area['y'], area['w'], area['h']) for area in facial_areas]
+        track_list = list(self.tracks.values())
+        assigned = [None] * len(boxes)
+
+        if track_list and boxes:
+            track_boxes = [track.box for track in track_list]
+            iou = box_iou(track_boxes, boxes)
+            for row, col in _greedy_pairs(iou, iou >= self.iou_threshold):
+                assigned[col] = track_list[row]
+
+            # Faces that moved further than their boxes overlap: fall back to centroids
+            open_rows = [i for i, track in enumerate(track_list) if track not in assigned]
+            open_cols = [i for i, track in enumerate(assigned) if track is None]
+            if open_rows and open_cols:
+                distance = _centroid_distance([track_boxes[i] for i in open_rows], [boxes[i] for i in open_cols])
+                for row, col in _greedy_pairs(distance, distance <= self.max_centroid_distance, False):
+                    track = track_list[open_rows[row]]
+                    track.confidence_scale *= 0.5
+                    assigned[open_cols[col]] = track
+
+        for i, box in enumerate(boxes):
+            track = assigned[i]
+            if track is None:
+                track = Track(next(self._ids), box, now)
+                self.tracks[track.track_id] = track
+                assigned[i] = track
+            track.box = box
+            track.last_seen = now
+            track.misses = 0
+
+        self.lost = []
+        for track in track_list:
+            if track not in assigned:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    del self.tracks[track.track_id]
+                    self.lost.append(track.track_id)
+
+        return assigned
+
+    def confidence(self, track, now=None):
+        """
+        Args:
+            track (Track): A tracked face
+            now (float, optional): Current time; defaults to time.time()
+
+        Returns:
+            float: Confidence in the track's last results, 0 if it has none
+        """
+        if track.refreshed_at is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return track.confidence_scale * 0.5 ** ((now - track.refreshed_at) / self.confidence_half_life)
+
+    def needs_refresh(self, track, now=None):
+        """
+        Returns:
+            bool: True if the track is new or its confidence has decayed
+        """
+        return self.confidence(track, now) < self.min_confidence
+
+    def mark_refreshed(self, track, now=None):
+        """
+        Resets a track's confidence after its results were refreshed.
+        """
+        track.refreshed_at = time.time() if now is None else now
+        track.confidence_scale = 1.0
+
+
+class BoxFollower:
+    """
+    Keeps face boxes on moving faces between analysis ticks, for drawing.
+
+    When new results arrive, each face's box is cut out of a downscaled
+    grayscale copy of the frame the results were computed on, as a
+    template. On every frame after that, the template is searched for
+    around the box's last position (cv2.matchTemplate, normalized
+    cross-correlation) and the box moves to the best match. A box whose
+    best match scores below `min_score` (the face turned away or was
+    covered) stays where it was. Templates are never updated, so boxes do
+    not drift; the next analysis tick replaces them all.
+    """
+
+    def __init__(self, width=320, search=1.0, min_score=None, history=8):
+        """
+        Args:
+            width (int): Width frames are downscaled to for matching
+            search (float): Distance a face may move between two followed
+                            frames, relative to its box size
+            min_score (float, optional): Lowest match score that moves a box;
+                                         defaults to Config.TRACK_FOLLOW_MIN_SCORE
+            history (int): Recent frames kept, so templates come from the
+                           frame the results were computed on
+        """
+        self.width = width
+        self.search = search
+        self.min_score = Config.TRACK_FOLLOW_MIN_SCORE if min_score is None else min_score
+        self._frames = deque(maxlen=history)
+        self._results_id = None
+        self._scale = None
+        # Per face: [template, template x, template y, box (x, y, w, h) relative to the template]
+        self._faces = []
+
+    def _grayscale(self, frame):
+        scale = min(1.0, self.width / frame.shape[1])
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return scale, gray
+
+    def _start(self, results, scale, gray):
+        self._scale = scale
+        self._faces = []
+        height, width = gray.shape
+        for result in results:
+            area = result['facial_area']
+            x, y, w, h = (int(round(area[key] * scale)) for key in ('x', 'y', 'w', 'h'))
+            left, top = max(x, 0), max(y, 0)
+            right, bottom = min(x + w, width), min(y + h, height)
+            template = gray[top:bottom, left:right].copy()
+            # Too small or featureless to match reliably: the box stays put
+            if min(template.shape) < 4 or template.std() < 1.0:
+                template = None
+            self._faces.append([template, left, top, (x - left, y - top, w, h)])
+
+    def _match(self, face, gray):
+        template, x, y, (_, _, w, h) = face
+        if template is None:
+            return
+        th, tw = template.shape
+        margin_x, margin_y = int(w * self.search) + 1, int(h * self.search) + 1
+        left, top = max(x - margin_x, 0), max(y - margin_y, 0)
+        region = gray[top:y + th + margin_y, left:x + tw + margin_x]
+        if region.shape[0] < th or region.shape[1] < tw:
+            return
+        _, score, _, (best_x, best_y) = cv2.minMaxLoc(cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED))
+        if score >= self.min_score:
+            face[1], face[2] = left + best_x, top + best_y
+
+    def follow(self, frame_id, frame, latest):
+        """
+        Moves the latest results' boxes to where their faces are in a frame.
+        Call it for every frame shown, in order.
+
+        Args:
+            frame_id (int): Id of the frame, as produced by StagedPipeline
+            frame (numpy.ndarray): BGR frame
+            latest (tuple): (frame_id, timestamp, results) from
+                            StagedPipeline.latest_results, or None
+
+        Returns:
+            list: Copies of the results with facial_area moved to the face's
+                  position in this frame; empty if there are no results yet
+        """
+        scale, gray = self._grayscale(frame)
+        self._frames.append((frame_id, gray))
+        if latest is None:
+            return []
+
+        results_id, _, results = latest
+        if results_id != self._results_id or scale != self._scale:
+            source = next((image for image_id, image in self._frames if image_id == results_id), gray)
+            if source.shape != gray.shape:
+                source = gray
+            self._results_id = results_id
+            self._start(results, scale, source)
+
+        followed = []
+        for result, face in zip(results, self._faces):
+            self._match(face, gray)
+            _, x, y, (dx, dy, w, h) = face
+            area = {key: int(round(value / scale)) for key, value in zip('xywh', (x + dx, y + dy, w, h))}
+            followed.append(dict(result, facial_area=area))
+        return followed
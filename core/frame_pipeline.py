@@ -0,0 +1,447 @@
+import time
+import logging
+from config import Config
+from core.attribute_analyzer import BatchAttributeAnalyzer
+from core.face_tracker import FaceTracker
+from core.identity_cache import IdentityCache
+from core.attribute_scheduler import AttributeScheduler
+from utils.metrics import metrics, stage_histogram
+
+_DETECT_SECONDS = stage_histogram("detect")
+_REPRESENT_SECONDS = stage_histogram("represent")
+_ANALYZE_SECONDS = stage_histogram("analyze")
+_FACES_PER_FRAME = metrics.histogram("faces_per_frame", "Faces detected per analyzed frame")
+_IDENTITY_CACHE_HITS = metrics.counter("identity_cache_total", "Identity cache lookups by result", result="hit")
+_IDENTITY_CACHE_MISSES = metrics.counter("identity_cache_total", result="miss")
+
+
+
+
+class TrackingState:
+    """
+    The per-stream state FramePipeline keeps between frames: the face
+    tracker, the identity cache and the attribute scheduler. Each video
+    stream needs its own; the models are shared.
+    """
+
+    def __init__(self, tracker=None, identity_cache=None, attribute_scheduler=None):
+        self.tracker = tracker or FaceTracker()
+        self.identity_cache = identity_cache or IdentityCache()
+        self.attribute_scheduler = attribute_scheduler or AttributeScheduler()
+        # Ids of tracks whose planned inference has not been applied yet
+        self.pending = set()
+
+
+class FaceModels:
+    """
+    The models run on aligned faces: the embedding model and the attribute
+    models. They keep no per-stream or database state, so they can run in
+    ProcessInferencePool workers while tracking, the identity cache,
+    attribute scheduling and gallery matching stay with the FramePipeline.
+    """
+
+    ATTRIBUTE_ACTIONS = ['age', 'gender', 'race', 'emotion']
+
+    def __init__(self, embedder, attribute_analyzer=None):
+        """
+        Args:
+            embedder: BatchEmbedder or anything with its embed(faces, aligned)
+            attribute_analyzer (BatchAttributeAnalyzer, optional): Shared analyzer instance
+        """
+        self.embedder = embedder
+        self.attribute_analyzer = attribute_analyzer or BatchAttributeAnalyzer(self.ATTRIBUTE_ACTIONS)
+
+    def embed(self, faces):
+        """
+        Embeds several aligned faces with one forward pass.
+
+        Args:
+            faces (list): Aligned faces from extract_faces
+
+        Returns:
+            numpy.ndarray: (N, D) embeddings, or None if embedding failed
+        """
+        try:
+            with _REPRESENT_SECONDS.time():
+                return self.embedder.embed(faces)
+        except Exception as e:
+            logging.error(f"Error in face embedding: {e}")
+            return None
+
+    def analyze_batch(self, faces, regions=None, actions=None):
+        """
+        Predicts age, gender, race and emotion for several aligned faces,
+        running each attribute model once over the whole batch.
+
+        Args:
+            faces (list): Aligned faces from extract_faces
+            regions (list, optional): facial_area dict per face
+            actions (tuple, optional): Subset of attributes to predict; defaults to all
+
+        Returns:
+            list: Analysis dict per face, or None where analysis failed
+        """
+        actions = self.ATTRIBUTE_ACTIONS if actions is None else actions
+        try:
+            with _ANALYZE_SECONDS.time():
+                analyses = self.attribute_analyzer.analyze(faces, actions, regions)
+        except Exception as e:
+            logging.error(f"Error in face analysis: {e}")
+            return [None] * len(faces)
+        return [analysis if self._is_complete(analysis, actions) else None for analysis in analyses]
+
+    @staticmethod
+    def _is_complete(analysis, actions=ATTRIBUTE_ACTIONS):
+        return all(f"dominant_{action}" in analysis if action != 'age' else 'age' in analysis for action in actions)
+
+    def infer(self, faces, regions, embed, groups):
+        """
+        Runs the work of a FramePlan (the arguments are FramePlan.request()).
+
+        Args:
+            faces (list): Aligned faces
+            regions (list): facial_area dict per face
+            embed (list): Indices of the faces to embed
+            groups (list): (actions, indices) pairs: the faces due for the same attributes
+
+        Returns:
+            tuple: (embeddings, analyses) where embeddings has one row per
+                   embedded face (None if there were none or embedding
+                   failed) and analyses holds analyze_batch's list per group
+        """
+        embeddings = self.embed([faces[i] for i in embed]) if embed else None
+        analyses = [
+            self.analyze_batch([faces[i] for i in indices], [regions[i] for i in indices], actions)
+            for actions, indices in groups
+        ]
+        return embeddings, analyses
+
+
+class FramePlan:
+    """
+    The model work FramePipeline.plan() found for a batch of frames: the
+    faces to recognize and the attribute models each face is due for.
+    request() is everything FaceModels.infer needs, so the work can be done
+    in another process and its output handed to FramePipeline.apply().
+    """
+
+    def __init__(self, entries, embed, groups):
+        """
+        Args:
+            entries (list): Per frame, one (state, face, track, now) tuple per face
+            embed (list): Indices into the flattened entries of faces to recognize
+            groups (list): (actions, indices) pairs over the flattened entries
+        """
+        self.entries = entries
+        self.flat = [entry for frame_entries in entries for entry in frame_entries]
+        self.embed = embed
+        self.groups = groups
+        self._released = False
+
+    @property
+    def empty(self):
+        """True if no model has to run for these frames"""
+        return not self.embed and not self.groups
+
+    def request(self):
+        """
+        Returns:
+            tuple: (faces, regions, embed, groups) for FaceModels.infer, with
+                   only the faces that have work and indices into those
+        """
+        used = sorted(set(self.embed).union(*(indices for _, indices in self.groups)))
+        position = {i: n for n, i in enumerate(used)}
+        return (
+            [self.flat[i][1]['face'] for i in used],
+            [self.flat[i][1]['facial_area'] for i in used],
+            [position[i] for i in self.embed],
+            [(actions, [position[i] for i in indices]) for actions, indices in self.groups]
+        )
+
+    def release(self):
+        """
+        Lets the next plan schedule work for this plan's tracks again. Called
+        by FramePipeline.apply(), or directly when the work is given up.
+        """
+        if self._released:
+            return
+        self._released = True
+        for i in set(self.embed).union(*(indices for _, indices in self.groups)):
+            state, _, track, _ = self.flat[i]
+            state.pending.discard(track.track_id)
+
+
+class FramePipeline:
+    """
+    Per-frame face pipeline: faces are detected once per frame, and each
+    aligned face is then fed to both the embedding model and the attribute
+    models. Nothing downstream of detection sees the full frame again, so a
+    frame with N faces costs one detector pass, one batched embedding pass
+    and one batched pass of each attribute model.
+
+    Detections are followed across frames by a FaceTracker. A track's
+    identity comes from the IdentityCache and is only recognized again when
+    the cache asks for re-verification. Which attribute models run for a
+    track is decided by the AttributeScheduler; frozen attributes are
+    re-checked when the track's confidence decays or its identity changes.
+
+    After detection, a frame goes through three steps: plan() tracks the
+    faces and decides which need an embedding or attributes, FaceModels.infer
+    runs those models, and apply() matches the embeddings and folds the
+    results into the tracks. Only infer touches the models, so it can run in
+    worker processes (see ProcessInferencePool) while plan and apply keep
+    the per-stream state here.
+    """
+
+    ATTRIBUTE_ACTIONS = FaceModels.ATTRIBUTE_ACTIONS
+
+    def __init__(self, recognition_manager, detector_backend=None, attribute_analyzer=None, tracker=None,
+                 identity_cache=None, attribute_scheduler=None, detector=None):
+        """
+        Args:
+            recognition_manager (RecognitionManager): Used to embed and match faces
+            detector_backend (str, optional): DeepFace detector; defaults to Config.DETECTOR_BACKEND
+            attribute_analyzer (BatchAttributeAnalyzer, optional): Shared analyzer instance
+            tracker (FaceTracker, optional): Tracker used to follow faces across frames
+            identity_cache (IdentityCache, optional): Per-track recognition cache
+            attribute_scheduler (AttributeScheduler, optional): Per-track attribute scheduling
+            detector (callable, optional): frame -> extract_faces-style results, used
+                                           instead of DeepFace (e.g. core.stub_models.StubDetector)
+        """
+        self.recognition_manager = recognition_manager
+        self.detector_backend = detector_backend or Config.DETECTOR_BACKEND
+        self.models = FaceModels(recognition_manager.embedder, attribute_analyzer)
+        self.state = TrackingState(tracker, identity_cache, attribute_scheduler)
+        self.detector = detector
+
+    @property
+    def attribute_analyzer(self):
+        return self.models.attribute_analyzer
+
+    @property
+    def tracker(self):
+        return self.state.tracker
+
+    @property
+    def identity_cache(self):
+        return self.state.identity_cache
+
+    @property
+    def attribute_scheduler(self):
+        return self.state.attribute_scheduler
+
+    def detect(self, frame):
+        """
+        Detects and aligns every face in a frame.
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+
+        Returns:
+            list: DeepFace.extract_faces results, each with an aligned "face"
+                  array and its "facial_area" in frame coordinates
+        """
+        with _DETECT_SECONDS.time():
+            if self.detector is not None:
+                return self.detector(frame)
+
+            from deepface import DeepFace
+
+            return DeepFace.extract_faces(
+                img_path=frame,
+                detector_backend=self.detector_backend,
+                enforce_detection=False
+            )
+
+    def analyze(self, face):
+        """
+        Predicts age, gender, race and emotion for one aligned face.
+
+        Args:
+            face (numpy.ndarray): Aligned face from extract_faces
+
+        Returns:
+            dict: Analysis for this face, or None if analysis fails
+        """
+        return self.analyze_batch([face])[0]
+
+    def analyze_batch(self, faces, regions=None, actions=None):
+        """
+        Predicts attributes for several aligned faces; see FaceModels.analyze_batch.
+        """
+        return self.models.analyze_batch(faces, regions, actions)
+
+    _is_complete = staticmethod(FaceModels._is_complete)
+
+    def process(self, frame, now=None):
+        """
+        Runs detection and tracking on a frame, then recognition for tracks
+        without a trusted cached identity and the attribute models each
+        track is due for.
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+            now (float, optional): Capture time of the frame; defaults to time.time()
+
+        Returns:
+            list: One dict per face with keys track_id, facial_area, name,
+                  distance, analysis and person_details (None for unknown faces)
+        """
+        return self.process_many([frame], [self.state], [now])[0]
+
+    def process_many(self, frames, states, nows=None):
+        """
+        Processes frames from several streams together: each frame is
+        detected and tracked against its own stream's state, then the faces
+        of all frames that need recognition form one embedding batch, and
+        the faces due for the same attributes form one batch per model.
+
+        Args:
+            frames (list): BGR frames
+            states (list): TrackingState of each frame's stream
+            nows (list, optional): Capture time of each frame; defaults to time.time()
+
+        Returns:
+            list: For each frame, the result list process() would return
+        """
+        return self.process_detections([self.detect(frame) for frame in frames], states, nows)
+
+    def process_detections(self, detections, states, nows=None):
+        """
+        Runs everything after detection in this process: plan(), the models
+        and apply().
+
+        Args:
+            detections (list): detect() results of each frame
+            states (list): TrackingState of each frame's stream
+            nows (list, optional): Capture time of each frame; defaults to time.time()
+
+        Returns:
+            list: For each frame, the result list process() would return
+        """
+        plan = self.plan(detections, states, nows)
+        try:
+            return self.apply(plan, *self.models.infer(*plan.request()))
+        finally:
+            plan.release()
+
+    def plan(self, detections, states, nows=None):
+        """
+        Tracks each frame's faces, serves identities from the cache, and
+        decides which faces need an embedding and which attribute models
+        each face is due for. Tracks that still wait for an earlier plan's
+        results are given no new work, so a face is not sent to the models
+        again while its previous results are on their way.
+
+        Args:
+            detections (list): detect() results of each frame
+            states (list): TrackingState of each frame's stream
+            nows (list, optional): Capture time of each frame; defaults to time.time()
+
+        Returns:
+            FramePlan: The work to run; pass its results to apply(), or call
+                       its release() if they never arrive
+        """
+        nows = nows or [None] * len(detections)
+        # One entry per face: (state, face, track, now)
+        entries = []
+        for faces, state, now in zip(detections, states, nows):
+            now = time.time() if now is None else now
+            _FACES_PER_FRAME.observe(len(faces))
+            tracks = state.tracker.update([face['facial_area'] for face in faces], now)
+            state.identity_cache.evict(state.tracker.lost)
+            state.attribute_scheduler.evict(state.tracker.lost)
+            entries.append([(state, face, track, now) for face, track in zip(faces, tracks)])
+        flat = [entry for frame_entries in entries for entry in frame_entries]
+
+        embed = []
+        # Group faces by the attributes they are due for, so each group is one batch per model
+        groups = {}
+        for i, (state, _, track, now) in enumerate(flat):
+            if track.track_id in state.pending:
+                continue
+            entry = state.identity_cache.lookup(track.track_id, track.box, now)
+            if entry is None:
+                embed.append(i)
+                _IDENTITY_CACHE_MISSES.inc()
+            else:
+                _IDENTITY_CACHE_HITS.inc()
+                track.name, track.distance, track.person_details = entry.name, entry.distance, entry.person_details
+
+            reset = state.tracker.needs_refresh(track, now)
+            actions = state.attribute_scheduler.due(track.track_id, track.person_details, reset, now)
+            if actions:
+                groups.setdefault(actions, []).append(i)
+
+            if entry is None or actions:
+                state.pending.add(track.track_id)
+
+        return FramePlan(entries, embed, list(groups.items()))
+
+    def apply(self, plan, embeddings, analyses):
+        """
+        Matches a plan's embeddings against the gallery and folds its
+        attribute analyses into the tracks, then releases the plan.
+
+        Args:
+            plan (FramePlan): The plan the results belong to
+            embeddings (numpy.ndarray): FaceModels.infer embeddings, None if embedding failed
+            analyses (list): FaceModels.infer analyses, one list per plan group
+
+        Returns:
+            list: For each frame of the plan, the result list process() would return
+        """
+        try:
+            self._apply(plan, embeddings, analyses)
+        finally:
+            plan.release()
+        return [
+            [
+                {
+                    'track_id': track.track_id,
+                    'facial_area': face['facial_area'],
+                    'name': track.name,
+                    'distance': track.distance,
+                    'analysis': track.analysis,
+                    'person_details': track.person_details
+                }
+                for _, face, track, _ in frame_entries
+            ]
+            for frame_entries in plan.entries
+        ]
+
+    def _apply(self, plan, embeddings, analyses):
+        flat = plan.flat
+        if plan.embed:
+            identities = [("Unknown", None)] * len(plan.embed)
+            if embeddings is not None:
+                try:
+                    identities = self.recognition_manager.match_embeddings(embeddings)
+                except Exception as e:
+                    logging.error(f"Error during batch face recognition: {e}")
+            for i, (name, distance) in zip(plan.embed, identities):
+                state, _, track, now = flat[i]
+                # Lost while its results were on their way; caching them would resurrect it
+                if track.track_id not in state.tracker.tracks:
+                    continue
+                person_details = self.recognition_manager.get_person_details(name) if name != "Unknown" else None
+                state.identity_cache.put(track.track_id, name, distance, person_details, track.box, now)
+                if name != track.name:
+                    # The face under the track changed: start its attributes afresh
+                    state.attribute_scheduler.evict([track.track_id])
+                track.name, track.distance, track.person_details = name, distance, person_details
+
+        for (actions, indices), group_analyses in zip(plan.groups, analyses):
+            for i, analysis in zip(indices, group_analyses):
+                state, _, track, now = flat[i]
+                # A failed analysis is retried on the next frame
+                if analysis is None or track.track_id not in state.tracker.tracks:
+                    continue
+                merged = state.attribute_scheduler.update(track.track_id, analysis, actions, track.person_details, now)
+                if merged is not None:
+                    track.analysis = merged
+                # Emotion alone runs every EMOTION_INTERVAL; counting it as a refresh
+                # would keep confidence from ever decaying, so frozen attributes
+                # would never be re-checked
+                if any(action in AttributeScheduler.SLOW_ACTIONS for action in actions):
+                    state.tracker.mark_refreshed(track, now)
@@ -0,0 +1,413 @@
+import os
+import time
+import queue
+import socket
+import struct
+import logging
+import threading
+import cv2
+import numpy as np
+from config import Config
+from core.pipeline_stages import DropOldestQueue
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class FrameSource:
+    """
+    Base class for frame sources with the cv2.VideoCapture interface used by
+    the application (read, isOpened, release, set, get).
+
+    Frames are decoded on a background thread into a small buffer. With
+    `realtime` pacing, frames are released at the source's frame rate and a
+    slow reader gets the newest frames (older ones are dropped, as with a
+    live camera). Without it, frames are decoded as fast as the reader
+    consumes them and none are dropped, which is what benchmarks want.
+
+    Subclasses implement _open, _grab (next frame, or None at the end),
+    _close and optionally _fps.
+    """
+
+    def __init__(self, realtime=True, loop=False, buffer_size=4, read_timeout=5.0):
+        """
+        Args:
+            realtime (bool): Pace frames at the source's frame rate
+            loop (bool): Start over at the end of a finite source
+            buffer_size (int): Decoded frames buffered ahead of the reader
+            read_timeout (float): Seconds read() waits for a frame before failing
+        """
+        self.realtime = realtime
+        self.loop = loop
+        self.read_timeout = read_timeout
+        self._buffer = DropOldestQueue(buffer_size, "decode") if realtime else queue.Queue(buffer_size)
+        self._stop = threading.Event()
+        self._ended = threading.Event()
+        self._opened = self._open()
+        self.frames_decoded = 0
+        self._thread = None
+        if self._opened:
+            self._thread = threading.Thread(target=self._decode_loop, name=type(self).__name__, daemon=True)
+            self._thread.start()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _grab(self):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def _rewind(self):
+        """Restarts a finite source; returns False if it cannot"""
+        return False
+
+    def _fps(self):
+        return None
+
+    def _decode_loop(self):
+        fps = self._fps() if self.realtime else None
+        interval = 1.0 / fps if fps else 0.0
+        next_time = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                frame = self._grab()
+                if frame is None:
+                    if self.loop and self._rewind():
+                        continue
+                    break
+                self.frames_decoded += 1
+
+                if interval:
+                    next_time += interval
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    else:
+                        next_time = time.monotonic()
+
+                if self.realtime:
+                    self._buffer.put(frame)
+                    continue
+                # Without pacing, wait for the reader to catch up rather than drop frames
+                while not self._stop.is_set():
+                    try:
+                        self._buffer.put(frame, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            logging.error(f"Error decoding frames from {type(self).__name__}: {e}")
+        finally:
+            self._ended.set()
+
+    def read(self, timeout=None):
+        """
+        Returns the next frame, waiting for the decoder if needed.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a frame; defaults to
+                                       read_timeout. 0 returns at once, e.g. from a UI thread.
+
+        Returns:
+            tuple: (True, frame), or (False, None) at the end of the source
+                   or if no frame arrived in time
+        """
+        deadline = time.monotonic() + (self.read_timeout if timeout is None else timeout)
+        while self._opened:
+            try:
+                return True, self._buffer.get(timeout=min(0.05, max(deadline - time.monotonic(), 0.0)))
+            except queue.Empty:
+                if self._ended.is_set() and self._buffer.qsize() == 0:
+                    self._opened = False
+                elif time.monotonic() >= deadline:
+                    break
+        return False, None
+
+    def isOpened(self):
+        """
+        Returns:
+            bool: False once the source is released or fully consumed
+        """
+        return self._opened
+
+    def set(self, prop, value):
+        """Sets a capture property; sources without properties ignore it"""
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self._fps() or 0.0)
+        return 0.0
+
+    def release(self):
+        """
+        Stops the decoder thread and closes the source.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        self._opened = False
+        self._close()
+
+
+class _VideoCaptureSource(FrameSource):
+    """Shared implementation for sources backed by cv2.VideoCapture"""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+        self.capture = None
+        super().__init__(**kwargs)
+
+    def _open(self):
+        self.capture = cv2.VideoCapture(self.target)
+        return self.capture.isOpened()
+
+    def _grab(self):
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def _close(self):
+        self.capture.release()
+
+    def set(self, prop, value):
+        # Runs on the caller's thread while the decode thread reads; camera
+        # settings belong in CameraSource(properties=...) instead
+        return self.capture.set(prop, value)
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+
+class CameraSource(_VideoCaptureSource):
+    """
+    Webcam frames. The camera paces itself, so frames are never re-timed;
+    a slow reader always gets the newest frames.
+    """
+
+    def __init__(self, index=None, buffer_size=2, properties=None, **kwargs):
+        """
+        Args:
+            index (int, optional): Camera index; defaults to Config.CAMERA_INDEX
+            properties (dict, optional): cv2.CAP_PROP_* -> value, applied when the
+                                         camera is opened, before any frame is read
+        """
+        self.properties = dict(properties or {})
+        super().__init__(Config.CAMERA_INDEX if index is None else index, buffer_size=buffer_size, **kwargs)
+
+    def _open(self):
+        if not super()._open():
+            return False
+        for prop, value in self.properties.items():
+            if not self.capture.set(prop, value):
+                logging.warning(f"Camera {self.target} does not support property {prop}")
+        return True
+
+    def _fps(self):
+        return None
+
+
+class VideoFileSource(_VideoCaptureSource):
+    """
+    Frames of a recorded video file, paced at its frame rate in realtime mode.
+    """
+
+    def _fps(self):
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        return fps if fps and fps > 0 else 30.0
+
+    def _rewind(self):
+        return self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+
+class ImageDirectorySource(FrameSource):
+    """
+    The images of a directory, in name order, as a frame sequence.
+    """
+
+    def __init__(self, directory, fps=30.0, **kwargs):
+        """
+        Args:
+            directory (str): Directory of images
+            fps (float): Frame rate used in realtime mode
+        """
+        self.directory = directory
+        self.fps = fps
+        self.paths = []
+        self._position = 0
+        super().__init__(**kwargs)
+
+    def _open(self):
+        if not os.path.isdir(self.directory):
+            return False
+        self.paths = [
+            os.path.join(self.directory, name) for name in sorted(os.listdir(self.directory))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        return bool(self.paths)
+
+    def _grab(self):
+        while self._position < len(self.paths):
+            frame = cv2.imread(self.paths[self._position])
+            self._position += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self._position = 0
+        return True
+
+    def _fps(self):
+        return self.fps
+
+
+class LoopbackStreamServer:
+    """
+    Serves the frames of another source over a local TCP socket as
+    length-prefixed JPEGs, standing in for a network camera. Each client
+    connection receives the source's frames until either side closes.
+    """
+
+    def __init__(self, source, host="127.0.0.1", port=0, jpeg_quality=90):
+        """
+        Args:
+            source (FrameSource): Where the served frames come from
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 picks a free port)
+            jpeg_quality (int): JPEG quality of the transmitted frames
+        """
+        self.source = source
+        self.jpeg_quality = jpeg_quality
+        self._socket = socket.create_server((host, port))
+        self.host, self.port = self._socket.getsockname()[:2]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="loopback-server", daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return f"tcp://{self.host}:{self.port}"
+
+    def _serve(self):
+        self._socket.settimeout(0.2)
+        while not self._stop.is_set():
+            try:
+                connection, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with connection:
+                try:
+                    while not self._stop.is_set():
+                        ret, frame = self.source.read()
+                        if not ret:
+                            break
+                        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                        if ok:
+                            connection.sendall(struct.pack(">I", len(encoded)) + encoded.tobytes())
+                except OSError:
+                    pass
+
+    def close(self):
+        self._stop.set()
+        self._socket.close()
+        self._thread.join(2.0)
+        self.source.release()
+
+
+class LoopbackStreamSource(FrameSource):
+    """
+    Client for LoopbackStreamServer: frames arrive as length-prefixed JPEGs
+    over TCP and are decoded on the reader thread. The server paces the
+    stream, so frames are never re-timed; with realtime=False a slow reader
+    holds back the server instead of dropping frames.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, buffer_size=2, **kwargs):
+        self.host = host
+        self.port = port
+        self._connection = None
+        super().__init__(buffer_size=buffer_size, **kwargs)
+
+    def _open(self):
+        try:
+            self._connection = socket.create_connection((self.host, self.port), timeout=self.read_timeout)
+            self._connection.settimeout(None)
+            return True
+        except OSError as e:
+            logging.error(f"Could not connect to {self.host}:{self.port}: {e}")
+            return False
+
+    def _recv_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._connection.recv(size - len(data))
+            if not chunk:
+                return None
+            data.extend(chunk)
+        return bytes(data)
+
+    def _grab(self):
+        try:
+            header = self._recv_exact(4)
+            if header is None:
+                return None
+            payload = self._recv_exact(struct.unpack(">I", header)[0])
+        except OSError:
+            return None
+        if payload is None:
+            return None
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def _close(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._connection.close()
+
+    def release(self):
+        # Close the socket first so a decoder blocked in recv() wakes up
+        self._stop.set()
+        self._close()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        self._opened = False
+
+
+def open_frame_source(spec=None, realtime=None, loop=None, camera_properties=None):
+    """
+    Opens a frame source from a short description.
+
+    Args:
+        spec (int or str, optional): Camera index, video file, image directory,
+            or "tcp://host:port" for a loopback stream. Defaults to
+            Config.FRAME_SOURCE, or Config.CAMERA_INDEX if that is None.
+        realtime (bool, optional): Pace recorded sources at their frame rate;
+            defaults to Config.FRAME_SOURCE_REALTIME
+        loop (bool, optional): Restart recorded sources at the end;
+            defaults to Config.FRAME_SOURCE_LOOP
+        camera_properties (dict, optional): cv2.CAP_PROP_* -> value for a
+            camera source; ignored by other sources
+
+    Returns:
+        FrameSource: The opened source (check isOpened())
+    """
+    spec = Config.FRAME_SOURCE if spec is None else spec
+    spec = Config.CAMERA_INDEX if spec is None else spec
+    realtime = Config.FRAME_SOURCE_REALTIME if realtime is None else realtime
+    loop = Config.FRAME_SOURCE_LOOP if loop is None else loop
+
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec), properties=camera_properties)
+    spec = str(spec)
+    if spec.startswith("tcp://"):
+        host, port = spec[len("tcp://"):].rsplit(":", 1)
+        return LoopbackStreamSource(host, int(port), realtime=realtime)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime=realtime, loop=loop)
+    return VideoFileSource(spec, realtime=realtime, loop=loop)
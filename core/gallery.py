@@ -0,0 +1,783 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+import numpy as np
+from utils.utils import load_embedding, EMBEDDING_DTYPE
+from utils.database_utils import ensure_change_tracking, get_current_revision, fetch_changes, fetch_faces_by_id
+from core.ann_index import IVFIndex, top_k_indices
+
+
+def normalize_embeddings(embeddings):
+    """
+    L2-normalizes one embedding or a matrix of embeddings (one per row).
+
+    Args:
+        embeddings (numpy.ndarray): A (D,) vector or an (N, D) matrix
+
+    Returns:
+        numpy.ndarray: float32 array of the same shape with unit-length rows.
+                       Zero vectors are left as zeros.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def decode_rows(rows):
+    """
+    Decodes (id, name, embedding) rows read from the faces table.
+
+    When every row holds a BLOB of the same size the whole batch is decoded
+    with a single np.frombuffer call; otherwise each row goes through
+    load_embedding, which also accepts the legacy JSON/base64 format.
+
+    Args:
+        rows (list): (id, name, stored embedding) tuples
+
+    Returns:
+        tuple: (ids, names, vectors) with undecodable rows dropped
+    """
+    if rows and all(isinstance(row[2], bytes) for row in rows):
+        sizes = {len(row[2]) for row in rows}
+        if len(sizes) == 1:
+            vectors = np.frombuffer(b"".join(row[2] for row in rows), dtype=EMBEDDING_DTYPE)
+            return [row[0] for row in rows], [row[1] for row in rows], vectors.reshape(len(rows), -1)
+
+    ids, names, vectors = [], [], []
+    for face_id, name, stored_value in rows:
+        embedding = load_embedding(stored_value)
+        if embedding is None:
+            continue
+        embedding = np.ravel(embedding)
+        if vectors and embedding.size != vectors[0].size:
+            logging.warning(f"Skipping face id {face_id}: embedding size {embedding.size} != {vectors[0].size}")
+            continue
+        ids.append(face_id)
+        names.append(name)
+        vectors.append(embedding)
+    return ids, names, vectors
+
+
+class EmbeddingGallery:
+    """
+    Holds every enrolled embedding as one pre-normalized float32 matrix with
+    parallel id and name arrays, so a query is a single matrix-vector product
+    instead of a per-row Python loop.
+
+    The gallery tracks the change-log revision it was loaded at; refresh()
+    applies only the rows inserted, updated or deleted since then, including
+    rows written by other processes. Appends grow the matrix geometrically
+    and deletions are tombstoned, so both cost time proportional to the
+    change rather than to the gallery size.
+
+    An attached ANN index is rebuilt when the gallery first reaches its
+    minimum size and again whenever the rows added after it was built
+    exceed ANN_REBUILD_RATIO of it; until then those rows are scanned
+    exactly. With background=True the rebuild runs on its own thread and
+    the new index is swapped in when it is done.
+    """
+
+    # Rebuild the matrix once this fraction of its rows are tombstones
+    COMPACT_RATIO = 0.25
+    # Rebuild the ANN index once rows added after it exceed this fraction of it
+    ANN_REBUILD_RATIO = 0.2
+
+    def __init__(self, dim=None):
+        self.dim = dim
+        self.db_path = None
+        self.revision = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.names = []
+        self.matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.deleted_count = 0
+        self.ann_index = None
+        self.ann_min_size = 0
+        self._ann_settings = None
+        # Bumped whenever row numbers change, so a build over the old rows is discarded
+        self._ann_generation = 0
+        self._ann_lock = threading.Lock()
+        self._ann_thread = None
+        self._ann_thread_generation = None
+        self._row_by_id = {}
+        self._matrix_buffer = None
+        self._id_buffer = None
+        self._deleted_buffer = None
+
+    def __len__(self):
+        return len(self.ids) - self.deleted_count
+
+    @classmethod
+    def from_database(cls, db_path):
+        """
+        Builds a gallery from every row of the faces table.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+
+        Returns:
+            EmbeddingGallery: The loaded gallery
+        """
+        gallery = cls()
+        gallery.load(db_path)
+        return gallery
+
+    def load(self, db_path):
+        """
+        Replaces the gallery contents with the rows stored in the database.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        with sqlite3.connect(db_path) as conn:
+            ensure_change_tracking(conn)
+            # Read the revision and the rows in one transaction so no change is missed
+            conn.execute("BEGIN")
+            revision = get_current_revision(conn)
+            rows = conn.execute("SELECT id, name, embedding FROM faces ORDER BY id").fetchall()
+            conn.execute("COMMIT")
+
+        self.set_rows(*decode_rows(rows))
+        self.revision = revision
+        logging.info(f"Loaded {len(self)} embeddings into the gallery")
+
+    def set_rows(self, ids, names, vectors):
+        """
+        Replaces the gallery contents with the given rows.
+
+        Args:
+            ids (list): Database ids, one per row
+            names (list): Person names, one per row
+            vectors (list or numpy.ndarray): Raw (un-normalized) embeddings
+        """
+        with self._ann_lock:
+            self._ann_generation += 1
+            self.ann_index = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.names = []
+        self.deleted_count = 0
+        self._row_by_id = {}
+        self._matrix_buffer = self._id_buffer = self._deleted_buffer = None
+        self.matrix = np.empty((0, self.dim or 0), dtype=np.float32)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.add_rows(ids, names, vectors)
+
+    def add_rows(self, ids, names, vectors):
+        """
+        Appends rows to the gallery, growing the backing buffers geometrically.
+
+        Args:
+            ids (list): Database ids, one per row
+            names (list): Person names, one per row
+            vectors (list or numpy.ndarray): Raw (un-normalized) embeddings
+        """
+        if len(ids) == 0:
+            return
+        vectors = normalize_embeddings(np.vstack(vectors) if isinstance(vectors, list) else vectors)
+        start = len(self.ids)
+        end = start + len(vectors)
+        self._reserve(end, vectors.shape[1])
+
+        self._matrix_buffer[start:end] = vectors
+        self._id_buffer[start:end] = ids
+        self._deleted_buffer[start:end] = False
+        self.matrix = self._matrix_buffer[:end]
+        self.ids = self._id_buffer[:end]
+        self.deleted = self._deleted_buffer[:end]
+        self.names.extend(names)
+        self._row_by_id.update(zip(np.asarray(ids).tolist(), range(start, end)))
+        self._maybe_rebuild_ann_index()
+
+    def _reserve(self, size, dim):
+        """Makes sure the buffers can hold `size` rows of dimension `dim`"""
+        if self._matrix_buffer is not None and size <= len(self._matrix_buffer):
+            return
+        count = len(self.ids)
+        capacity = max(size, 2 * count, 16)
+        matrix_buffer = np.empty((capacity, dim), dtype=np.float32)
+        id_buffer = np.empty(capacity, dtype=np.int64)
+        deleted_buffer = np.zeros(capacity, dtype=bool)
+        if count:
+            matrix_buffer[:count] = self.matrix
+            id_buffer[:count] = self.ids
+            deleted_buffer[:count] = self.deleted
+        self._matrix_buffer, self._id_buffer, self._deleted_buffer = matrix_buffer, id_buffer, deleted_buffer
+        self.dim = dim
+
+    def add(self, face_id, name, embedding):
+        """
+        Appends a single embedding to the gallery.
+
+        Args:
+            face_id (int): Database id of the new row
+            name (str): Person name
+            embedding (numpy.ndarray): Raw (un-normalized) embedding
+        """
+        self.add_rows([face_id], [name], np.ravel(embedding)[np.newaxis, :])
+
+    def remove(self, face_id, compact=True):
+        """
+        Removes a row by database id, leaving a tombstone in the matrix.
+
+        Args:
+            face_id (int): Database id of the row
+            compact (bool): Compact right away if there are too many tombstones
+
+        Returns:
+            bool: True if the row was present
+        """
+        row = self._row_by_id.pop(face_id, None)
+        if row is None:
+            return False
+        self.deleted[row] = True
+        self.names[row] = None
+        self.deleted_count += 1
+        if compact:
+            self._maybe_compact()
+        return True
+
+    def _maybe_compact(self):
+        if self.deleted_count and self.deleted_count > self.COMPACT_RATIO * len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """
+        Drops tombstoned rows, rebuilding the ANN index if one was attached.
+        """
+        alive = ~self.deleted
+        names = [name for name, is_deleted in zip(self.names, self.deleted) if not is_deleted]
+        # Row numbers change, so set_rows drops the index and add_rows rebuilds it
+        self.set_rows(self.ids[alive].copy(), names, self.matrix[alive])
+
+    def refresh(self, conn=None):
+        """
+        Applies the rows inserted, updated or deleted since the last load or
+        refresh, reading only the change log and the changed rows.
+
+        Args:
+            conn (sqlite3.Connection, optional): Connection to read through;
+                                                 a temporary one is opened if omitted
+
+        Returns:
+            int: Number of distinct rows that changed
+        """
+        if self.db_path is None:
+            return 0
+
+        own_connection = conn is None
+        if own_connection:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            in_transaction = conn.in_transaction
+            if not in_transaction:
+                conn.execute("BEGIN")
+            changes = fetch_changes(conn, self.revision)
+            face_ids = {face_id for _, face_id, _ in changes}
+            rows = fetch_faces_by_id(conn, face_ids) if face_ids else []
+            if not in_transaction:
+                conn.execute("COMMIT")
+        finally:
+            if own_connection:
+                conn.close()
+
+        if not changes:
+            return 0
+
+        # Every changed id is dropped and, if it still exists, re-added
+        for face_id in face_ids:
+            self.remove(face_id, compact=False)
+        self.add_rows(*decode_rows(rows))
+        self.revision = changes[-1][0]
+        self._maybe_compact()
+        logging.info(f"Applied {len(face_ids)} gallery changes up to revision {self.revision}")
+        return len(face_ids)
+
+    def search(self, embedding, k=1):
+        """
+        Finds the k closest stored embeddings by cosine distance.
+
+        Args:
+            embedding (numpy.ndarray): Query embedding
+            k (int): Number of neighbours to return
+
+        Returns:
+            list: (name, distance) tuples sorted by ascending distance
+        """
+        if len(self) == 0:
+            return []
+
+        query = normalize_embeddings(np.ravel(embedding))
+        return self._format_matches(*self._nearest_rows(query, k))
+
+    def search_batch(self, embeddings, k=1):
+        """
+        Finds the k closest stored embeddings for several queries at once.
+        Without an ANN index this is a single matrix-matrix product.
+
+        Args:
+            embeddings (numpy.ndarray): (Q, D) query embeddings
+            k (int): Number of neighbours to return per query
+
+        Returns:
+            list: One list of (name, distance) tuples per query
+        """
+        queries = normalize_embeddings(np.atleast_2d(embeddings))
+        if len(self) == 0:
+            return [[] for _ in queries]
+        if self.ann_index is not None and len(self.ids) >= self.ann_min_size:
+            return [self._format_matches(*self._nearest_rows(query, k)) for query in queries]
+
+        all_distances = 1.0 - queries @ self.matrix.T
+        if self.deleted_count:
+            all_distances[:, self.deleted] = np.inf
+        matches = []
+        for distances in all_distances:
+            rows = top_k_indices(distances, k)
+            matches.append(self._format_matches(rows, distances[rows]))
+        return matches
+
+    def _format_matches(self, rows, distances):
+        return [
+            (str(self.names[i]), float(distance))
+            for i, distance in zip(rows, distances)
+            if np.isfinite(distance)
+        ]
+
+    def _nearest_rows(self, query, k):
+        """
+        Row indices and cosine distances of the k nearest live rows. Uses the
+        ANN index when one is attached and the gallery is large enough,
+        scanning rows added after the index was built exactly.
+        """
+        excluded = self.deleted if self.deleted_count else None
+        # Read once: a background rebuild may swap in a new index at any time
+        index = self.ann_index
+
+        if index is None or len(self.ids) < self.ann_min_size:
+            all_distances = 1.0 - self.matrix @ query
+            if excluded is not None:
+                all_distances[excluded] = np.inf
+            rows = top_k_indices(all_distances, k)
+            distances = all_distances[rows]
+        else:
+            rows, distances = index.search(self.matrix, query, k, excluded=excluded)
+            indexed = index.size
+            if indexed < len(self.ids):
+                tail_distances = 1.0 - self.matrix[indexed:] @ query
+                if excluded is not None:
+                    tail_distances[excluded[indexed:]] = np.inf
+                rows = np.concatenate([rows, np.arange(indexed, len(self.ids))])
+                distances = np.concatenate([distances, tail_distances])
+            top = top_k_indices(distances, k)
+            rows, distances = rows[top], distances[top]
+
+        return rows, distances
+
+    def attach_ann_index(self, path, nlist=None, nprobe=8, min_size=10000, background=False):
+        """
+        Attaches an IVF index persisted at `path`, building and saving it when
+        it is missing or stale. Galleries smaller than `min_size` keep using
+        exact search until they grow past it.
+
+        Args:
+            path (str): Location of the persisted index
+            nlist (int, optional): Number of IVF cells; defaults to about 4 * sqrt(N)
+            nprobe (int): Number of cells scanned per query
+            min_size (int): Gallery size below which exact search is used
+            background (bool): Build on a background thread, using exact search
+                               until the index is ready
+        """
+        self._ann_settings = {
+            'path': path, 'nlist': nlist, 'nprobe': nprobe, 'min_size': min_size, 'background': background
+        }
+        self.ann_min_size = min_size
+        with self._ann_lock:
+            self._ann_generation += 1
+            self.ann_index = None
+        if len(self.ids) < min_size:
+            return
+
+        if os.path.exists(path):
+            try:
+                index = IVFIndex.load(path, nprobe=nprobe)
+                if index.covers(self.ids) and (nlist is None or index.nlist == nlist):
+                    self.ann_index = index
+            except Exception as e:
+                logging.error(f"Could not load ANN index {path}: {e}")
+
+        # Builds one if none was loaded, or if rows were added since it was saved
+        self._maybe_rebuild_ann_index()
+
+    def _maybe_rebuild_ann_index(self):
+        """
+        Starts an ANN index build when the gallery has reached the minimum
+        size without an index, or has outgrown its index by ANN_REBUILD_RATIO.
+        """
+        settings = self._ann_settings
+        if settings is None or len(self.ids) < settings['min_size']:
+            return
+        index = self.ann_index
+        if index is not None and len(self.ids) - index.size <= self.ANN_REBUILD_RATIO * index.size:
+            return
+        generation = self._ann_generation
+        if self._ann_thread is not None and self._ann_thread.is_alive() and self._ann_thread_generation == generation:
+            return
+
+        # Rows are only appended within a generation, so this prefix stays valid while building
+        args = (self.matrix, self.ids.copy(), generation, settings)
+        if not settings['background']:
+            self._build_ann_index(*args)
+            return
+        self._ann_thread_generation = generation
+        self._ann_thread = threading.Thread(target=self._build_ann_index, args=args, name="ann-index", daemon=True)
+        self._ann_thread.start()
+
+    def _build_ann_index(self, matrix, ids, generation, settings):
+        try:
+            index = IVFIndex(nlist=settings['nlist'], nprobe=settings['nprobe'])
+            index.build(matrix, ids)
+            if generation == self._ann_generation:
+                index.save(settings['path'])
+        except Exception as e:
+            logging.error(f"Could not build ANN index {settings['path']}: {e}")
+            return
+        with self._ann_lock:
+            # Rows were renumbered (e.g. compacted) while building; that change started a new build
+            if generation == self._ann_generation:
+                self.ann_index = index
+
+    def wait_for_ann_index(self, timeout=None):
+        """
+        Waits for a background ANN index build to finish.
+
+        Args:
+            timeout (float, optional): Seconds to wait; None waits until it is done
+
+        Returns:
+            bool: True if an index is attached
+        """
+        thread = self._ann_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ann_index is not None
+
+    def best_match(self, embedding, threshold):
+        """
+        Returns the closest stored person if it is within the threshold.
+
+        Args:
+            embedding (numpy.ndarray): Query embedding
+            threshold (float): Maximum cosine distance accepted as a match
+
+        Returns:
+            tuple: (name, distance) of the best match, or ("Unknown", None)
+        """
+        return self._accept(self.search(embedding, k=1), threshold)
+
+    def best_match_batch(self, embeddings, threshold):
+        """
+        Returns the closest stored person for each of several embeddings.
+
+        Args:
+            embeddings (numpy.ndarray): (Q, D) query embeddings
+            threshold (float): Maximum cosine distance accepted as a match
+
+        Returns:
+            list: (name, distance) per query, or ("Unknown", None) where nothing matches
+        """
+        return [self._accept(matches, threshold) for matches in self.search_batch(embeddings, k=1)]
+
+    @staticmethod
+    def _accept(matches, threshold):
+        if not matches or matches[0][1] > threshold:
+            return "Unknown", None
+        return matches[0]
+
+
+class MemmapGallery(EmbeddingGallery):
+    """
+    Gallery backed by memory-mapped .npy files next to the database so that
+    any number of recognition processes share one copy in the page cache.
+
+    The snapshot consists of a normalized (N, D) float32 matrix, an int64 id
+    array and a fixed-width name array, plus a small JSON index recording the
+    current generation and the change-log revision it was built at. Each
+    rebuild writes a new generation and then swaps the index, so readers
+    never see a half-written file (and files that are still mapped by other
+    processes are never overwritten in place). Changes made after the
+    snapshot are applied on top of it: new rows go to a small in-heap delta
+    and deleted rows are masked out.
+    """
+
+    # Rebuild the snapshot on load once pending changes exceed this fraction of it
+    REBUILD_RATIO = 0.1
+    # Times load() re-reads the index when a concurrent rebuild removed the files it pointed to
+    MAP_ATTEMPTS = 3
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self.base_path = os.path.splitext(db_path)[0] + ".gallery"
+        self.index_path = self.base_path + ".json"
+        self.delta = EmbeddingGallery()
+
+    def __len__(self):
+        return len(self.ids) - self.deleted_count + len(self.delta)
+
+    @classmethod
+    def from_database(cls, db_path):
+        """
+        Opens the snapshot next to the database, building it when it is
+        missing or too far behind the table.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+
+        Returns:
+            MemmapGallery: The opened gallery
+        """
+        gallery = cls(db_path)
+        gallery.load(db_path)
+        return gallery
+
+    def load(self, db_path=None):
+        """
+        Maps the current snapshot and applies the changes made since it was built.
+
+        Args:
+            db_path (str, optional): Ignored; the gallery is bound to its database
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            ensure_change_tracking(conn)
+
+        index = self._read_index()
+        if index is None or "revision" not in index:
+            self.build()
+            index = self._read_index()
+        self._map_current(index)
+        self.refresh()
+
+        pending = len(self.delta) + self.deleted_count
+        if pending > self.REBUILD_RATIO * max(len(self.ids), 1):
+            self.build()
+            self._map_current(self._read_index())
+            self.refresh()
+        logging.info(f"Mapped {len(self.ids)} embeddings (+{len(self.delta)} pending) from {self.base_path}")
+
+    def build(self, chunk_size=65536):
+        """
+        Writes a new snapshot generation from the faces table, streaming rows
+        in chunks so the full table is never held in the heap.
+
+        Args:
+            chunk_size (int): Number of rows decoded per chunk
+        """
+        index = self._read_index()
+        generation = (index["generation"] + 1) if index else 1
+        prefix = f"{self.base_path}.{generation}"
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("BEGIN")
+            revision = get_current_revision(conn)
+            count, max_name_length = conn.execute("SELECT COUNT(*), MAX(LENGTH(name)) FROM faces").fetchone()
+
+            written = 0
+            matrix = ids = names = None
+            cursor = conn.execute("SELECT id, name, embedding FROM faces ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunk_ids, chunk_names, vectors = decode_rows(rows)
+                if not chunk_ids:
+                    continue
+                vectors = normalize_embeddings(np.vstack(vectors) if isinstance(vectors, list) else vectors)
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        prefix + ".npy", mode="w+", dtype=np.float32, shape=(count, vectors.shape[1])
+                    )
+                    ids = np.lib.format.open_memmap(prefix + ".ids.npy", mode="w+", dtype=np.int64, shape=(count,))
+                    names = np.lib.format.open_memmap(
+                        prefix + ".names.npy", mode="w+", dtype=f"<U{max(max_name_length or 1, 1)}", shape=(count,)
+                    )
+                end = written + len(chunk_ids)
+                matrix[written:end] = vectors
+                ids[written:end] = chunk_ids
+                names[written:end] = chunk_names
+                written = end
+            conn.execute("COMMIT")
+
+        for array in (matrix, ids, names):
+            if array is not None:
+                array.flush()
+        del matrix, ids, names
+
+        self._write_index({
+            "generation": generation,
+            "count": written,
+            "revision": revision,
+        })
+        self._remove_old_generations(generation)
+        logging.info(f"Built gallery snapshot generation {generation} with {written} embeddings")
+
+    def add_rows(self, ids, names, vectors):
+        """
+        Adds rows enrolled after the snapshot to the in-heap delta.
+
+        Args:
+            ids (list): Database ids, one per row
+            names (list): Person names, one per row
+            vectors (list or numpy.ndarray): Raw (un-normalized) embeddings
+        """
+        self.delta.add_rows(ids, names, vectors)
+
+    def remove(self, face_id, compact=True):
+        """
+        Removes a row from the delta or masks it out of the snapshot.
+
+        Args:
+            face_id (int): Database id of the row
+            compact (bool): Compact the delta right away if it has too many tombstones
+
+        Returns:
+            bool: True if the row was present
+        """
+        if self.delta.remove(face_id, compact=compact):
+            return True
+        row = int(np.searchsorted(self.ids, face_id))
+        if row < len(self.ids) and self.ids[row] == face_id and not self.deleted[row]:
+            self.deleted[row] = True
+            self.deleted_count += 1
+            return True
+        return False
+
+    def _maybe_compact(self):
+        # The snapshot itself is only rebuilt on load; just keep the delta tidy
+        self.delta._maybe_compact()
+
+    def search(self, embedding, k=1):
+        """
+        Finds the k closest embeddings across the snapshot and the delta.
+
+        Args:
+            embedding (numpy.ndarray): Query embedding
+            k (int): Number of neighbours to return
+
+        Returns:
+            list: (name, distance) tuples sorted by ascending distance
+        """
+        matches = []
+        if len(self.ids) - self.deleted_count > 0:
+            matches = super().search(embedding, k)
+        matches.extend(self.delta.search(embedding, k))
+        return sorted(matches, key=lambda match: match[1])[:k]
+
+    def search_batch(self, embeddings, k=1):
+        """
+        Finds the k closest embeddings across the snapshot and the delta for
+        several queries at once.
+
+        Args:
+            embeddings (numpy.ndarray): (Q, D) query embeddings
+            k (int): Number of neighbours to return per query
+
+        Returns:
+            list: One list of (name, distance) tuples per query
+        """
+        queries = np.atleast_2d(embeddings)
+        snapshot_matches = [[] for _ in queries]
+        if len(self.ids) - self.deleted_count > 0:
+            snapshot_matches = super().search_batch(queries, k)
+        delta_matches = self.delta.search_batch(queries, k)
+        return [
+            sorted(snapshot + delta, key=lambda match: match[1])[:k]
+            for snapshot, delta in zip(snapshot_matches, delta_matches)
+        ]
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, index):
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self.index_path)
+
+    def _map_snapshot(self, index):
+        self.revision = index["revision"]
+        self.delta = EmbeddingGallery()
+        self.deleted_count = 0
+        count = index["count"]
+        if count == 0:
+            self.ids = np.empty(0, dtype=np.int64)
+            self.names = np.empty(0, dtype="<U1")
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        else:
+            prefix = f"{self.base_path}.{index['generation']}"
+            self.matrix = np.load(prefix + ".npy", mmap_mode="r")[:count]
+            self.ids = np.load(prefix + ".ids.npy", mmap_mode="r")[:count]
+            self.names = np.load(prefix + ".names.npy", mmap_mode="r")[:count]
+            self.dim = self.matrix.shape[1]
+        self.deleted = np.zeros(count, dtype=bool)
+
+    def _map_current(self, index):
+        """
+        Maps a snapshot. Rebuilds in other processes delete old generations,
+        so if the files of `index` are already gone, the index is read again
+        and the newer snapshot it points to is mapped instead.
+        """
+        for attempt in range(self.MAP_ATTEMPTS):
+            try:
+                self._map_snapshot(index)
+                return
+            except FileNotFoundError:
+                if attempt == self.MAP_ATTEMPTS - 1:
+                    raise
+                index = self._read_index()
+
+    def _remove_old_generations(self, generation):
+        """
+        Best-effort cleanup of the generations before the previous one. The
+        previous generation is kept until the next rebuild, since another
+        process may have read the old index just before it was replaced and
+        not mapped its files yet. Deleting files another process has already
+        mapped is safe on POSIX: the data stays readable until it unmaps them.
+        """
+        directory = os.path.dirname(self.base_path) or "."
+        stem = os.path.basename(self.base_path) + "."
+        for filename in os.listdir(directory):
+            if not filename.startswith(stem) or not filename.endswith(".npy"):
+                continue
+            file_generation = filename[len(stem):].split(".")[0]
+            if file_generation.isdigit() and int(file_generation) < generation - 1:
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError:
+                    pass
+
+
+def open_gallery(db_path, backend="memory"):
+    """
+    Opens the embedding gallery for a database.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        backend (str): "memory" to load into the process heap or "memmap"
+                       to share a memory-mapped snapshot across processes
+
+    Returns:
+        EmbeddingGallery: The loaded gallery
+    """
+    if backend == "memmap":
+        return MemmapGallery.from_database(db_path)
+    if backend != "memory":
+        raise ValueError(f"Unknown gallery backend: {backend}")
+    return EmbeddingGallery.from_database(db_path)
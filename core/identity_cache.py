@@ -0,0 +1,131 @@
+import math
+import time
+from config import Config
+
+
+class IdentityEntry:
+    """
+    Cached recognition result for one track.
+    """
+
+    __slots__ = ('name', 'distance', 'person_details', 'box', 'verified_at', 'ticks')
+
+    def __init__(self, name, distance, person_details, box, verified_at):
+        self.name = name
+        self.distance = distance
+        self.person_details = person_details
+        self.box = box
+        self.verified_at = verified_at
+        self.ticks = 0
+
+
+class IdentityCache:
+    """
+    Remembers who each track was recognized as, so a tracked face is not
+    embedded, matched and looked up in the database on every tick.
+
+    A cached identity is re-verified (reported as a miss) once it is older
+    than the TTL, after every `reverify_every` lookups, or when the face's
+    box changes size or shape sharply, which usually means the face turned
+    or a different person stepped into the track. "Unknown" is only a
+    failure to match, often from a poor first view of the face or a person
+    enrolled while in view, so it gets a much shorter TTL than a match.
+    Entries are evicted when their tracks are lost.
+    """
+
+    def __init__(self, ttl=None, reverify_every=None, max_box_change=None, unknown_ttl=None):
+        """
+        Args:
+            ttl (float, optional): Seconds an identity is trusted; defaults to Config.IDENTITY_CACHE_TTL
+            reverify_every (int, optional): Lookups between re-verifications (0 disables);
+                                            defaults to Config.IDENTITY_REVERIFY_TICKS
+            max_box_change (float, optional): Relative change in box area or aspect ratio that
+                                              forces re-verification; defaults to Config.IDENTITY_MAX_BOX_CHANGE
+            unknown_ttl (float, optional): Seconds an "Unknown" result is trusted;
+                                           defaults to Config.IDENTITY_UNKNOWN_TTL
+        """
+        self.ttl = Config.IDENTITY_CACHE_TTL if ttl is None else ttl
+        self.reverify_every = Config.IDENTITY_REVERIFY_TICKS if reverify_every is None else reverify_every
+        self.max_box_change = Config.IDENTITY_MAX_BOX_CHANGE if max_box_change is None else max_box_change
+        self.unknown_ttl = Config.IDENTITY_UNKNOWN_TTL if unknown_ttl is None else unknown_ttl
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _box_changed(self, old, new):
+        limit = math.log1p(self.max_box_change)
+        old_area, new_area = max(old[2] * old[3], 1), max(new[2] * new[3], 1)
+        old_aspect, new_aspect = max(old[2], 1) / max(old[3], 1), max(new[2], 1) / max(new[3], 1)
+        return abs(math.log(new_area / old_area)) > limit or abs(math.log(new_aspect / old_aspect)) > limit
+
+    def lookup(self, track_id, box, now=None):
+        """
+        Returns the cached identity for a track if it can still be trusted.
+
+        Args:
+            track_id (int): Track id from FaceTracker
+            box (tuple): The track's current (x, y, w, h) box
+            now (float, optional): Current time; defaults to time.time()
+
+        Returns:
+            IdentityEntry: The cached identity, or None if the track must be recognized
+        """
+        entry = self._entries.get(track_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.time() if now is None else now
+        entry.ticks += 1
+        ttl = self.unknown_ttl if entry.name == "Unknown" else self.ttl
+        if (
+            now - entry.verified_at > ttl
+            or (self.reverify_every and entry.ticks >= self.reverify_every)
+            or self._box_changed(entry.box, box)
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def put(self, track_id, name, distance, person_details, box, now=None):
+        """
+        Stores a fresh recognition result for a track.
+
+        Returns:
+            IdentityEntry: The new entry
+        """
+        now = time.time() if now is None else now
+        entry = IdentityEntry(name, distance, person_details, box, now)
+        self._entries[track_id] = entry
+        return entry
+
+    def evict(self, track_ids):
+        """
+        Drops the entries of tracks that no longer exist.
+
+        Args:
+            track_ids (iterable): Ids of lost tracks
+        """
+        for track_id in track_ids:
+            if self._entries.pop(track_id, None) is not None:
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Entry count, hits, misses, hit rate and evictions
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
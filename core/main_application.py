@@ -1,32 +1,61 @@
 import cv2
 import time
+import queue
 import logging
-import os
-import numpy as np
-from deepface import DeepFace
+from config import Config
 from core.recognition_manager import RecognitionManager
+from core.frame_pipeline import FramePipeline
+from core.face_tracker import BoxFollower
+from core.pipeline_stages import StagedPipeline
+from core.process_pool import ProcessInferencePool
+from core.overlay_renderer import OverlayRenderer
+from core.model_warmup import wait_for_models
+from core.frame_source import open_frame_source
+from utils.metrics import metrics, stage_histogram, start_metrics_server
+from utils.profiling import profiler
+
+_OVERLAY_SECONDS = stage_histogram("overlay")
+_DISPLAY_SECONDS = stage_histogram("display")
+_FRAMES_RENDERED = metrics.counter("frames_total", stage="rendered")
 
 class MainApplication:
-    def __init__(self):
+    def __init__(self, video_capture=None, pipeline=None):
         """
         Initialize the main application components.
-        Sets up the video capture, recognition manager, and display settings.
+        Sets up the frame source (Config.FRAME_SOURCE, by default camera
+        Config.CAMERA_INDEX), recognition manager, and display settings.
+
+        Args:
+            video_capture (FrameSource, optional): Frame source to use instead of the configured one
+            pipeline (FramePipeline, optional): Pipeline to use instead of one built for Config.MODEL_BACKEND
         """
-        # Initialize core components
-        self.recognition_manager = RecognitionManager()
-        self.video_capture = cv2.VideoCapture(0)
-        self.last_analysis_time = time.time()
+        if pipeline is None:
+            if Config.MODEL_BACKEND == "stub":
+                from core.stub_models import build_stub_pipeline
+                pipeline = build_stub_pipeline(Config.DATABASE_PATH)
+            else:
+                # Initialize core components, reusing the models warmed up at startup
+                wait_for_models()
+                pipeline = FramePipeline(RecognitionManager())
+        self.pipeline = pipeline
+        self.recognition_manager = pipeline.recognition_manager
+        self.video_capture = video_capture or open_frame_source()
         
         # Set up display settings
         self.font = cv2.FONT_HERSHEY_DUPLEX  # More modern looking font
+        self.renderer = OverlayRenderer(self.font)
+        # Moves drawn boxes with the faces between analysis ticks
+        self.box_follower = BoxFollower() if Config.TRACK_FOLLOW_BOXES else None
         
         # Verify camera is working
         if not self.video_capture.isOpened():
-            raise RuntimeError("Could not start camera capture")
+            raise RuntimeError("Could not open frame source")
 
     def analyze_face(self, frame):
         """
         Analyzes facial features in a given frame using DeepFace.
+        The recognition loop uses FramePipeline.analyze on aligned faces
+        instead; this runs detection again on the whole frame.
         
         Args:
             frame: The video frame to analyze
@@ -35,6 +64,8 @@ class MainApplication:
             dict: Analysis results including age, gender, race, and emotion
                  or None if analysis fails
         """
+        from deepface import DeepFace
+
         try:
             analysis = DeepFace.analyze(
                 img_path=frame,
@@ -55,8 +86,11 @@ class MainApplication:
             analysis (dict): The face analysis results
             
         Returns:
-            str: Formatted gender string with probability
+            str: Formatted gender string with probability, or marked as
+                 stored when it was taken from the person's stored details
         """
+        if 'gender' in analysis.get('stored_attributes', ()):
+            return f"Gender: {'Female' if analysis['dominant_gender'] == 'Woman' else 'Male'} (stored)"
         if 'gender' in analysis and isinstance(analysis['gender'], dict):
             woman_prob = analysis['gender'].get('Woman', 0)
             man_prob = analysis['gender'].get('Man', 0)
@@ -67,9 +101,23 @@ class MainApplication:
                 return f"Gender: Male ({man_prob:.2f}%)"
         return "Gender: Unknown"
 
+    @staticmethod
+    def format_race(analysis):
+        """
+        Args:
+            analysis (dict): The face analysis results
+
+        Returns:
+            str: Dominant race, marked as stored when it was not predicted
+        """
+        race = analysis['dominant_race'].title()
+        return f"{race} (stored)" if 'race' in analysis.get('stored_attributes', ()) else race
+
     def draw_text_with_background(self, frame, text, position, scale=0.6, color=(255, 255, 0)):
         """
         Draws text with a semi-transparent background for better visibility.
+        Blends only the background's region of the frame; labels drawn in
+        the render loop are batched through self.renderer instead.
         
         Args:
             frame: The frame to draw on
@@ -78,150 +126,160 @@ class MainApplication:
             scale: Font scale factor
             color: Text color in BGR format
         """
-        # Calculate text dimensions
-        (text_width, text_height), baseline = cv2.getTextSize(
-            text, self.font, scale, 1  # Reduced thickness for measurement
-        )
-        
-        # Calculate background rectangle dimensions
-        padding = 5
-        bg_rect_pt1 = (position[0], position[1] - text_height - padding)
-        bg_rect_pt2 = (position[0] + text_width + padding, position[1] + padding)
-        
-        # Draw semi-transparent background
-        overlay = frame.copy()
-        cv2.rectangle(overlay, bg_rect_pt1, bg_rect_pt2, (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.5, frame, 0.5, 0, frame)
+        self.renderer.draw_text_with_background(frame, text, position, scale, color)
+
+    def draw_face_result(self, frame, result):
+        """
+        Queues the bounding box and the stored/predicted details for one face
+        on self.renderer; they are drawn by the next self.renderer.render(frame).
         
-        # Draw text with reduced thickness
-        cv2.putText(
-            frame,
-            text,
-            position,
-            self.font,
-            scale,
-            color,
-            1,  # Reduced thickness for cleaner text
-            cv2.LINE_AA  # Anti-aliasing for smoother text
+        Args:
+            frame: The frame to draw on
+            result (dict): A face result from FramePipeline.process
+        """
+        facial_area = result['facial_area']
+        x = facial_area['x']
+        y = facial_area['y']
+        w = facial_area['w']
+        h = facial_area['h']
+
+        # Draw rectangle around face
+        self.renderer.add_box(
+            (x, y),
+            (x + w, y + h),
+            (0, 255, 0),
+            2
         )
 
+        analysis = result['analysis']
+        if not analysis:
+            return
+
+        line_height = 25
+        person_details = result['person_details']
+
+        if result['name'] != "Unknown":
+            # Person is recognized - show both stored and predicted data
+            if person_details:
+                # Calculate positions for side-by-side display above head
+                left_section_x = x - w//2  # Left section starts half face width to the left
+                right_section_x = x + w//2  # Right section starts half face width to the right
+                text_y_start = y - 120  # Start height above head
+                
+                # Left side - Stored Information (Green)
+                stored_info = [
+                    f"Stored Data:",
+                    f"Name: {person_details['name']}",
+                    f"Age: {person_details['age']}",
+                    f"Gender: {person_details['gender']}",
+                    f"Ethnicity: {person_details['ethnicity'].title()}"
+                ]
+                
+                for i, text in enumerate(stored_info):
+                    self.renderer.add_text(
+                        text,
+                        (left_section_x, text_y_start + (i * line_height)),
+                        color=(0, 255, 0)
+                    )
+
+                # Right side - Predictions (Yellow)
+                predictions = [
+                    "Predictions:",
+                    f"Age: {analysis['age']:.0f}",
+                    f"Gender: {self.format_gender_probability(analysis)}",
+                    f"Race: {self.format_race(analysis)}",
+                    f"Emotion: {analysis['dominant_emotion'].title()}"
+                ]
+                
+                for i, text in enumerate(predictions):
+                    self.renderer.add_text(
+                        text,
+                        (right_section_x, text_y_start + (i * line_height)),
+                        color=(255, 255, 0)
+                    )
+        else:
+            # Unknown person - show only predictions centered above head
+            text_y_start = y - 120
+            center_x = x + w//4  # Center the text above the face
+            
+            predictions = [
+                f"Age: {analysis['age']:.0f}",
+                f"Gender: {self.format_gender_probability(analysis)}",
+                f"Race: {self.format_race(analysis)}",
+                f"Emotion: {analysis['dominant_emotion'].title()}"
+            ]
+            
+            for i, text in enumerate(predictions):
+                self.renderer.add_text(
+                    text,
+                    (center_x, text_y_start + (i * line_height)),
+                    color=(255, 255, 0)
+                )
+
     def run(self):
+        """
+        Runs the render loop. Capture and inference run on their own threads
+        (see StagedPipeline), the latter optionally in Config.INFERENCE_WORKERS
+        worker processes; this loop shows every captured frame with the
+        most recent face results drawn on it, so the display keeps the
+        camera's frame rate however long inference takes. Between results,
+        a BoxFollower keeps the boxes on moving faces.
+        """
+        stages = StagedPipeline(
+            self.video_capture,
+            self.pipeline,
+            analysis_interval=Config.FRAME_ANALYSIS_INTERVAL,
+            render_queue_size=Config.RENDER_QUEUE_SIZE,
+            inference_queue_size=Config.INFERENCE_QUEUE_SIZE,
+            process_pool=ProcessInferencePool(Config.INFERENCE_WORKERS) if Config.INFERENCE_WORKERS > 0 else None
+        )
+        latest = None
+        last_stats_time = time.time()
+        start_metrics_server()
+        stages.start()
         try:
             while True:
-                ret, frame = self.video_capture.read()
-                if not ret:
+                try:
+                    frame_id, _, frame = stages.render_queue.get(timeout=0.1)
+                except queue.Empty:
+                    # A recorded source has been played to the end
+                    if stages.capture_finished:
+                        break
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
                     continue
 
+                # The inference thread may still be reading this frame
+                frame = frame.copy()
+                latest = stages.latest_results(latest)
+                if latest is not None:
+                    with _OVERLAY_SECONDS.time():
+                        results = latest[2]
+                        if self.box_follower is not None:
+                            results = self.box_follower.follow(frame_id, frame, latest)
+                        for result in results:
+                            self.draw_face_result(frame, result)
+                        self.renderer.render(frame)
+
                 current_time = time.time()
-                if current_time - self.last_analysis_time >= 0.5:
-                    try:
-                        faces = DeepFace.extract_faces(
-                            img_path=frame,
-                            enforce_detection=False
-                        )
-                        
-                        for face in faces:
-                            facial_area = face['facial_area']
-                            x = facial_area['x']
-                            y = facial_area['y']
-                            w = facial_area['w']
-                            h = facial_area['h']
-
-                            # Draw rectangle around face
-                            cv2.rectangle(
-                                frame,
-                                (x, y),
-                                (x + w, y + h),
-                                (0, 255, 0),
-                                2
-                            )
-
-                            face_region = frame[y:y+h, x:x+w]
-                            temp_path = "temp_face.jpg"
-                            cv2.imwrite(temp_path, face_region)
-                            
-                            name, confidence = self.recognition_manager.recognize_face(temp_path)
-                            analysis = self.analyze_face(frame)
-                            
-                            if analysis:
-                                line_height = 25
-                                
-                                if name != "Unknown":
-                                    # Person is recognized - show both stored and predicted data
-                                    person_details = self.recognition_manager.get_person_details(name)
-                                    if person_details:
-                                        # Calculate positions for side-by-side display above head
-                                        left_section_x = x - w//2  # Left section starts half face width to the left
-                                        right_section_x = x + w//2  # Right section starts half face width to the right
-                                        text_y_start = y - 120  # Start height above head
-                                        
-                                        # Left side - Stored Information (Green)
-                                        stored_info = [
-                                            f"Stored Data:",
-                                            f"Name: {person_details['name']}",
-                                            f"Age: {person_details['age']}",
-                                            f"Gender: {person_details['gender']}",
-                                            f"Ethnicity: {person_details['ethnicity'].title()}"
-                                        ]
-                                        
-                                        for i, text in enumerate(stored_info):
-                                            self.draw_text_with_background(
-                                                frame, 
-                                                text,
-                                                (left_section_x, text_y_start + (i * line_height)),
-                                                color=(0, 255, 0)
-                                            )
-
-                                        # Right side - Predictions (Yellow)
-                                        predictions = [
-                                            "Predictions:",
-                                            f"Age: {analysis['age']:.0f}",
-                                            f"Gender: {self.format_gender_probability(analysis)}",
-                                            f"Race: {analysis['dominant_race'].title()}",
-                                            f"Emotion: {analysis['dominant_emotion'].title()}"
-                                        ]
-                                        
-                                        for i, text in enumerate(predictions):
-                                            self.draw_text_with_background(
-                                                frame,
-                                                text,
-                                                (right_section_x, text_y_start + (i * line_height)),
-                                                color=(255, 255, 0)
-                                            )
-                                else:
-                                    # Unknown person - show only predictions centered above head
-                                    text_y_start = y - 120
-                                    center_x = x + w//4  # Center the text above the face
-                                    
-                                    predictions = [
-                                        f"Age: {analysis['age']:.0f}",
-                                        f"Gender: {self.format_gender_probability(analysis)}",
-                                        f"Race: {analysis['dominant_race'].title()}",
-                                        f"Emotion: {analysis['dominant_emotion'].title()}"
-                                    ]
-                                    
-                                    for i, text in enumerate(predictions):
-                                        self.draw_text_with_background(
-                                            frame,
-                                            text,
-                                            (center_x, text_y_start + (i * line_height)),
-                                            color=(255, 255, 0)
-                                        )
-
-                    except Exception as e:
-                        logging.error(f"Error in face detection: {e}")
-
-                    self.last_analysis_time = current_time
-
-                cv2.imshow('Face Recognition System', frame)
-
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if Config.PIPELINE_STATS_INTERVAL and current_time - last_stats_time >= Config.PIPELINE_STATS_INTERVAL:
+                    stages.log_stats()
+                    metrics.log_summary()
+                    last_stats_time = current_time
+
+                with _DISPLAY_SECONDS.time():
+                    cv2.imshow('Face Recognition System', frame)
+                    key = cv2.waitKey(1) & 0xFF
+                _FRAMES_RENDERED.inc()
+
+                if key == ord('q'):
                     break
 
         finally:
-            if os.path.exists("temp_face.jpg"):
-                os.remove("temp_face.jpg")
+            stages.stop()
+            profiler.close()
             self.video_capture.release()
+            self.recognition_manager.close()
             cv2.destroyAllWindows()
 
 def test_main_application():
@@ -0,0 +1,64 @@
+import threading
+import logging
+
+_models = {}
+_lock = threading.Lock()
+
+
+def build_model(model_name, task="facial_recognition"):
+    """
+    Builds a DeepFace model once per process and returns the shared instance.
+
+    Works with both DeepFace APIs: newer releases take a `task` argument and
+    return a client object wrapping the Keras model, older releases take only
+    the model name and return the Keras model itself.
+
+    Args:
+        model_name (str): DeepFace model name, e.g. "Facenet" or "Emotion"
+        task (str): "facial_recognition" or "facial_attribute"
+
+    Returns:
+        object: The model as returned by DeepFace.build_model
+    """
+    from deepface import DeepFace
+
+    key = (task, model_name)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            try:
+                model = DeepFace.build_model(model_name=model_name, task=task)
+            except TypeError:
+                model = DeepFace.build_model(model_name)
+            _models[key] = model
+            logging.info(f"Built {model_name} model")
+        return model
+
+
+def keras_model(model):
+    """
+    Returns the underlying Keras model of a DeepFace model.
+
+    Args:
+        model (object): A model returned by build_model
+
+    Returns:
+        keras.Model: The Keras model
+    """
+    return getattr(model, "model", model)
+
+
+def input_size(model):
+    """
+    Returns the (height, width) a DeepFace model expects its input resized to.
+
+    Args:
+        model (object): A model returned by build_model
+
+    Returns:
+        tuple: (height, width)
+    """
+    shape = getattr(model, "input_shape", None)
+    if shape is None or len(shape) != 2:
+        shape = keras_model(model).input_shape[1:3]
+    return int(shape[0]), int(shape[1])
@@ -0,0 +1,161 @@
+import time
+import logging
+import threading
+from config import Config
+
+_active = None
+
+
+class ModelWarmup:
+    """
+    Builds the recognition, detection and attribute models on a background
+    thread and runs one dummy inference through each, so the first real
+    frame does not pay for model loading and TensorFlow graph tracing.
+
+    Models are built through core.model_registry (detectors through
+    DeepFace's own detector cache), so the pipeline that MainApplication
+    creates later reuses the same instances.
+    """
+
+    def __init__(self, model_name=None, detector_backend=None, attribute_actions=None):
+        """
+        Args:
+            model_name (str, optional): Recognition model; defaults to Config.MODEL_NAME
+            detector_backend (str, optional): Face detector; defaults to Config.DETECTOR_BACKEND
+            attribute_actions (list, optional): Attribute models to warm; defaults to
+                                                FramePipeline.ATTRIBUTE_ACTIONS
+        """
+        self.model_name = model_name or Config.MODEL_NAME
+        self.detector_backend = detector_backend or Config.DETECTOR_BACKEND
+        self.attribute_actions = attribute_actions
+        self.timings = {}
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts warming up in a daemon thread and makes this the warm-up that
+        wait_for_models() waits on.
+
+        Returns:
+            ModelWarmup: self
+        """
+        global _active
+        _active = self
+        self._thread = threading.Thread(target=self.run, name="model-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the warm-up to finish.
+
+        Returns:
+            bool: True if it finished within the timeout
+        """
+        return self._done.wait(timeout)
+
+    def _time(self, name, build, infer):
+        """Records build, first (tracing) and second (steady) inference times for one model"""
+        try:
+            start = time.perf_counter()
+            build()
+            built = time.perf_counter()
+            infer()
+            traced = time.perf_counter()
+            infer()
+            steady = time.perf_counter()
+        except Exception as e:
+            logging.error(f"Warm-up of {name} failed: {e}")
+            return
+        self.timings[name] = {
+            'load': built - start,
+            'first_inference': traced - built,
+            'inference': steady - traced,
+        }
+
+    def run(self):
+        """
+        Builds and exercises every model, then logs the timing report.
+        """
+        try:
+            import numpy as np
+            from deepface import DeepFace
+            from core.model_registry import build_model
+            from core.embedding import BatchEmbedder
+            from core.attribute_analyzer import BatchAttributeAnalyzer
+            from core.frame_pipeline import FramePipeline
+
+            started = time.perf_counter()
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            face = np.full((224, 224, 3), 0.5, dtype=np.float32)
+
+            def build_detector():
+                # Older DeepFace releases cannot build detectors directly; they load on first use
+                try:
+                    DeepFace.build_model(model_name=self.detector_backend, task="face_detector")
+                except (TypeError, ValueError):
+                    pass
+
+            self._time(
+                f"detector ({self.detector_backend})",
+                build_detector,
+                lambda: DeepFace.extract_faces(
+                    img_path=frame, detector_backend=self.detector_backend, enforce_detection=False
+                )
+            )
+
+            embedder = BatchEmbedder(self.model_name)
+            self._time(self.model_name, lambda: embedder.model, lambda: embedder.embed([face]))
+
+            analyzer = BatchAttributeAnalyzer()
+            for action in self.attribute_actions or FramePipeline.ATTRIBUTE_ACTIONS:
+                model_name = analyzer.MODEL_NAMES[action]
+                self._time(
+                    model_name,
+                    lambda: build_model(model_name, task="facial_attribute"),
+                    lambda: analyzer.analyze([face], actions=(action,))
+                )
+
+            logging.info(self.report(time.perf_counter() - started))
+        except Exception as e:
+            logging.error(f"Model warm-up failed: {e}")
+        finally:
+            self._done.set()
+
+    def report(self, total=None):
+        """
+        Returns:
+            str: Per-model load, first-inference and steady inference times
+        """
+        lines = ["Model warm-up:"]
+        for name, timing in self.timings.items():
+            lines.append(
+                f"  {name:<20} load {timing['load']:6.2f}s  first inference {timing['first_inference']:6.2f}s  "
+                f"inference {timing['inference'] * 1000:7.1f}ms"
+            )
+        if total is not None:
+            lines.append(f"  total {total:.2f}s")
+        return "\n".join(lines)
+
+
+def wait_for_models(timeout=None):
+    """
+    Waits for the warm-up started by ModelWarmup.start(), if there is one,
+    so callers reuse the warmed models instead of building them concurrently.
+
+    Args:
+        timeout (float, optional): Seconds to wait; None waits until done
+
+    Returns:
+        bool: True if no warm-up is pending
+    """
+    if _active is None:
+        return True
+    if not _active.done:
+        logging.info("Waiting for model warm-up to finish")
+    return _active.wait(timeout)
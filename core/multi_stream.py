@@ -0,0 +1,287 @@
+"""
+Runs face recognition on several video streams with one set of models.
+
+Usage:
+    python -m core.multi_stream 0 recording.mp4 tcp://127.0.0.1:9000 --priorities 2 1 1 --max-fps 0 5 5
+"""
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+import numpy as np
+from config import Config
+from core.frame_pipeline import TrackingState
+from utils.profiling import profiler
+
+
+class Stream:
+    """
+    One video stream: its frame source, its own tracking state, the newest
+    captured frame, its latest results and its metrics.
+    """
+
+    def __init__(self, name, source, priority=1.0, max_fps=None, window=100):
+        """
+        Args:
+            name (str): Name used in results and metrics
+            source: FrameSource or other object with cv2.VideoCapture-style read()
+            priority (float): Share of inference this stream gets relative to the others
+            max_fps (float, optional): Upper limit on frames processed per second (None = no limit)
+            window (int): Frames kept for the rolling fps and latency metrics
+        """
+        if priority <= 0:
+            raise ValueError("Stream priority must be positive")
+        self.name = name
+        self.source = source
+        self.priority = priority
+        self.max_fps = max_fps or None
+        self.state = TrackingState()
+
+        self.latest = None  # (frame_id, capture time, frame) waiting for inference
+        self.results = None  # (frame_id, capture time, results) of the last processed frame
+        self.ended = False
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.latencies = deque(maxlen=window)
+        self.processed_at = deque(maxlen=window)
+
+        # Scheduling: stride-scheduling pass value and earliest time allowed by max_fps
+        self.pass_value = 0.0
+        self.next_due = 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict: Frame counters, rolling fps and capture-to-result latency percentiles (ms)
+        """
+        fps = 0.0
+        if len(self.processed_at) > 1:
+            span = self.processed_at[-1] - self.processed_at[0]
+            fps = (len(self.processed_at) - 1) / span if span > 0 else 0.0
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            'priority': self.priority,
+            'max_fps': self.max_fps,
+            'captured': self.frames_captured,
+            'processed': self.frames_processed,
+            'skipped': self.frames_skipped,
+            'fps': fps,
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p95_ms': float(np.percentile(latencies, 95)),
+        }
+
+
+class MultiStreamRunner:
+    """
+    Shares one FramePipeline (one detector, embedding model and set of
+    attribute models) across several streams.
+
+    A capture thread per stream keeps only its newest frame. A single
+    inference thread repeatedly picks up to `max_batch_frames` streams with
+    a new frame, using stride scheduling: each pick advances a stream's
+    pass value by 1 / priority and the lowest pass values go first. A
+    stream whose pass value is a full stride of the highest-priority ready
+    stream ahead of the lowest one sits the batch out, even when the batch
+    has room, so over time each stream gets inference in proportion to its
+    priority however many streams fit in a batch. Streams are skipped until
+    their max_fps interval has passed. The frames picked together go
+    through FramePipeline.process_many, which embeds and analyzes the faces
+    of all of them in shared batches.
+    """
+
+    def __init__(self, frame_pipeline, max_batch_frames=None):
+        """
+        Args:
+            frame_pipeline (FramePipeline): Pipeline whose models all streams share
+            max_batch_frames (int, optional): Frames processed together;
+                                              defaults to Config.MULTI_STREAM_BATCH_FRAMES
+        """
+        self.frame_pipeline = frame_pipeline
+        self.max_batch_frames = max_batch_frames or Config.MULTI_STREAM_BATCH_FRAMES
+        self.streams = []
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._virtual_time = 0.0
+
+    def add_stream(self, name, source, priority=1.0, max_fps=None):
+        """
+        Adds a stream; call before start().
+
+        Returns:
+            Stream: The new stream
+        """
+        stream = Stream(name, source, priority, max_fps)
+        self.streams.append(stream)
+        return stream
+
+    def start(self):
+        """
+        Starts one capture thread per stream and the inference thread.
+        """
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, args=(stream,), name=f"capture-{stream.name}", daemon=True)
+            for stream in self.streams
+        ]
+        self._threads.append(threading.Thread(target=self._inference_loop, name="inference", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """
+        Stops all threads and releases the sources.
+        """
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        for stream in self.streams:
+            stream.source.release()
+
+    @property
+    def finished(self):
+        """True once every source has ended and its last frame was processed"""
+        return all(stream.ended and stream.latest is None for stream in self.streams)
+
+    def _capture_loop(self, stream):
+        frame_id = 0
+        while not self._stop.is_set():
+            ret, frame = stream.source.read()
+            if not ret:
+                if not stream.source.isOpened():
+                    break
+                time.sleep(0.01)
+                continue
+            frame_id += 1
+            with self._condition:
+                if stream.latest is not None:
+                    stream.frames_skipped += 1
+                stream.latest = (frame_id, time.time(), frame)
+                stream.frames_captured += 1
+                self._condition.notify()
+        with self._condition:
+            stream.ended = True
+            self._condition.notify()
+
+    def _select(self, now):
+        """
+        Takes the newest frame from up to max_batch_frames eligible streams.
+        Must be called with self._condition held.
+
+        Returns:
+            list: (stream, frame_id, capture time, frame) tuples
+        """
+        ready = [stream for stream in self.streams if stream.latest is not None and now >= stream.next_due]
+        # A stream that was idle or rate-limited rejoins at the current virtual time instead of catching up
+        for stream in ready:
+            stream.pass_value = max(stream.pass_value, self._virtual_time)
+        ready.sort(key=lambda stream: stream.pass_value)
+        if ready:
+            # Streams a whole stride ahead wait, or every ready stream would run each batch
+            horizon = ready[0].pass_value + 1.0 / max(stream.priority for stream in ready)
+            ready = [stream for stream in ready if stream.pass_value < horizon - 1e-9]
+
+        selected = []
+        for stream in ready[:self.max_batch_frames]:
+            self._virtual_time = stream.pass_value
+            stream.pass_value += 1.0 / stream.priority
+            if stream.max_fps:
+                stream.next_due = now + 1.0 / stream.max_fps
+            selected.append((stream,) + stream.latest)
+            stream.latest = None
+        return selected
+
+    def _next_due(self, now):
+        """Seconds until a rate-limited stream with a pending frame becomes eligible"""
+        waits = [stream.next_due - now for stream in self.streams if stream.latest is not None]
+        return max(min(waits), 0.001) if waits else 0.1
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            with self._condition:
+                now = time.time()
+                selected = self._select(now)
+                if not selected:
+                    self._condition.wait(self._next_due(now))
+                    continue
+
+            streams = [item[0] for item in selected]
+            try:
+                with profiler.tick():
+                    results = self.frame_pipeline.process_many(
+                        [item[3] for item in selected],
+                        [stream.state for stream in streams],
+                        [item[2] for item in selected]
+                    )
+            except Exception as e:
+                logging.error(f"Error in multi-stream inference: {e}")
+                results = [[] for _ in selected]
+
+            done = time.time()
+            for (stream, frame_id, captured_at, _), frame_results in zip(selected, results):
+                stream.results = (frame_id, captured_at, frame_results)
+                stream.frames_processed += 1
+                stream.latencies.append(done - captured_at)
+                stream.processed_at.append(done)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per-stream metrics keyed by stream name
+        """
+        return {stream.name: stream.stats() for stream in self.streams}
+
+    def log_stats(self):
+        """
+        Logs one line of metrics per stream.
+        """
+        for name, stats in self.stats().items():
+            logging.info(
+                f"Stream {name}: {stats['fps']:.1f} fps, latency p50 {stats['latency_p50_ms']:.0f} ms "
+                f"p95 {stats['latency_p95_ms']:.0f} ms, processed {stats['processed']}, "
+                f"skipped {stats['skipped']} (priority {stats['priority']}, max fps {stats['max_fps']})"
+            )
+
+
+def main(argv=None):
+    from core.frame_source import open_frame_source
+    from core.frame_pipeline import FramePipeline
+    from core.recognition_manager import RecognitionManager
+
+    parser = argparse.ArgumentParser(description="Face recognition on several streams with shared models")
+    parser.add_argument("sources", nargs="+", help="Camera indexes, video files, image directories or tcp://host:port")
+    parser.add_argument("--priorities", type=float, nargs="*", default=[], help="Priority per source (default 1)")
+    parser.add_argument("--max-fps", type=float, nargs="*", default=[], help="Max fps per source (0 = unlimited)")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run (default: until all sources end)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=Config.LOG_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s')
+    runner = MultiStreamRunner(FramePipeline(RecognitionManager(Config.DATABASE_PATH, Config.MODEL_NAME)))
+    for i, spec in enumerate(args.sources):
+        priority = args.priorities[i] if i < len(args.priorities) else 1.0
+        max_fps = args.max_fps[i] if i < len(args.max_fps) else None
+        runner.add_stream(f"{i}:{spec}", open_frame_source(spec), priority, max_fps)
+
+    start = time.time()
+    last_log = start
+    runner.start()
+    try:
+        while not runner.finished and (args.duration is None or time.time() - start < args.duration):
+            time.sleep(0.1)
+            if Config.PIPELINE_STATS_INTERVAL and time.time() - last_log >= Config.PIPELINE_STATS_INTERVAL:
+                runner.log_stats()
+                last_log = time.time()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        runner.log_stats()
+        profiler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import cv2
+import numpy as np
+from collections import OrderedDict
+
+
+class OverlayRenderer:
+    """
+    Draws face boxes and text labels with semi-transparent backgrounds.
+
+    Labels are queued during a frame and composited in one pass by render():
+    boxes first, then every label background, then every label's text. Only
+    the pixels under each background are blended, instead of copying and
+    blending the whole frame per label. Text is rasterized once per
+    (text, scale, color) into a cached sprite and alpha-blended into the
+    frame afterwards. Everything is clipped at the frame edges.
+    """
+
+    # Anti-aliased glyphs can bleed a pixel or two past getTextSize's box
+    SPRITE_MARGIN = 2
+
+    def __init__(self, font=cv2.FONT_HERSHEY_DUPLEX, padding=5, alpha=0.5, cache_size=512):
+        """
+        Args:
+            font (int): OpenCV font face
+            padding (int): Background padding around the text, in pixels
+            alpha (float): Weight of the original pixels under a background
+            cache_size (int): Text sprites kept (least recently used are dropped)
+        """
+        self.font = font
+        self.padding = padding
+        self.alpha = alpha
+        self.cache_size = cache_size
+        self._sprites = OrderedDict()
+        self._boxes = []
+        self._labels = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _sprite(self, text, scale, color):
+        """Returns (text_width, text_height, alpha, premultiplied color) for a label, cached"""
+        key = (text, scale, color)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.cache_hits += 1
+            return sprite
+
+        self.cache_misses += 1
+        (text_width, text_height), baseline = cv2.getTextSize(text, self.font, scale, 1)
+        margin = self.SPRITE_MARGIN
+        mask = np.zeros((text_height + baseline + 2 * margin, text_width + 2 * margin), dtype=np.uint8)
+        cv2.putText(mask, text, (margin, text_height + margin), self.font, scale, 255, 1, cv2.LINE_AA)
+
+        alpha = (mask.astype(np.float32) / 255.0)[:, :, np.newaxis]
+        premultiplied = alpha * np.asarray(color, dtype=np.float32)
+        sprite = (text_width, text_height, alpha, premultiplied)
+
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.cache_size:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def _clip(frame, x1, y1, x2, y2):
+        """Clips a half-open rectangle to the frame; returns None if nothing is left"""
+        height, width = frame.shape[:2]
+        cx1, cy1, cx2, cy2 = max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+        if cx1 >= cx2 or cy1 >= cy2:
+            return None
+        return cx1, cy1, cx2, cy2
+
+    def add_box(self, pt1, pt2, color=(0, 255, 0), thickness=2):
+        """
+        Queues a rectangle outline.
+        """
+        self._boxes.append((pt1, pt2, color, thickness))
+
+    def add_text(self, text, position, scale=0.6, color=(255, 255, 0)):
+        """
+        Queues a text label with a semi-transparent background.
+
+        Args:
+            text (str): Text to display
+            position (tuple): (x, y) of the text baseline start
+            scale (float): Font scale factor
+            color (tuple): Text color in BGR format
+        """
+        self._labels.append((text, (int(position[0]), int(position[1])), scale, tuple(color)))
+
+    def render(self, frame):
+        """
+        Composites everything queued since the last render onto the frame.
+
+        Args:
+            frame (numpy.ndarray): BGR frame, modified in place
+        """
+        for pt1, pt2, color, thickness in self._boxes:
+            cv2.rectangle(frame, pt1, pt2, color, thickness)
+
+        sprites = [(self._sprite(text, scale, color), position) for text, position, scale, color in self._labels]
+
+        padding = self.padding
+        for (text_width, text_height, _, _), (x, y) in sprites:
+            # Same area cv2.rectangle fills between the corner points (inclusive)
+            area = self._clip(frame, x, y - text_height - padding, x + text_width + padding + 1, y + padding + 1)
+            if area is None:
+                continue
+            x1, y1, x2, y2 = area
+            roi = frame[y1:y2, x1:x2]
+            cv2.addWeighted(np.zeros_like(roi), 1 - self.alpha, roi, self.alpha, 0, roi)
+
+        margin = self.SPRITE_MARGIN
+        for (_, text_height, alpha, premultiplied), (x, y) in sprites:
+            left, top = x - margin, y - text_height - margin
+            area = self._clip(frame, left, top, left + alpha.shape[1], top + alpha.shape[0])
+            if area is None:
+                continue
+            x1, y1, x2, y2 = area
+            sy, sx = slice(y1 - top, y2 - top), slice(x1 - left, x2 - left)
+            roi = frame[y1:y2, x1:x2]
+            blended = roi * (1.0 - alpha[sy, sx]) + premultiplied[sy, sx]
+            np.rint(blended, out=blended)
+            roi[...] = blended
+
+        self._boxes = []
+        self._labels = []
+
+    def draw_text_with_background(self, frame, text, position, scale=0.6, color=(255, 255, 0)):
+        """
+        Draws a single label immediately; see add_text.
+        """
+        pending = self._boxes, self._labels
+        self._boxes, self._labels = [], []
+        self.add_text(text, position, scale, color)
+        self.render(frame)
+        self._boxes, self._labels = pending
@@ -0,0 +1,325 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from utils.metrics import metrics, stage_histogram
+from utils.profiling import profiler
+
+_CAPTURE_SECONDS = stage_histogram("capture")
+_INFERENCE_SECONDS = stage_histogram("inference")
+_FRAMES_CAPTURED = metrics.counter("frames_total", "Frames handled by each pipeline stage", stage="captured")
+_FRAMES_ANALYZED = metrics.counter("frames_total", stage="analyzed")
+
+
+class DropOldestQueue:
+    """
+    Bounded queue that never blocks producers: when it is full, putting a new
+    item discards the oldest one. Keeps counters so queue depth and drops
+    can be reported per stage.
+    """
+
+    def __init__(self, maxsize, name="queue"):
+        """
+        Args:
+            maxsize (int): Maximum number of items held
+            name (str): Name used in stats and logs
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self._items = deque()
+        self._condition = threading.Condition()
+        self.puts = 0
+        self.drops = 0
+
+    def put(self, item):
+        """
+        Adds an item, dropping the oldest one if the queue is full.
+
+        Args:
+            item: The item to add
+        """
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.drops += 1
+            self._items.append(item)
+            self.puts += 1
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Removes and returns the oldest item, waiting up to `timeout` seconds.
+
+        Args:
+            timeout (float, optional): Seconds to wait; None waits forever
+
+        Returns:
+            The item
+
+        Raises:
+            queue.Empty: If no item arrived in time
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._items.popleft()
+
+    def qsize(self):
+        with self._condition:
+            return len(self._items)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Current depth, capacity, and total puts and drops
+        """
+        with self._condition:
+            return {'depth': len(self._items), 'maxsize': self.maxsize, 'puts': self.puts, 'drops': self.drops}
+
+
+class StagedPipeline:
+    """
+    Runs the recognition loop as three stages connected by bounded queues:
+
+    - a capture thread that reads frames as fast as the camera delivers them
+      and publishes each one to the render queue and to the inference queue,
+    - an inference thread that processes the newest frame at most once per
+      analysis interval and publishes its face results,
+    - the render loop (the caller's thread, since OpenCV windows must be
+      driven from one thread) that draws the latest results on every frame.
+
+    Every queue drops its oldest item when full, so a slow stage never makes
+    an upstream stage wait and never works on a stale frame. The inference
+    queue holds a single frame, so inference always sees the newest one.
+
+    With a process pool, the inference thread detects and tracks faces
+    itself and leaves the embedding and attribute models to the workers;
+    see _pool_inference_loop.
+    """
+
+    def __init__(self, video_capture, frame_pipeline, analysis_interval=0.5, render_queue_size=2, inference_queue_size=1,
+                 process_pool=None):
+        """
+        Args:
+            video_capture: FrameSource or other object with cv2.VideoCapture-style read() and isOpened()
+            frame_pipeline (FramePipeline): Runs detection, recognition and analysis
+            analysis_interval (float): Minimum seconds between inference runs; not
+                used with a process pool, which takes a frame whenever a slot is free
+            render_queue_size (int): Frames buffered for display
+            inference_queue_size (int): Frames buffered for inference
+            process_pool (ProcessInferencePool, optional): Runs the embedding and
+                attribute models in worker processes; frame_pipeline then
+                detects, tracks and matches faces here, in frame order
+        """
+        self.video_capture = video_capture
+        self.frame_pipeline = frame_pipeline
+        self.process_pool = process_pool
+        self.analysis_interval = analysis_interval
+        self.render_queue = DropOldestQueue(render_queue_size, "render")
+        self.inference_queue = DropOldestQueue(inference_queue_size, "inference")
+        self.result_queue = DropOldestQueue(1, "results")
+
+        self._stop = threading.Event()
+        self._capture_ended = threading.Event()
+        self._threads = []
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.frames_analyzed = 0
+        self.last_inference_seconds = 0.0
+        self.pool_drops = 0
+
+    def start(self):
+        """
+        Starts the capture and inference threads.
+        """
+        self._stop.clear()
+        inference_loop = self._inference_loop if self.process_pool is None else self._pool_inference_loop
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=inference_loop, name="inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """
+        Signals the stage threads to stop and waits for them.
+
+        Args:
+            timeout (float): Seconds to wait for each thread
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        if self.process_pool is not None:
+            self.process_pool.close()
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    @property
+    def capture_finished(self):
+        """True once the source has ended and every captured frame was rendered"""
+        return self._capture_ended.is_set() and self.render_queue.qsize() == 0
+
+    def _capture_loop(self):
+        frame_id = 0
+        while not self._stop.is_set():
+            with _CAPTURE_SECONDS.time():
+                ret, frame = self.video_capture.read()
+            if not ret:
+                if not self.video_capture.isOpened():
+                    break
+                self.read_failures += 1
+                time.sleep(0.01)
+                continue
+            frame_id += 1
+            self.frames_captured += 1
+            _FRAMES_CAPTURED.inc()
+            item = (frame_id, time.time(), frame)
+            self.render_queue.put(item)
+            self.inference_queue.put(item)
+        self._capture_ended.set()
+
+    def _inference_loop(self):
+        last_run = 0.0
+        while not self._stop.is_set():
+            wait = self.analysis_interval - (time.monotonic() - last_run)
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            try:
+                frame_id, timestamp, frame = self.inference_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            last_run = time.monotonic()
+            try:
+                with profiler.tick():
+                    results = self.frame_pipeline.process(frame, timestamp)
+            except Exception as e:
+                logging.error(f"Error in face detection: {e}")
+                results = []
+            self.last_inference_seconds = time.monotonic() - last_run
+            self.frames_analyzed += 1
+            _INFERENCE_SECONDS.observe(self.last_inference_seconds)
+            _FRAMES_ANALYZED.inc()
+            self.result_queue.put((frame_id, timestamp, results))
+
+    def _pool_inference_loop(self):
+        """
+        Detects faces in the newest frame and plans their model work here,
+        then ships the crops that need an embedding or attributes to the
+        worker processes, taking a new frame whenever a ring slot is free.
+        Frames are finished in frame order (a frame with no model work as
+        soon as the frames before it are), so this process's tracker,
+        identity cache and attribute scheduler see every analyzed frame in
+        order. While every slot is busy, new frames wait in the inference
+        queue, which keeps only the newest.
+        """
+        state = self.frame_pipeline.state
+        # (frame_id, timestamp, plan, seq) in frame order; seq is None for frames without model work
+        waiting = deque()
+        outputs = {}
+        while not self._stop.is_set():
+            for seq, output in self.process_pool.collect(timeout=0.005):
+                outputs[seq] = output
+            while waiting and (waiting[0][3] is None or waiting[0][3] in outputs):
+                frame_id, timestamp, plan, seq = waiting.popleft()
+                self._finish_pool_frame(frame_id, timestamp, plan, outputs.pop(seq) if seq is not None else (None, []))
+
+            if self.process_pool.in_flight >= self.process_pool.slots:
+                continue
+            try:
+                frame_id, timestamp, frame = self.inference_queue.get(timeout=0 if waiting else 0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                with profiler.tick():
+                    plan = self.frame_pipeline.plan([self.frame_pipeline.detect(frame)], [state], [timestamp])
+            except Exception as e:
+                logging.error(f"Error in face detection: {e}")
+                continue
+
+            seq = None
+            if not plan.empty:
+                try:
+                    seq = self.process_pool.submit(*plan.request())
+                except Exception as e:
+                    logging.error(f"Error sending faces to the inference workers: {e}")
+                if seq is None:
+                    plan.release()
+                    self.pool_drops += 1
+                    continue
+            waiting.append((frame_id, timestamp, plan, seq))
+
+    def _finish_pool_frame(self, frame_id, timestamp, plan, output):
+        # The pool gave up on this frame (its worker failed, died or stalled)
+        if output is None:
+            plan.release()
+            return
+        try:
+            with profiler.tick():
+                results = self.frame_pipeline.apply(plan, *output)[0]
+        except Exception as e:
+            logging.error(f"Error in face recognition: {e}")
+            results = []
+        self.frames_analyzed += 1
+        self.last_inference_seconds = time.time() - timestamp
+        _INFERENCE_SECONDS.observe(self.last_inference_seconds)
+        _FRAMES_ANALYZED.inc()
+        self.result_queue.put((frame_id, timestamp, results))
+
+    def latest_results(self, previous=None):
+        """
+        Returns the newest inference results without blocking.
+
+        Args:
+            previous: Value returned when no new results are ready
+
+        Returns:
+            tuple: (frame_id, timestamp, results) or `previous`
+        """
+        try:
+            return self.result_queue.get(timeout=0)
+        except queue.Empty:
+            return previous
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per-stage queue depth and drop counts plus frame counters
+        """
+        identity_cache = getattr(self.frame_pipeline, 'identity_cache', None)
+        return {
+            'queues': {q.name: q.stats() for q in (self.render_queue, self.inference_queue, self.result_queue)},
+            'frames_captured': self.frames_captured,
+            'frames_analyzed': self.frames_analyzed,
+            'read_failures': self.read_failures,
+            'last_inference_seconds': self.last_inference_seconds,
+            'pool_drops': self.pool_drops,
+            'identity_cache': identity_cache.stats() if identity_cache is not None else None,
+        }
+
+    def log_stats(self):
+        """
+        Logs a one-line summary of the stage queues.
+        """
+        stats = self.stats()
+        queues = ", ".join(
+            f"{name} depth {q['depth']}/{q['maxsize']} dropped {q['drops']}"
+            for name, q in stats['queues'].items()
+        )
+        logging.info(
+            f"Pipeline: captured {stats['frames_captured']}, analyzed {stats['frames_analyzed']}, "
+            f"last inference {stats['last_inference_seconds'] * 1000:.0f} ms; {queues}"
+        )
+        cache = stats['identity_cache']
+        if cache:
+            logging.info(
+                f"Identity cache: {cache['hits']} hits, {cache['misses']} misses "
+                f"({cache['hit_rate']:.0%} of recognitions saved), {cache['size']} tracks"
+            )
@@ -0,0 +1,335 @@
+import time
+import queue
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from config import Config
+from utils.profiling import profiler
+
+
+def build_face_models():
+    """
+    Default per-worker factory: each worker process loads its own embedding
+    and attribute models. Workers need no detector and no database.
+
+    Returns:
+        FaceModels: Models for the configured backend
+    """
+    if Config.MODEL_BACKEND == "stub":
+        from core.stub_models import build_stub_models
+        return build_stub_models()
+
+    from core.embedding import BatchEmbedder
+    from core.frame_pipeline import FaceModels
+    return FaceModels(BatchEmbedder(Config.MODEL_NAME))
+
+
+class SharedFaceRing:
+    """
+    Fixed number of byte slots in one shared memory block. The parent packs
+    the face crops of one request into a free slot as uint8 and sends
+    workers only the slot number and the crop shapes, so faces are normally
+    never pickled.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        """
+        Args:
+            slots (int): Number of slots
+            slot_bytes (int): Size of one slot
+            name (str, optional): Attach to an existing block instead of creating one
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=slots * slot_bytes)
+        self.buffer = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @staticmethod
+    def nbytes(faces):
+        return sum(face.size for face in faces)
+
+    def write(self, slot, faces):
+        """
+        Packs faces into a slot.
+
+        Args:
+            slot (int): Slot number
+            faces (list): Aligned faces (RGB floats in [0, 1], or uint8)
+
+        Returns:
+            list: Shape of each face, for read()
+
+        Raises:
+            ValueError: If the faces do not fit in a slot
+        """
+        if self.nbytes(faces) > self.slot_bytes:
+            raise ValueError(f"{self.nbytes(faces)} bytes of faces do not fit in a {self.slot_bytes}-byte slot")
+        offset = 0
+        for face in faces:
+            if face.dtype != np.uint8:
+                # extract_faces divides uint8 pixels by 255, so rounding back is lossless
+                face = np.rint(np.clip(face, 0.0, 1.0) * 255.0)
+            self.buffer[slot, offset:offset + face.size] = face.ravel()
+            offset += face.size
+        return [face.shape for face in faces]
+
+    def read(self, slot, shapes):
+        """
+        Returns:
+            list: Copies of the faces in a slot, as RGB float32 in [0, 1]
+        """
+        faces = []
+        offset = 0
+        for shape in shapes:
+            size = int(np.prod(shape))
+            faces.append(self.buffer[slot, offset:offset + size].reshape(shape).astype(np.float32) / 255.0)
+            offset += size
+        return faces
+
+    def close(self):
+        # Drop the numpy view first, otherwise the buffer cannot be released
+        self.buffer = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _worker_main(ring_args, tasks, results, models_factory):
+    """
+    Worker process loop: builds its own models, then runs FaceModels.infer
+    on each request until it receives None.
+    """
+    ring = SharedFaceRing(*ring_args)
+    try:
+        models = models_factory()
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, shapes, faces, regions, embed, groups = task
+            try:
+                with profiler.tick():
+                    if faces is None:
+                        faces = ring.read(slot, shapes)
+                    output = models.infer(faces, regions, embed, groups)
+            except Exception as e:
+                logging.error(f"Error in face inference: {e}")
+                output = None
+            results.put((seq, slot, output))
+    finally:
+        profiler.close()
+        ring.close()
+
+
+class ProcessInferencePool:
+    """
+    Runs the embedding and attribute models (FaceModels.infer) in a pool of
+    worker processes, each with its own loaded models, so the per-face
+    inference that dominates a frame's cost scales past the single core one
+    Python process can keep busy.
+
+    Detection, tracking, the identity cache, attribute scheduling and
+    gallery matching stay in the parent (FramePipeline.plan and apply):
+    they depend on seeing consecutive frames of a stream in order, which
+    workers taking turns would not. The parent only ships the face crops a
+    FramePlan needs models for.
+
+    Crops are passed through a SharedFaceRing with one slot per in-flight
+    request. A request whose crops do not fit in a slot (e.g. after the
+    camera switched to a larger resolution, or with a crowd in view) still
+    takes a slot, but its crops are pickled into the task queue instead.
+    Workers may finish out of order; results are held back until every
+    earlier request has been returned, so they come out in order.
+
+    A worker that dies (e.g. out of memory, or its models_factory raises)
+    is restarted up to `max_restarts` times. The request it was working on
+    is lost, so every request has a deadline: once it passes, the request is
+    released with None as its result and its slot is reused, and later
+    requests are not held back behind it. A result that arrives after its
+    deadline is discarded.
+    """
+
+    # Room for about 25 crops of 224x224 pixels per request
+    SLOT_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, workers=None, slots=None, models_factory=build_face_models, task_timeout=None,
+                 max_restarts=3, slot_bytes=None):
+        """
+        Args:
+            workers (int, optional): Worker processes; defaults to Config.INFERENCE_WORKERS
+            slots (int, optional): Requests in flight at once; defaults to 2 per worker
+            models_factory (callable): Picklable zero-argument callable run in each
+                                       worker to build its FaceModels
+            task_timeout (float, optional): Seconds before an unanswered request is given up;
+                                            defaults to Config.INFERENCE_TASK_TIMEOUT. It must
+                                            cover a worker's model loading on its first request.
+            max_restarts (int): Times each worker is restarted after dying
+            slot_bytes (int, optional): Ring slot size; defaults to SLOT_BYTES
+        """
+        self.workers = workers or Config.INFERENCE_WORKERS
+        self.slots = slots or 2 * self.workers
+        self.models_factory = models_factory
+        self.task_timeout = task_timeout or Config.INFERENCE_TASK_TIMEOUT
+        self.max_restarts = max_restarts
+        self.slot_bytes = slot_bytes or self.SLOT_BYTES
+        self.restarts = 0
+        self.timeouts = 0
+        self.oversized = 0
+        # TensorFlow is not fork-safe, so workers always start from a fresh interpreter
+        self._context = multiprocessing.get_context("spawn")
+        self._ring = None
+        self._processes = []
+        self._tasks = None
+        self._results = None
+        self._ring_args = None
+        self._free_slots = []
+        self._next_seq = 0
+        self._next_release = 0
+        self._pending = {}
+        # seq -> (slot, deadline) of requests handed to the workers and not yet answered
+        self._in_flight = {}
+
+    def start(self):
+        """
+        Allocates the ring buffer and starts the workers.
+        """
+        self._ring = SharedFaceRing(self.slots, self.slot_bytes)
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        self._free_slots = list(range(self.slots))
+        self._ring_args = (self.slots, self.slot_bytes, self._ring.name)
+        self._processes = [self._start_worker(i) for i in range(self.workers)]
+
+    def _start_worker(self, index):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self._ring_args, self._tasks, self._results, self.models_factory),
+            name=f"inference-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _check_workers(self):
+        """Restarts workers that have died, within the restart budget"""
+        for i, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            if self.restarts < self.max_restarts * self.workers:
+                logging.error(f"Inference worker {process.name} exited with code {process.exitcode}; restarting it")
+                self.restarts += 1
+                self._processes[i] = self._start_worker(i)
+            else:
+                logging.error(f"Inference worker {process.name} exited with code {process.exitcode}; "
+                              f"restart limit reached")
+                self._processes[i] = None
+
+    def _expire(self, now):
+        """Gives up on requests past their deadline so later ones are not held back"""
+        for seq, (slot, deadline) in list(self._in_flight.items()):
+            if now < deadline:
+                continue
+            logging.error(f"Inference request {seq} timed out after {self.task_timeout:.0f}s; skipping it")
+            del self._in_flight[seq]
+            self._free_slots.append(slot)
+            self._pending[seq] = None
+            self.timeouts += 1
+
+    @property
+    def started(self):
+        return self._ring is not None
+
+    @property
+    def in_flight(self):
+        return self.slots - len(self._free_slots) if self.started else 0
+
+    def submit(self, faces, regions, embed, groups):
+        """
+        Packs a request's faces into a free slot and queues it for the
+        workers. The arguments are those of FaceModels.infer, as returned
+        by FramePlan.request(). Starts the pool on first use.
+
+        Returns:
+            int: The request's sequence number, or None if every slot is busy
+                 (the caller should drop the request)
+        """
+        if not self.started:
+            self.start()
+        if not self._free_slots:
+            return None
+
+        slot = self._free_slots.pop()
+        shapes = None
+        if SharedFaceRing.nbytes(faces) <= self._ring.slot_bytes:
+            try:
+                shapes, faces = self._ring.write(slot, faces), None
+            except Exception:
+                self._free_slots.append(slot)
+                raise
+        else:
+            self.oversized += 1
+        seq = self._next_seq
+        self._next_seq += 1
+        self._in_flight[seq] = (slot, time.monotonic() + self.task_timeout)
+        self._tasks.put((seq, slot, shapes, faces, regions, embed, groups))
+        return seq
+
+    def collect(self, timeout=0):
+        """
+        Gathers finished requests and returns those whose predecessors are done.
+
+        Args:
+            timeout (float): Seconds to wait for the first result
+
+        Returns:
+            list: (seq, output) tuples in submission order, possibly empty;
+                  output is FaceModels.infer's (embeddings, analyses), or
+                  None for a request that failed or was given up on
+        """
+        if not self.started:
+            return []
+        try:
+            block = timeout > 0
+            while True:
+                seq, slot, output = self._results.get(block, timeout)
+                block = False
+                # Requests that already timed out have had their slot reused
+                if self._in_flight.pop(seq, None) is None:
+                    continue
+                self._free_slots.append(slot)
+                self._pending[seq] = output
+        except queue.Empty:
+            pass
+
+        self._check_workers()
+        self._expire(time.monotonic())
+
+        ready = []
+        while self._next_release in self._pending:
+            ready.append((self._next_release, self._pending.pop(self._next_release)))
+            self._next_release += 1
+        return ready
+
+    def close(self, timeout=5.0):
+        """
+        Stops the workers and frees the shared memory.
+        """
+        if not self.started:
+            return
+        processes = [process for process in self._processes if process is not None]
+        for _ in processes:
+            self._tasks.put(None)
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._in_flight = {}
+        self._ring.close()
+        self._ring = None
@@ -1,18 +1,77 @@
-import sqlite3
+import time
+import threading
 import numpy as np
 import logging
-from deepface import DeepFace
-from utils.utils import serialize_embedding, deserialize_embedding, calculate_embedding_distance
+from utils.utils import serialize_embedding_blob
+from utils.database_utils import (
+    ConnectionManager,
+    ensure_metadata_table,
+    ensure_change_tracking,
+    set_embedding_metadata,
+    migrate_embeddings_to_blob
+)
+from config import Config
+from core.gallery import open_gallery
+from core.ann_index import ann_index_path
+from core.embedding import BatchEmbedder
+from utils.metrics import metrics, stage_histogram
+
+_REPRESENT_SECONDS = stage_histogram("represent")
+_MATCH_SECONDS = stage_histogram("match")
+_PERSON_LOOKUP_SECONDS = stage_histogram("person_lookup")
+_GALLERY_SIZE = metrics.gauge("gallery_size", "Embeddings in the in-memory gallery")
+_RECOGNITIONS = metrics.counter("recognitions_total", "Faces matched against the gallery, by outcome", result="known")
+_UNKNOWN_FACES = metrics.counter("recognitions_total", result="unknown")
+
+# Statements are kept as constants so sqlite3's per-connection statement cache reuses them
+INSERT_FACE_SQL = """
+    INSERT INTO faces (name, gender, age, ethnicity, embedding)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SELECT_PERSON_SQL = "SELECT name, gender, age, ethnicity FROM faces WHERE name = ?"
 
 class RecognitionManager:
-    def __init__(self, db_path="facial_db/facial_data.db"):
+    # Maximum cosine distance accepted as a match (lower value = stricter matching)
+    CONFIDENCE_THRESHOLD = 0.4
+
+    def __init__(self, db_path="facial_db/facial_data.db", model_name="Facenet", gallery_backend=None, embedder=None):
         self.db_path = db_path
+        self.model_name = model_name
+        self.gallery_backend = gallery_backend or Config.GALLERY_BACKEND
+        self.db = ConnectionManager(db_path)
+        # Anything with BatchEmbedder's embed(faces, aligned) works, e.g. core.stub_models.StubEmbedder
+        self.embedder = embedder or BatchEmbedder(model_name)
+        self._gallery = None
+        self._gallery_lock = threading.RLock()
+        self._last_gallery_refresh = 0.0
+        # Last PRAGMA data_version seen, per thread since each thread has its own connection
+        self._seen_version = threading.local()
         self.setup_database()
+
+    @property
+    def gallery(self):
+        """The in-memory embedding gallery, loaded from the database on first use"""
+        with self._gallery_lock:
+            if self._gallery is None:
+                data_version = self.db.data_version()
+                gallery = open_gallery(self.db_path, self.gallery_backend)
+                if Config.ANN_ENABLED:
+                    gallery.attach_ann_index(
+                        ann_index_path(self.db_path),
+                        nlist=Config.ANN_NLIST,
+                        nprobe=Config.ANN_NPROBE,
+                        min_size=Config.ANN_MIN_SIZE,
+                        # Building runs k-means; keep it off the query path
+                        background=True
+                    )
+                self._seen_version.value = data_version
+                self._gallery = gallery
+            return self._gallery
         
     def setup_database(self):
         """Creates the database schema with additional fields for age and ethnicity"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.write() as conn:
                 cursor = conn.cursor()
                 # Updated table schema to include age and ethnicity
                 cursor.execute("""
@@ -22,12 +81,19 @@ class RecognitionManager:
                         gender TEXT,
                         age INTEGER,
                         ethnicity TEXT,
-                        embedding TEXT NOT NULL,
+                        embedding BLOB NOT NULL,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
-                conn.commit()
-                logging.info("Database setup completed successfully")
+                # get_person_details looks people up by name on every analysis tick
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_faces_name ON faces (name)")
+                ensure_metadata_table(conn)
+            # executescript commits on its own, so triggers are installed outside the write block
+            ensure_change_tracking(self.db.connection())
+            logging.info("Database setup completed successfully")
+
+            # Convert any rows still in the legacy JSON/base64 format
+            migrate_embeddings_to_blob(self.db_path, model_name=self.model_name)
         except Exception as e:
             logging.error(f"Database setup failed: {e}")
             raise
@@ -48,83 +114,173 @@ class RecognitionManager:
             age_val = int(age) if age is not None else None
             
             # Generate embedding using DeepFace
-            embedding_result = DeepFace.represent(
-                img_path=img_path, 
-                model_name="Facenet", 
-                enforce_detection=False
-            )
-            embedding = embedding_result[0]["embedding"]
+            embedding = self.represent(img_path)
             
-            # Serialize the embedding for storage
-            embedding_str = serialize_embedding(np.array(embedding))
+            # Serialize the embedding for storage as a raw float32 BLOB
+            embedding_blob = serialize_embedding_blob(embedding)
             
             # Store in database with new fields
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO faces (name, gender, age, ethnicity, embedding)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (name, gender, age_val, ethnicity, embedding_str))
-                conn.commit()
-                logging.info(f"Successfully added face for {name}")
+            with self.db.write() as conn:
+                conn.execute(INSERT_FACE_SQL, (name, gender, age_val, ethnicity, embedding_blob))
+                set_embedding_metadata(conn, self.model_name, len(embedding))
+            logging.info(f"Successfully added face for {name}")
+
+            # Pull the new row into an already loaded gallery without reloading the table
+            self.refresh_gallery(force=True)
                 
         except Exception as e:
             logging.error(f"Error adding face: {e}")
             raise
 
-    def recognize_face(self, img_path):
+    def represent(self, img_path, aligned=False):
+        """
+        Generates an embedding for an image file or an in-memory image.
+        
+        Args:
+            img_path (str or numpy.ndarray): Image path, BGR image array, or an
+                aligned face array as returned by DeepFace.extract_faces
+            aligned (bool): True if img_path is an aligned face from
+                extract_faces; it is then embedded by the BatchEmbedder
+                without running the face detector again
+            
+        Returns:
+            numpy.ndarray: The face embedding
+        """
+        if aligned:
+            return self.represent_batch([img_path])[0]
+
+        from deepface import DeepFace
+
+        with _REPRESENT_SECONDS.time():
+            return np.asarray(DeepFace.represent(
+                img_path=img_path,
+                model_name=self.model_name,
+                enforce_detection=False
+            )[0]["embedding"])
+
+    def recognize_face(self, img_path, aligned=False):
         """
         Recognizes a face by comparing with stored embeddings.
         We've adjusted the confidence threshold and improved the comparison logic
         for more reliable face matching.
         
         Args:
-            img_path (str): Path to image file to recognize
+            img_path (str or numpy.ndarray): Image path or in-memory image to recognize
+            aligned (bool): True if img_path is an aligned face from
+                DeepFace.extract_faces, which skips re-detection
             
         Returns:
             tuple: (name, confidence_score) of the best match
         """
         try:
             # Generate embedding for input image
-            input_embedding = DeepFace.represent(
-                img_path=img_path, 
-                model_name="Facenet",
-                enforce_detection=False
-            )[0]["embedding"]
+            input_embedding = self.represent(img_path, aligned=aligned)
             
-            # Convert input embedding to numpy array
-            input_embedding = np.array(input_embedding)
+            return self.match_embedding(input_embedding)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT name, embedding FROM faces")
-                rows = cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Error during face recognition: {e}")
+            return "Unknown", None
 
-            min_distance = float('inf')
-            best_match = "Unknown"
+    def represent_batch(self, faces, aligned=True):
+        """
+        Generates embeddings for many faces with one forward pass.
+        
+        Args:
+            faces (list): Aligned faces from DeepFace.extract_faces, or BGR crops
+            aligned (bool): True if the faces are aligned extract_faces results
             
-            for name, embedding_str in rows:
-                stored_embedding = deserialize_embedding(embedding_str)
-                if stored_embedding is not None:
-                    # Calculate cosine similarity instead of Euclidean distance
-                    distance = 1 - np.dot(input_embedding, stored_embedding) / (
-                        np.linalg.norm(input_embedding) * np.linalg.norm(stored_embedding)
-                    )
-                    
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_match = name
-
-            # Adjusted confidence threshold (lower value = stricter matching)
-            confidence_threshold = 0.4
-            if min_distance > confidence_threshold:
-                return "Unknown", None
-                
-            return best_match, min_distance
+        Returns:
+            numpy.ndarray: (N, D) embeddings, one row per face
+        """
+        with _REPRESENT_SECONDS.time():
+            return self.embedder.embed(faces, aligned=aligned)
+
+    def recognize_batch(self, faces, aligned=True):
+        """
+        Recognizes many faces with one forward pass and one gallery lookup.
+        
+        Args:
+            faces (list): Aligned faces from DeepFace.extract_faces, or BGR crops
+            aligned (bool): True if the faces are aligned extract_faces results
             
+        Returns:
+            list: (name, distance) per face, ("Unknown", None) where nothing matches
+        """
+        if len(faces) == 0:
+            return []
+        try:
+            return self.match_embeddings(self.represent_batch(faces, aligned=aligned))
         except Exception as e:
-            logging.error(f"Error during face recognition: {e}")
-            return "Unknown", None
+            logging.error(f"Error during batch face recognition: {e}")
+            return [("Unknown", None)] * len(faces)
+
+    def match_embeddings(self, embeddings):
+        """
+        Matches several embeddings against the gallery in one matrix product.
+        
+        Args:
+            embeddings (numpy.ndarray): (N, D) embeddings to match
+            
+        Returns:
+            list: (name, distance) per embedding, ("Unknown", None) where nothing matches
+        """
+        gallery = self.gallery
+        self.refresh_gallery()
+        with _MATCH_SECONDS.time(), self._gallery_lock:
+            matches = gallery.best_match_batch(embeddings, self.CONFIDENCE_THRESHOLD)
+        self._count_matches(gallery, matches)
+        return matches
+
+    def match_embedding(self, embedding):
+        """
+        Matches an embedding against the gallery.
+        
+        Args:
+            embedding (numpy.ndarray): Embedding to match
+            
+        Returns:
+            tuple: (name, distance) of the best match, or ("Unknown", None)
+        """
+        gallery = self.gallery
+        self.refresh_gallery()
+        with _MATCH_SECONDS.time(), self._gallery_lock:
+            match = gallery.best_match(embedding, self.CONFIDENCE_THRESHOLD)
+        self._count_matches(gallery, [match])
+        return match
+
+    @staticmethod
+    def _count_matches(gallery, matches):
+        known = sum(name != "Unknown" for name, _ in matches)
+        _RECOGNITIONS.inc(known)
+        _UNKNOWN_FACES.inc(len(matches) - known)
+        _GALLERY_SIZE.set(len(gallery))
+
+    def refresh_gallery(self, force=False):
+        """
+        Applies faces added or removed since the gallery was loaded, including
+        changes written by other processes. Checks at most once every
+        Config.GALLERY_REFRESH_INTERVAL seconds unless forced, and only reads
+        the change log when SQLite reports another connection has committed.
+        
+        Args:
+            force (bool): Check for changes regardless of the interval
+        """
+        if self._gallery is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_gallery_refresh < Config.GALLERY_REFRESH_INTERVAL:
+            return
+        self._last_gallery_refresh = now
+        try:
+            data_version = self.db.data_version()
+            if not force and data_version == getattr(self._seen_version, "value", None):
+                return
+            with self._gallery_lock:
+                self._gallery.refresh(self.db.connection())
+            self._seen_version.value = data_version
+        except Exception as e:
+            logging.error(f"Error refreshing gallery: {e}")
 
     def get_person_details(self, name):
         """
@@ -137,23 +293,24 @@ class RecognitionManager:
             dict: Person's details including age, gender, and ethnicity
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT name, gender, age, ethnicity FROM faces WHERE name = ?",
-                    (name,)
-                )
-                row = cursor.fetchone()
-                
-                if row:
-                    return {
-                        'name': row[0],
-                        'gender': row[1],
-                        'age': row[2],
-                        'ethnicity': row[3]
-                    }
-                return None
+            with _PERSON_LOOKUP_SECONDS.time():
+                row = self.db.connection().execute(SELECT_PERSON_SQL, (name,)).fetchone()
+            
+            if row:
+                return {
+                    'name': row[0],
+                    'gender': row[1],
+                    'age': row[2],
+                    'ethnicity': row[3]
+                }
+            return None
                 
         except Exception as e:
             logging.error(f"Error retrieving person details: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def close(self):
+        """
+        Closes the database connections held by this manager.
+        """
+        self.db.close_all()
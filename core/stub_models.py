@@ -0,0 +1,144 @@
+import zlib
+import cv2
+import numpy as np
+from core.face_detector import face_to_bgr
+from core.attribute_analyzer import BatchAttributeAnalyzer
+
+
+class StubDetector:
+    """
+    Deterministic stand-in for DeepFace.extract_faces. It places a fixed
+    number of face boxes in a row across the middle of the frame, nudged by
+    a checksum of the frame's content so that boxes move a little between
+    frames (and trackers have something to follow), and returns the crops
+    in extract_faces' layout: RGB floats in [0, 1] resized to face_size.
+    The same frame always gives the same faces.
+    """
+
+    def __init__(self, faces_per_frame=2, face_size=(160, 160)):
+        """
+        Args:
+            faces_per_frame (int): Faces "detected" in every frame
+            face_size (tuple): (height, width) of the returned aligned faces
+        """
+        self.faces_per_frame = faces_per_frame
+        self.face_size = face_size
+
+    def __call__(self, frame):
+        height, width = frame.shape[:2]
+        thumbnail = cv2.resize(frame, (16, 16), interpolation=cv2.INTER_AREA)
+        jitter = zlib.crc32(thumbnail.tobytes()) % 9 - 4
+
+        faces = []
+        cell = width // max(self.faces_per_frame, 1)
+        size = max(min(cell, height) // 2, 8)
+        for i in range(self.faces_per_frame):
+            x = int(np.clip(i * cell + (cell - size) // 2 + jitter, 0, width - size))
+            y = int(np.clip((height - size) // 2 + jitter, 0, height - size))
+            crop = cv2.resize(frame[y:y + size, x:x + size], (self.face_size[1], self.face_size[0]))
+            faces.append({
+                'face': crop[:, :, ::-1].astype(np.float32) / 255.0,
+                'facial_area': {'x': x, 'y': y, 'w': size, 'h': size},
+                'confidence': 1.0,
+            })
+        return faces
+
+
+class StubEmbedder:
+    """
+    Deterministic stand-in for BatchEmbedder: the embedding is the face's
+    grayscale thumbnail, mean-centred and L2-normalized. Similar crops give
+    nearby embeddings, so matching behaves plausibly.
+    """
+
+    def __init__(self, dim=128):
+        """
+        Args:
+            dim (int): Embedding dimension; must be a multiple of 8
+        """
+        self.model_name = "Stub"
+        self.dim = dim
+
+    def embed(self, faces, aligned=True):
+        """
+        Embeds a list of faces with BatchEmbedder's interface.
+
+        Returns:
+            numpy.ndarray: (N, dim) float32 embeddings
+        """
+        if len(faces) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        embeddings = np.empty((len(faces), self.dim), dtype=np.float32)
+        for i, face in enumerate(faces):
+            bgr = face_to_bgr(face) if aligned else face
+            gray = cv2.resize(cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY), (8, self.dim // 8), interpolation=cv2.INTER_AREA)
+            vector = gray.astype(np.float32).ravel()
+            vector -= vector.mean()
+            embeddings[i] = vector / (np.linalg.norm(vector) or 1.0)
+        return embeddings
+
+
+class StubAttributeAnalyzer(BatchAttributeAnalyzer):
+    """
+    Deterministic stand-in for BatchAttributeAnalyzer: scores are a fixed
+    random projection of the face's colour statistics, post-processed into
+    the same dict layout as the real analyzer.
+    """
+
+    def __init__(self, actions=('age', 'gender', 'race', 'emotion'), max_batch_size=64):
+        super().__init__(actions, max_batch_size)
+        rng = np.random.default_rng(0)
+        self._weights = {
+            'age': rng.normal(size=(6, 101)),
+            'gender': rng.normal(size=(6, len(self.GENDER_LABELS))),
+            'race': rng.normal(size=(6, len(self.RACE_LABELS))),
+            'emotion': rng.normal(size=(6, len(self.EMOTION_LABELS))),
+        }
+
+    def preprocess(self, face):
+        bgr = face_to_bgr(face).astype(np.float32) / 255.0
+        return np.concatenate([bgr.mean(axis=(0, 1)), bgr.std(axis=(0, 1))])
+
+    def _predict(self, action, batch):
+        logits = batch @ self._weights[action] * 4.0
+        scores = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+
+def build_stub_models():
+    """
+    Builds FaceModels on the stub embedder and analyzer; the
+    ProcessInferencePool worker factory for Config.MODEL_BACKEND = "stub".
+
+    Returns:
+        FaceModels: Models whose embedder and analyzer are stubs
+    """
+    from core.frame_pipeline import FaceModels
+
+    return FaceModels(StubEmbedder(), StubAttributeAnalyzer(FaceModels.ATTRIBUTE_ACTIONS))
+
+
+def build_stub_pipeline(db_path, faces_per_frame=2):
+    """
+    Builds a FramePipeline on the stub models, for hermetic benchmarks and
+    for running the application without model weights
+    (Config.MODEL_BACKEND = "stub").
+
+    Args:
+        db_path (str): Face database; embeddings from real models do not
+                       match stub embeddings, so use a stub-enrolled one
+        faces_per_frame (int): Faces the stub detector finds in every frame
+
+    Returns:
+        FramePipeline: Pipeline whose detector, embedder and analyzer are stubs
+    """
+    from core.recognition_manager import RecognitionManager
+    from core.frame_pipeline import FramePipeline
+
+    models = build_stub_models()
+    manager = RecognitionManager(db_path, models.embedder.model_name, embedder=models.embedder)
+    return FramePipeline(
+        manager,
+        attribute_analyzer=models.attribute_analyzer,
+        detector=StubDetector(faces_per_frame)
+    )
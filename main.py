@@ -1,7 +1,9 @@
 import os
 import sys
 import logging
+from config import Config
 from utils.logging_utils import setup_logging
+from core.model_warmup import ModelWarmup
 from ui.ui import FaceRecognitionUI
 
 def main():
@@ -19,6 +21,10 @@ def main():
         
         # Log application start
         logging.info("Starting Face Recognition System")
+
+        # Load the models while the operator is still in the menu
+        if Config.WARMUP_MODELS and Config.MODEL_BACKEND != "stub":
+            ModelWarmup().start()
         
         # Initialize and run the UI
         ui = FaceRecognitionUI()
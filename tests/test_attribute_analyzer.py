@@ -0,0 +1,90 @@
+# test_attribute_analyzer.py
+import numpy as np
+from core.attribute_analyzer import BatchAttributeAnalyzer
+
+
+class _StubModel:
+    """Stand-in Keras model that records its input batches and returns fixed scores per face."""
+
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.batches = []
+
+    def predict_on_batch(self, batch):
+        self.batches.append(batch)
+        return np.tile(self.scores, (len(batch), 1))
+
+
+def _age_scores():
+    # Half the mass at 20 and half at 40: the expected age is 30
+    scores = np.zeros(101)
+    scores[[20, 40]] = 0.5
+    return scores
+
+
+def _stub_analyzer(monkeypatch):
+    models = {
+        'age': _StubModel(_age_scores()),
+        'gender': _StubModel([0.2, 0.8]),
+        # Unnormalized on purpose: race and emotion are rescaled to sum to 100%
+        'race': _StubModel([1, 0, 0, 3, 0, 0]),
+        'emotion': _StubModel([2, 0, 0, 6, 0, 0, 0]),
+    }
+    built = []
+    analyzer = BatchAttributeAnalyzer()
+
+    def model(action):
+        built.append(action)
+        return models[action]
+
+    monkeypatch.setattr(analyzer, "model", model)
+    return analyzer, models, built
+
+
+def test_batch_analysis_matches_deepface_layout(monkeypatch):
+    """
+    Tests preprocessing, post-processing and the result keys the overlay
+    reads, with every attribute model run once for the whole batch.
+    """
+    analyzer, models, built = _stub_analyzer(monkeypatch)
+    faces = [np.random.default_rng(i).random((64 + 8 * i, 64, 3), dtype=np.float32) for i in range(3)]
+    regions = [{'x': i, 'y': 0, 'w': 64, 'h': 64} for i in range(3)]
+
+    results = analyzer.analyze(faces, regions=regions)
+
+    assert built == ['age', 'gender', 'race', 'emotion']
+    for action, model in models.items():
+        assert len(model.batches) == 1
+        expected_shape = (3, 48, 48, 1) if action == 'emotion' else (3, 224, 224, 3)
+        assert model.batches[0].shape == expected_shape
+    assert 0.0 <= models['age'].batches[0].min() and models['age'].batches[0].max() <= 1.0
+
+    assert len(results) == 3
+    for result, region in zip(results, regions):
+        assert {'age', 'gender', 'dominant_race', 'dominant_emotion'} <= result.keys()
+        assert result['region'] == region
+        assert result['age'] == 30
+        assert result['dominant_gender'] == "Man"
+        assert abs(result['gender']['Man'] - 80.0) < 1e-4
+        assert result['dominant_race'] == "white"
+        assert abs(result['race']['white'] - 75.0) < 1e-4
+        assert abs(sum(result['race'].values()) - 100.0) < 1e-4
+        assert result['dominant_emotion'] == "happy"
+        assert abs(result['emotion']['happy'] - 75.0) < 1e-4
+        assert abs(sum(result['emotion'].values()) - 100.0) < 1e-4
+
+
+def test_batch_analysis_subset_and_chunking(monkeypatch):
+    """
+    Tests that only the requested models run, and that batches larger than
+    max_batch_size are split into chunks.
+    """
+    analyzer, models, built = _stub_analyzer(monkeypatch)
+    analyzer.max_batch_size = 2
+    faces = [np.full((64, 64, 3), 0.5, dtype=np.float32)] * 5
+
+    results = analyzer.analyze(faces, actions=('emotion',))
+
+    assert built == ['emotion']
+    assert [len(batch) for batch in models['emotion'].batches] == [2, 2, 1]
+    assert all(result.keys() == {'region', 'emotion', 'dominant_emotion'} for result in results)
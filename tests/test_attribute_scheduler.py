@@ -0,0 +1,76 @@
+# test_attribute_scheduler.py
+from core.attribute_scheduler import AttributeScheduler
+
+RACES = ["asian", "indian", "black", "white", "middle eastern", "latino hispanic"]
+
+
+def _analysis(age, gender="Man", race="white", emotion="happy"):
+    return {
+        'age': age,
+        'gender': {'Woman': 10.0, 'Man': 90.0} if gender == "Man" else {'Woman': 90.0, 'Man': 10.0},
+        'dominant_gender': gender,
+        'race': {label: 100.0 if label == race else 0.0 for label in RACES},
+        'dominant_race': race,
+        'emotion': {emotion: 100.0},
+        'dominant_emotion': emotion,
+    }
+
+
+def test_scheduler_freezes_stable_attributes():
+    """
+    Tests that age, gender and race stop being predicted once stable, that
+    age is smoothed, and that emotion keeps its own rate.
+    """
+    scheduler = AttributeScheduler(emotion_interval=1.0, window=3, age_tolerance=4, use_stored=False)
+    now = 0.0
+    for age in (30, 32, 31):
+        actions = scheduler.due(1, now=now)
+        assert set(actions) >= {'age', 'gender', 'race'}
+        merged = scheduler.update(1, _analysis(age), actions, now=now)
+        now += 1.0
+
+    assert scheduler.frozen(1) == {'age', 'gender', 'race'}
+    assert merged['age'] == 31.0
+    assert merged['dominant_gender'] == "Man"
+
+    assert scheduler.due(1, now=now) == ('emotion',)
+    merged = scheduler.update(1, _analysis(99, emotion="sad"), ('emotion',), now=now)
+    assert merged['dominant_emotion'] == "sad" and merged['age'] == 31.0
+    assert scheduler.due(1, now=now + 0.5) == ()
+
+    # A reset (e.g. the track may now be someone else) predicts everything again
+    assert set(scheduler.due(1, reset=True, now=now + 0.5)) == {'age', 'gender', 'race'}
+
+
+def test_scheduler_keeps_predicting_unstable_attributes():
+    """
+    Tests that attributes that disagree across the window stay unfrozen.
+    """
+    scheduler = AttributeScheduler(emotion_interval=0, window=3, age_tolerance=4, use_stored=False)
+    for i, (age, gender) in enumerate([(20, "Man"), (40, "Woman"), (30, "Man")]):
+        actions = scheduler.due(1, now=i)
+        scheduler.update(1, _analysis(age, gender), actions, now=i)
+
+    assert scheduler.frozen(1) == {'race'}
+    assert scheduler.due(1, now=3) == ('age', 'gender', 'emotion')
+
+
+def test_scheduler_uses_stored_attributes():
+    """
+    Tests that stored gender/ethnicity of recognized people replace predictions.
+    """
+    scheduler = AttributeScheduler(emotion_interval=1.0, window=3, age_tolerance=4, use_stored=True)
+    details = {'name': "alice", 'gender': "Female", 'age': 30, 'ethnicity': "Asian"}
+    actions = scheduler.due(1, details, now=0)
+    assert actions == ('age', 'emotion')
+
+    merged = scheduler.update(1, {'age': 29, 'emotion': {'happy': 100.0}, 'dominant_emotion': "happy"},
+                              actions, details, now=0)
+    assert merged['dominant_gender'] == "Woman"
+    assert merged['dominant_race'] == "asian"
+    # Stored values are marked as such and carry no made-up scores
+    assert merged['stored_attributes'] == ('gender', 'race')
+    assert 'gender' not in merged and 'race' not in merged
+
+    # Stored genders with no matching model label are still predicted
+    assert 'gender' in scheduler.due(2, {'gender': "Other", 'ethnicity': "Asian"}, now=0)
@@ -0,0 +1,54 @@
+# test_batch_processor.py
+import json
+from core.batch_processor import find_images, load_completed
+
+
+def test_find_images(tmp_path):
+    """
+    Tests that images are found recursively, in a stable order, by extension.
+    """
+    (tmp_path / "b").mkdir()
+    for name in ("b/2.PNG", "a.jpg", "notes.txt", "b/1.jpeg"):
+        (tmp_path / name).write_bytes(b"")
+
+    assert find_images(str(tmp_path)) == ["a.jpg", "b/1.jpeg", "b/2.PNG"]
+
+
+def test_load_completed_drops_partial_images(tmp_path):
+    """
+    Tests that resuming keeps fully written images, including ones without
+    faces, and removes the lines of an image interrupted mid-write.
+    """
+    output = tmp_path / "results.jsonl"
+    lines = [
+        {'image': "a.jpg", 'face_index': 0, 'face_count': 2},
+        {'image': "a.jpg", 'face_index': 1, 'face_count': 2},
+        {'image': "empty.jpg", 'face_count': 0},
+        {'image': "c.jpg", 'face_index': 0, 'face_count': 3},
+    ]
+    output.write_text("".join(json.dumps(line) + "\n" for line in lines) + '{"image": "c.jpg", "fa')
+
+    assert load_completed(str(output)) == {"a.jpg", "empty.jpg"}
+    remaining = [json.loads(line)['image'] for line in output.read_text().splitlines()]
+    assert remaining == ["a.jpg", "a.jpg", "empty.jpg"]
+
+    assert load_completed(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_load_completed_retries_failed_images(tmp_path):
+    """
+    Tests that images recorded with an error are not treated as completed
+    and their error lines are removed, so a resumed run retries them.
+    """
+    output = tmp_path / "results.jsonl"
+    lines = [
+        {'image': "a.jpg", 'face_index': 0, 'face_count': 1},
+        {'image': "broken.jpg", 'face_count': 0, 'error': "unreadable image"},
+        {'image': "empty.jpg", 'face_count': 0},
+        {'image': "oom.jpg", 'face_count': 0, 'error': "OOM when allocating tensor"},
+    ]
+    output.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+    assert load_completed(str(output)) == {"a.jpg", "empty.jpg"}
+    remaining = [json.loads(line)['image'] for line in output.read_text().splitlines()]
+    assert remaining == ["a.jpg", "empty.jpg"]
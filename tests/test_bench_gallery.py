@@ -0,0 +1,22 @@
+# test_bench_gallery.py
+from benchmarks.bench_gallery import run_size, flatten
+
+
+def test_run_size_reports_every_metric(tmp_path):
+    """
+    Tests a small end-to-end run of the gallery benchmark and that its
+    report flattens to numeric metrics for comparison between commits.
+    """
+    result = run_size(500, str(tmp_path), ["memory", "memmap"], queries=50, serialization_samples=100)
+
+    assert result['size'] == 500
+    for backend in ("memory", "memmap"):
+        stats = result['backends'][backend]
+        assert stats['load_seconds'] > 0
+        assert stats['match_us']['p99'] >= stats['match_us']['p50'] > 0
+    assert result['backends']['memory']['gallery_bytes'] >= 500 * 128 * 4
+    assert result['serialization']['blob_deserialize_per_s'] > 0
+
+    flat = flatten(result)
+    assert 'backends.memmap.match_us.p95' in flat
+    assert all(isinstance(value, (int, float)) for value in flat.values())
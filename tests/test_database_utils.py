@@ -0,0 +1,108 @@
+# test_database_utils.py
+import time
+import sqlite3
+import threading
+import pytest
+from utils.database_utils import ConnectionManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "test.db"))
+    with manager.write() as conn:
+        conn.execute("CREATE TABLE items (value INTEGER)")
+    yield manager
+    manager.close_all()
+
+
+def _in_thread(function):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_one_connection_per_thread(db):
+    """
+    Tests that a thread always gets the same connection and other threads get their own.
+    """
+    conn = db.connection()
+    assert db.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    # Keep the other thread alive so its connection is not closed yet
+    ready, done = threading.Event(), threading.Event()
+    other = []
+
+    def worker():
+        other.append(db.connection())
+        ready.set()
+        done.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    ready.wait(5)
+    assert other[0] is not conn
+    assert len(db._connections) == 2
+    done.set()
+    thread.join()
+
+
+def test_write_rolls_back_on_error(db):
+    """
+    Tests that an exception inside write() rolls back the whole transaction.
+    """
+    with pytest.raises(RuntimeError):
+        with db.write() as conn:
+            conn.execute("INSERT INTO items VALUES (1)")
+            raise RuntimeError("enrollment failed")
+
+    assert db.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    with db.write() as conn:
+        conn.execute("INSERT INTO items VALUES (2)")
+    assert db.connection().execute("SELECT value FROM items").fetchall() == [(2,)]
+
+
+def test_reader_not_blocked_by_open_write(db):
+    """
+    Tests that with WAL a reader sees the last committed data at once while
+    another thread holds a write transaction open.
+    """
+    in_write, release = threading.Event(), threading.Event()
+
+    def writer():
+        with db.write() as conn:
+            conn.execute("INSERT INTO items VALUES (1)")
+            in_write.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert in_write.wait(5)
+        start = time.monotonic()
+        assert db.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+        assert time.monotonic() - start < 1.0
+    finally:
+        release.set()
+        thread.join()
+    assert db.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+
+def test_connection_closed_when_thread_ends(db):
+    """
+    Tests that a short-lived thread's connection is closed and forgotten
+    once the thread ends, while other threads' connections stay open.
+    """
+    main_conn = db.connection()
+    thread_conn = _in_thread(db.connection)
+
+    assert db._connections == [main_conn]
+    with pytest.raises(sqlite3.ProgrammingError):
+        thread_conn.execute("SELECT 1")
+    main_conn.execute("SELECT 1")
+
+    for _ in range(10):
+        _in_thread(lambda: db.connection().execute("SELECT COUNT(*) FROM items").fetchone())
+    assert len(db._connections) == 1
@@ -0,0 +1,61 @@
+# test_embedding.py
+import numpy as np
+import pytest
+from config import Config
+from core.embedding import BatchEmbedder
+
+
+class _StubModel:
+    """Stand-in recognition model that records its input batches and returns one row per face."""
+
+    input_shape = (16, 16)
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_on_batch(self, batch):
+        self.batches.append(batch)
+        return batch.reshape(len(batch), -1)[:, :8]
+
+
+def test_batch_embedder_feeds_bgr_like_enrollment():
+    """
+    Tests that an aligned extract_faces result (RGB in [0, 1]) reaches the
+    model as BGR in [0, 1], the layout DeepFace.represent gives the faces
+    its detector finds when enrolling.
+    """
+    embedder = BatchEmbedder(max_batch_size=2)
+    model = _StubModel()
+    embedder._model = model
+    red = np.zeros((32, 32, 3), dtype=np.float32)
+    red[..., 0] = 1.0  # Pure red in RGB
+
+    embeddings = embedder.embed([red, red, red])
+
+    assert embeddings.shape == (3, 8)
+    assert [len(batch) for batch in model.batches] == [2, 1]
+    image = model.batches[0][0]
+    assert image.shape == (16, 16, 3) and image.dtype == np.float32
+    assert np.allclose(image[..., 2], 1.0)
+    assert np.allclose(image[..., :2], 0.0)
+
+
+def test_batched_embedding_matches_represent():
+    """
+    Tests that the batched embedding of a detected face matches the
+    embedding DeepFace.represent computes for the same image, which is how
+    gallery faces are enrolled.
+    """
+    DeepFace = pytest.importorskip("deepface").DeepFace
+    img_path = "sample_images/test_image.jpg"
+
+    face = DeepFace.extract_faces(img_path=img_path, detector_backend=Config.DETECTOR_BACKEND)[0]["face"]
+    batched = BatchEmbedder(Config.MODEL_NAME).embed([face])[0]
+    single = np.asarray(DeepFace.represent(
+        img_path=img_path,
+        model_name=Config.MODEL_NAME,
+        detector_backend=Config.DETECTOR_BACKEND
+    )[0]["embedding"])
+
+    similarity = batched @ single / (np.linalg.norm(batched) * np.linalg.norm(single))
+    assert similarity > 0.99
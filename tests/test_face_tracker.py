@@ -0,0 +1,95 @@
+# test_face_tracker.py
+import numpy as np
+from core.face_tracker import BoxFollower, FaceTracker, box_iou
+
+
+def _area(x, y, w=100, h=100):
+    return {'x': x, 'y': y, 'w': w, 'h': h}
+
+
+def test_box_iou():
+    """
+    Tests IoU for identical, half-overlapping and disjoint boxes.
+    """
+    iou = box_iou([(0, 0, 10, 10)], [(0, 0, 10, 10), (5, 0, 10, 10), (20, 20, 10, 10)])
+    assert iou.shape == (1, 3)
+    assert iou[0, 0] == 1.0
+    assert abs(iou[0, 1] - 50 / 150) < 1e-9
+    assert iou[0, 2] == 0.0
+
+
+def test_tracker_keeps_ids_and_drops_lost_tracks():
+    """
+    Tests that moving faces keep their track ids, including a fast move with
+    no box overlap, and that unseen tracks are dropped after max_misses.
+    """
+    tracker = FaceTracker(iou_threshold=0.3, max_misses=1, confidence_half_life=5.0, min_confidence=0.5)
+    first = tracker.update([_area(0, 0), _area(300, 0)], now=0.0)
+    assert [t.track_id for t in first] == [1, 2]
+
+    # Order of detections changes; the second face jumps past its old box
+    second = tracker.update([_area(340, 0), _area(10, 5)], now=0.1)
+    assert [t.track_id for t in second] == [2, 1]
+
+    tracker.update([_area(12, 5)], now=0.2)
+    assert tracker.lost == []
+    tracker.update([_area(14, 5)], now=0.3)
+    assert tracker.lost == [2]
+    assert list(tracker.tracks) == [1]
+
+    new = tracker.update([_area(14, 5), _area(600, 600)], now=0.4)
+    assert [t.track_id for t in new] == [1, 3]
+
+
+def test_tracker_confidence_decay():
+    """
+    Tests that a track needs refreshing when new, not right after being
+    refreshed, and again once its confidence has decayed.
+    """
+    tracker = FaceTracker(confidence_half_life=2.0, min_confidence=0.5)
+    track = tracker.update([_area(0, 0)], now=0.0)[0]
+    assert tracker.needs_refresh(track, now=0.0)
+
+    tracker.mark_refreshed(track, now=0.0)
+    assert not tracker.needs_refresh(track, now=1.9)
+    assert tracker.needs_refresh(track, now=2.1)
+
+
+def _frame_with_face(x, y, face, size=(480, 640)):
+    frame = np.full(size + (3,), 90, dtype=np.uint8)
+    frame[y:y + face.shape[0], x:x + face.shape[1]] = face
+    return frame
+
+
+def test_box_follower_moves_boxes_between_ticks():
+    """
+    Tests that between analysis results, drawn boxes follow a face moving
+    across the frame, starting from the frame the results were computed on,
+    and that new results replace the followed boxes.
+    """
+    face = np.random.default_rng(0).integers(0, 256, size=(80, 80, 3), dtype=np.uint8)
+    follower = BoxFollower(min_score=0.5)
+    latest = (1, 0.0, [{'name': "Alice", 'facial_area': _area(100, 200, 80, 80)}])
+
+    # The results arrive while frame 3 is shown; the face started at x=100 in frame 1
+    follower.follow(1, _frame_with_face(100, 200, face), None)
+    follower.follow(2, _frame_with_face(112, 200, face), None)
+    for frame_id in range(3, 12):
+        x, y = 100 + 12 * (frame_id - 1), 200 - 4 * (frame_id - 1)
+        results = follower.follow(frame_id, _frame_with_face(x, y, face), latest)
+        area = results[0]['facial_area']
+        assert abs(area['x'] - x) <= 2 and abs(area['y'] - y) <= 2
+        assert (area['w'], area['h']) == (80, 80)
+        assert results[0]['name'] == "Alice"
+    # The results themselves are left as computed
+    assert latest[2][0]['facial_area'] == _area(100, 200, 80, 80)
+
+    # Without a match (the face left), the box stays where it was last seen
+    results = follower.follow(12, np.full((480, 640, 3), 90, dtype=np.uint8), latest)
+    assert abs(results[0]['facial_area']['x'] - 220) <= 2
+
+    newer = (13, 1.0, [{'name': "Alice", 'facial_area': _area(400, 300, 80, 80)}])
+    results = follower.follow(13, _frame_with_face(400, 300, face), newer)
+    assert results[0]['facial_area'] == _area(400, 300, 80, 80)
+    results = follower.follow(14, _frame_with_face(390, 310, face), newer)
+    assert abs(results[0]['facial_area']['x'] - 390) <= 2 and abs(results[0]['facial_area']['y'] - 310) <= 2
@@ -0,0 +1,61 @@
+# test_frame_pipeline.py
+import numpy as np
+from core.face_tracker import FaceTracker
+from core.attribute_scheduler import AttributeScheduler
+from core.frame_pipeline import TrackingState
+from core.stub_models import build_stub_pipeline
+
+
+def test_confidence_decay_resets_frozen_attributes(tmp_path):
+    """
+    Tests that emotion-only analyses do not count as refreshes: once age,
+    gender and race are frozen, the track's confidence decays and the
+    frozen attributes are predicted again after it drops below the minimum.
+    """
+    pipeline = build_stub_pipeline(str(tmp_path / "faces.db"), faces_per_frame=1)
+    pipeline.state = TrackingState(
+        tracker=FaceTracker(confidence_half_life=5.0, min_confidence=0.5),
+        attribute_scheduler=AttributeScheduler(emotion_interval=1.0, window=2, use_stored=False)
+    )
+    frame = np.random.default_rng(0).integers(0, 256, size=(240, 320, 3), dtype=np.uint8)
+
+    frozen = []
+    for now in range(10):
+        track_id = pipeline.process(frame, now=float(now))[0]['track_id']
+        frozen.append(pipeline.attribute_scheduler.frozen(track_id))
+    pipeline.recognition_manager.close()
+
+    slow = set(AttributeScheduler.SLOW_ACTIONS)
+    # Frozen after two samples (t=0, 1); confidence halves every 5 s from t=1 and
+    # drops below 0.5 at t=7, where the attributes are sampled afresh
+    assert frozen[1:7] == [slow] * 6
+    assert frozen[7] == set()
+    assert frozen[8] == slow
+
+
+def test_tracks_with_work_in_flight_get_no_new_work(tmp_path):
+    """
+    Tests that while a plan's results are on their way (as with a process
+    pool), later plans do not send the same tracks to the models again,
+    and that applying the results lets the tracks be planned again.
+    """
+    pipeline = build_stub_pipeline(str(tmp_path / "faces.db"), faces_per_frame=2)
+    frame = np.random.default_rng(0).integers(0, 256, size=(240, 320, 3), dtype=np.uint8)
+    detections = pipeline.detect(frame)
+
+    first = pipeline.plan([detections], [pipeline.state], [0.0])
+    faces, regions, embed, groups = first.request()
+    assert len(faces) == 2 and len(embed) == 2
+    assert [indices for _, indices in groups] == [[0, 1]]
+
+    second = pipeline.plan([detections], [pipeline.state], [0.1])
+    assert second.empty
+    assert pipeline.apply(second, None, [])[0][0]['name'] == "Unknown"
+
+    results = pipeline.apply(first, *pipeline.models.infer(faces, regions, embed, groups))[0]
+    assert all(pipeline._is_complete(result['analysis']) for result in results)
+    assert not pipeline.state.pending
+    # Identities are cached now; only the attributes not yet frozen are due
+    third = pipeline.plan([detections], [pipeline.state], [0.2])
+    assert not third.embed and third.groups
+    pipeline.recognition_manager.close()
@@ -0,0 +1,176 @@
+# test_frame_source.py
+import time
+import cv2
+import numpy as np
+import pytest
+from core.frame_source import FrameSource, ImageDirectorySource, LoopbackStreamServer, open_frame_source
+from core.pipeline_stages import StagedPipeline
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for i in range(10):
+        cv2.imwrite(str(tmp_path / f"{i:03d}.png"), np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    return tmp_path
+
+
+def _read_all(source):
+    values = []
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            return values
+        values.append(int(frame[0, 0, 0]))
+
+
+def test_image_directory_source(image_dir):
+    """
+    Tests that an unpaced directory source yields every image in order, then
+    reports itself closed, and that looping starts over.
+    """
+    source = open_frame_source(str(image_dir), realtime=False, loop=False)
+    assert isinstance(source, ImageDirectorySource)
+    assert _read_all(source) == [i * 10 for i in range(10)]
+    assert not source.isOpened()
+    source.release()
+
+    source = open_frame_source(str(image_dir), realtime=False, loop=True)
+    values = [int(source.read()[1][0, 0, 0]) for _ in range(15)]
+    source.release()
+    assert values == [(i % 10) * 10 for i in range(15)]
+
+
+def test_video_file_source(image_dir):
+    """
+    Tests that a recorded video is decoded frame by frame and reports its fps.
+    """
+    path = str(image_dir / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(20):
+        writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    writer.release()
+
+    source = open_frame_source(path, realtime=False)
+    assert source.get(cv2.CAP_PROP_FPS) == 25
+    assert len(_read_all(source)) == 20
+    source.release()
+
+
+def test_realtime_pacing(image_dir):
+    """
+    Tests that realtime mode releases frames at the source frame rate.
+    """
+    source = ImageDirectorySource(str(image_dir), fps=100, realtime=True)
+    start = time.monotonic()
+    frames = len(_read_all(source))
+    elapsed = time.monotonic() - start
+    source.release()
+    assert frames >= 1
+    assert elapsed >= 0.08
+
+
+def test_loopback_stream(image_dir):
+    """
+    Tests that frames served over the loopback socket arrive intact.
+    """
+    server = LoopbackStreamServer(ImageDirectorySource(str(image_dir), realtime=False))
+    client = open_frame_source(server.url, realtime=False)
+    try:
+        values = _read_all(client)
+    finally:
+        client.release()
+        server.close()
+    assert [abs(value - i * 10) <= 2 for i, value in enumerate(values)] == [True] * 10
+
+
+class _CountingPipeline:
+    def process(self, frame, now=None):
+        return []
+
+
+class _SlowSource(FrameSource):
+    """Source whose frames take a while to decode."""
+
+    def _open(self):
+        return True
+
+    def _grab(self):
+        time.sleep(0.3)
+        return np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def test_read_timeout():
+    """
+    Tests that read(timeout=0) returns at once when no frame is ready,
+    while a plain read() waits for the decoder.
+    """
+    source = _SlowSource()
+    start = time.monotonic()
+    assert source.read(timeout=0) == (False, None)
+    assert time.monotonic() - start < 0.1
+    assert source.isOpened()
+    ret, frame = source.read()
+    source.release()
+    assert ret and frame.shape == (4, 4, 3)
+
+
+class _FakeVideoCapture:
+    """Stand-in cv2.VideoCapture that records the order of set() and read() calls."""
+
+    calls = []
+
+    def __init__(self, target):
+        self.calls.clear()
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        self.calls.append(('set', prop, value))
+        return True
+
+    def read(self):
+        self.calls.append(('read',))
+        time.sleep(0.01)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def test_camera_properties_are_set_before_decoding(monkeypatch):
+    """
+    Tests that camera properties are applied when the camera is opened,
+    before the decode thread reads its first frame.
+    """
+    monkeypatch.setattr(cv2, "VideoCapture", _FakeVideoCapture)
+    properties = {cv2.CAP_PROP_BRIGHTNESS: 150, cv2.CAP_PROP_CONTRAST: 150}
+    source = open_frame_source(0, camera_properties=properties)
+    assert source.read()[0]
+    source.release()
+
+    calls = _FakeVideoCapture.calls
+    assert calls[:2] == [('set', prop, value) for prop, value in properties.items()]
+    assert all(call == ('read',) for call in calls[2:])
+
+
+def test_staged_pipeline_finishes_recorded_source(image_dir):
+    """
+    Tests that the capture stage stops when a recorded source ends.
+    """
+    stages = StagedPipeline(
+        open_frame_source(str(image_dir), realtime=False), _CountingPipeline(),
+        analysis_interval=0, render_queue_size=20
+    )
+    stages.start()
+    deadline = time.time() + 5
+    while not stages._capture_ended.is_set() and time.time() < deadline:
+        time.sleep(0.01)
+    stages.stop()
+
+    assert stages.frames_captured == 10
+    rendered = 0
+    while not stages.capture_finished:
+        stages.render_queue.get(timeout=1)
+        rendered += 1
+    assert rendered == 10
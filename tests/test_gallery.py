@@ -0,0 +1,241 @@
+# test_gallery.py
+import sqlite3
+import numpy as np
+from core.gallery import EmbeddingGallery, MemmapGallery
+from utils.utils import serialize_embedding_blob
+
+
+def _loop_best_match(query, names, vectors):
+    """Reference implementation: the per-row cosine loop the gallery replaces."""
+    min_distance = float('inf')
+    best_match = "Unknown"
+    for name, stored in zip(names, vectors):
+        distance = 1 - np.dot(query, stored) / (np.linalg.norm(query) * np.linalg.norm(stored))
+        if distance < min_distance:
+            min_distance = distance
+            best_match = name
+    return best_match, min_distance
+
+
+def test_gallery_matches_loop():
+    """
+    Tests that the vectorized search agrees with the per-row loop.
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 128))
+    names = [f"person_{i}" for i in range(len(vectors))]
+
+    gallery = EmbeddingGallery()
+    gallery.set_rows(range(len(vectors)), names, vectors)
+
+    for _ in range(20):
+        query = vectors[rng.integers(len(vectors))] + rng.normal(scale=0.1, size=128)
+        expected_name, expected_distance = _loop_best_match(query, names, vectors)
+        name, distance = gallery.search(query, k=1)[0]
+        assert name == expected_name
+        assert abs(distance - expected_distance) < 1e-4
+
+
+def test_gallery_top_k_and_threshold():
+    """
+    Tests top-k ordering, incremental adds and the "Unknown" contract.
+    """
+    gallery = EmbeddingGallery()
+    assert gallery.best_match(np.ones(4), threshold=0.4) == ("Unknown", None)
+
+    gallery.add(1, "a", np.array([1.0, 0.0, 0.0, 0.0]))
+    gallery.add(2, "b", np.array([0.0, 1.0, 0.0, 0.0]))
+    gallery.add(3, "c", np.array([1.0, 1.0, 0.0, 0.0]))
+
+    results = gallery.search(np.array([1.0, 0.1, 0.0, 0.0]), k=3)
+    assert [name for name, _ in results] == ["a", "c", "b"]
+
+    name, distance = gallery.best_match(np.array([1.0, 0.1, 0.0, 0.0]), threshold=0.4)
+    assert name == "a" and distance < 0.01
+    assert gallery.best_match(np.array([0.0, 0.0, 1.0, 0.0]), threshold=0.4) == ("Unknown", None)
+
+
+def test_gallery_search_batch():
+    """
+    Tests that batched matching agrees with one query at a time.
+    """
+    rng = np.random.default_rng(8)
+    vectors = rng.normal(size=(300, 128))
+    gallery = EmbeddingGallery()
+    gallery.set_rows(range(len(vectors)), [f"person_{i}" for i in range(len(vectors))], vectors)
+    gallery.remove(10)
+
+    queries = vectors[[5, 10, 20, 30]] + rng.normal(scale=0.05, size=(4, 128))
+    batched = gallery.search_batch(queries, k=3)
+    for query, matches in zip(queries, batched):
+        expected = gallery.search(query, k=3)
+        assert [name for name, _ in matches] == [name for name, _ in expected]
+        np.testing.assert_allclose([d for _, d in matches], [d for _, d in expected], atol=1e-5)
+    assert gallery.best_match_batch(queries, threshold=0.4)[0][0] == "person_5"
+    assert gallery.best_match_batch(queries, threshold=0.4)[1][0] != "person_10"
+
+
+def _create_faces_db(db_path, embeddings):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, embedding BLOB NOT NULL)")
+        conn.executemany(
+            "INSERT INTO faces (name, embedding) VALUES (?, ?)",
+            [(f"person_{i}", serialize_embedding_blob(e)) for i, e in enumerate(embeddings)]
+        )
+
+
+def test_memmap_gallery(tmp_path):
+    """
+    Tests the memory-mapped snapshot, its delta and its rebuild on deletion.
+    """
+    db_path = str(tmp_path / "facial_data.db")
+    embeddings = np.random.default_rng(2).normal(size=(50, 128))
+    _create_faces_db(db_path, embeddings)
+
+    gallery = MemmapGallery.from_database(db_path)
+    assert isinstance(gallery.matrix, np.memmap)
+    assert len(gallery) == 50
+    assert gallery.search(embeddings[7], k=1)[0][0] == "person_7"
+
+    # Rows enrolled after the snapshot are served from the delta
+    new_embedding = np.random.default_rng(3).normal(size=128)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO faces (name, embedding) VALUES (?, ?)", ("newcomer", serialize_embedding_blob(new_embedding)))
+    reopened = MemmapGallery.from_database(db_path)
+    assert len(reopened.ids) == 50 and len(reopened.delta) == 1
+    assert reopened.search(new_embedding, k=1)[0][0] == "newcomer"
+
+    # Deleting a covered row invalidates the snapshot
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM faces WHERE name = 'person_7'")
+    rebuilt = MemmapGallery.from_database(db_path)
+    assert len(rebuilt) == 50
+    assert rebuilt.search(embeddings[7], k=1)[0][0] != "person_7"
+
+
+def test_memmap_gallery_survives_concurrent_rebuilds(tmp_path):
+    """
+    Tests that the previous snapshot generation outlives one rebuild, and
+    that a reader holding an index whose files a later rebuild removed maps
+    the current snapshot instead of failing.
+    """
+    db_path = str(tmp_path / "facial_data.db")
+    embeddings = np.random.default_rng(4).normal(size=(30, 128))
+    _create_faces_db(db_path, embeddings)
+    writer = MemmapGallery.from_database(db_path)
+    reader = MemmapGallery(db_path)
+
+    stale = reader._read_index()
+    writer.build()
+    reader._map_snapshot(stale)  # Still there after one rebuild
+    assert reader.search(embeddings[3], k=1)[0][0] == "person_3"
+
+    writer.build()
+    reader._map_current(stale)
+    assert reader.matrix.filename.endswith(f".{stale['generation'] + 2}.npy")
+    assert len(reader.ids) == 30
+    assert reader.search(embeddings[3], k=1)[0][0] == "person_3"
+
+
+def test_gallery_refresh_applies_only_changes(tmp_path):
+    """
+    Tests that refresh() picks up inserts, updates and deletes made through
+    another connection, for both gallery backends.
+    """
+    db_path = str(tmp_path / "facial_data.db")
+    embeddings = np.random.default_rng(6).normal(size=(20, 128))
+    _create_faces_db(db_path, embeddings)
+
+    memory = EmbeddingGallery.from_database(db_path)
+    memmap = MemmapGallery.from_database(db_path)
+    assert memory.refresh() == 0
+
+    new_embedding = np.random.default_rng(7).normal(size=128)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO faces (name, embedding) VALUES (?, ?)", ("newcomer", serialize_embedding_blob(new_embedding)))
+        conn.execute("DELETE FROM faces WHERE name = 'person_3'")
+        conn.execute("UPDATE faces SET name = 'renamed' WHERE name = 'person_5'")
+
+    for gallery in (memory, memmap):
+        assert gallery.refresh() == 3
+        assert len(gallery) == 20
+        assert gallery.search(new_embedding, k=1)[0][0] == "newcomer"
+        assert gallery.search(embeddings[3], k=1)[0][0] != "person_3"
+        assert gallery.search(embeddings[5], k=1)[0][0] == "renamed"
+        assert gallery.refresh() == 0
+
+    # Enough deletions compact the in-memory matrix
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM faces WHERE id <= 10")
+    memory.refresh()
+    assert memory.deleted_count == 0
+    assert len(memory.ids) == len(memory) == 11
+
+
+def test_ann_index(tmp_path):
+    """
+    Tests the IVF index: exact fallback, recall, persistence and newly added rows.
+    """
+    vectors = np.random.default_rng(4).normal(size=(2000, 128))
+    gallery = EmbeddingGallery()
+    gallery.set_rows(range(len(vectors)), [f"person_{i}" for i in range(len(vectors))], vectors)
+    index_path = str(tmp_path / "faces.ivf.npz")
+
+    gallery.attach_ann_index(index_path, nlist=16, min_size=5000)
+    assert gallery.ann_index is None
+
+    gallery.attach_ann_index(index_path, nlist=16, nprobe=16, min_size=1000)
+    assert gallery.ann_index is not None
+    for i in range(0, 2000, 200):
+        assert gallery.search(vectors[i], k=1)[0][0] == f"person_{i}"
+
+    reloaded = EmbeddingGallery()
+    reloaded.set_rows(gallery.ids, gallery.names, vectors)
+    reloaded.attach_ann_index(index_path, nlist=16, nprobe=16, min_size=1000)
+    np.testing.assert_array_equal(reloaded.ann_index.row_ids, gallery.ann_index.row_ids)
+
+    new_embedding = np.random.default_rng(5).normal(size=128)
+    reloaded.add(5000, "newcomer", new_embedding)
+    assert reloaded.search(new_embedding, k=1)[0][0] == "newcomer"
+
+
+def test_ann_index_rebuilds_as_gallery_grows(tmp_path):
+    """
+    Tests that a background-built ANN index appears once the gallery grows
+    past min_size and is rebuilt when the unindexed tail outgrows it.
+    """
+    vectors = np.random.default_rng(6).normal(size=(1600, 128))
+    names = [f"person_{i}" for i in range(len(vectors))]
+    gallery = EmbeddingGallery()
+    gallery.set_rows(range(500), names[:500], vectors[:500])
+    gallery.attach_ann_index(str(tmp_path / "faces.ivf.npz"), nlist=8, nprobe=8, min_size=1000, background=True)
+    assert not gallery.wait_for_ann_index()
+
+    gallery.add_rows(range(500, 1000), names[500:1000], vectors[500:1000])
+    assert gallery.wait_for_ann_index(timeout=30)
+    assert gallery.ann_index.size == 1000
+
+    # A tail within ANN_REBUILD_RATIO of the index is scanned exactly
+    gallery.add_rows(range(1000, 1100), names[1000:1100], vectors[1000:1100])
+    gallery.wait_for_ann_index(timeout=30)
+    assert gallery.ann_index.size == 1000
+    assert gallery.search(vectors[1050], k=1)[0][0] == "person_1050"
+
+    gallery.add_rows(range(1100, 1600), names[1100:1600], vectors[1100:1600])
+    gallery.wait_for_ann_index(timeout=30)
+    assert gallery.ann_index.size == 1600
+    for i in range(0, 1600, 160):
+        assert gallery.search(vectors[i], k=1)[0][0] == f"person_{i}"
+
+    # Compaction renumbers rows, so the index is dropped and rebuilt over the survivors
+    for face_id in range(500):
+        gallery.remove(face_id)
+    gallery.wait_for_ann_index(timeout=30)
+    assert gallery.ann_index.size == len(gallery.ids) < 1600
+    assert len(gallery) == 1100
+    assert gallery.search(vectors[1200], k=1)[0][0] == "person_1200"
+
+
+if __name__ == "__main__":
+    test_gallery_matches_loop()
+    test_gallery_top_k_and_threshold()
@@ -0,0 +1,58 @@
+# test_identity_cache.py
+from core.identity_cache import IdentityCache
+
+
+def test_identity_cache_hits_until_reverification():
+    """
+    Tests that cached identities are reused, and re-verified after the TTL,
+    every Nth lookup and on a sharp box change.
+    """
+    cache = IdentityCache(ttl=10.0, reverify_every=3, max_box_change=0.3)
+    box = (0, 0, 100, 100)
+    assert cache.lookup(1, box, now=0.0) is None
+
+    cache.put(1, "alice", 0.2, {'name': "alice"}, box, now=0.0)
+    entry = cache.lookup(1, (5, 5, 105, 100), now=1.0)
+    assert entry.name == "alice" and entry.person_details == {'name': "alice"}
+    assert cache.lookup(1, box, now=2.0) is not None
+    assert cache.lookup(1, box, now=3.0) is None  # Third lookup: periodic re-verification
+
+    cache.put(1, "alice", 0.2, None, box, now=3.0)
+    assert cache.lookup(1, (0, 0, 150, 150), now=3.5) is None  # Face grew sharply
+    assert cache.lookup(1, (0, 0, 60, 100), now=3.5) is None  # Shape changed sharply
+    cache.put(1, "alice", 0.2, None, box, now=4.0)
+    assert cache.lookup(1, box, now=14.5) is None  # TTL expired
+
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 5
+
+
+def test_unknown_is_reverified_sooner_than_a_match():
+    """
+    Tests that an "Unknown" result is only trusted for the short unknown
+    TTL, so a face that failed to match is tried again soon, while a match
+    is kept for the full TTL.
+    """
+    cache = IdentityCache(ttl=10.0, reverify_every=0, max_box_change=0.3, unknown_ttl=1.0)
+    box = (0, 0, 100, 100)
+    cache.put(1, "Unknown", None, None, box, now=0.0)
+    cache.put(2, "alice", 0.2, None, box, now=0.0)
+
+    assert cache.lookup(1, box, now=0.5) is not None
+    assert cache.lookup(1, box, now=1.5) is None
+    assert cache.lookup(2, box, now=1.5).name == "alice"
+    assert cache.lookup(2, box, now=9.5) is not None
+
+
+def test_identity_cache_evicts_lost_tracks():
+    """
+    Tests that entries of lost tracks are dropped.
+    """
+    cache = IdentityCache(ttl=10.0, reverify_every=0, max_box_change=0.3)
+    for track_id in (1, 2, 3):
+        cache.put(track_id, "Unknown", float('inf'), None, (0, 0, 10, 10), now=0.0)
+
+    cache.evict([2, 3, 4])
+    assert len(cache) == 1
+    assert cache.stats()['evictions'] == 2
+    assert cache.lookup(2, (0, 0, 10, 10), now=1.0) is None
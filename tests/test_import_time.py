@@ -0,0 +1,36 @@
+# test_import_time.py
+import os
+import sys
+import subprocess
+import pytest
+
+# Import cost of main.py (and the Tk menu behind it); normally well under 0.3s
+IMPORT_BUDGET_SECONDS = 1.0
+# Modules that must only load on first use, not when the menu starts
+HEAVY_MODULES = ('deepface', 'tensorflow', 'keras', 'torch', 'cv2', 'PIL')
+
+
+def test_menu_import_stays_light():
+    """
+    Tests that importing main does not load the ML stack and stays within
+    the import-time budget, measured with python -X importtime.
+    """
+    pytest.importorskip("tkinter")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=root, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total.strip())
+
+    heavy = sorted(name for name in cumulative if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"Menu imports heavy modules: {heavy}"
+    assert cumulative["main"] / 1e6 < IMPORT_BUDGET_SECONDS
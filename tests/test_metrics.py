@@ -0,0 +1,66 @@
+# test_metrics.py
+import urllib.request
+from utils.metrics import MetricsRegistry, MetricsServer
+
+
+def test_histogram_percentiles_and_counters():
+    """
+    Tests rolling percentiles over the most recent window and the counter,
+    gauge and summary outputs.
+    """
+    registry = MetricsRegistry(window=100)
+    histogram = registry.histogram("stage_seconds", "Stage latency", stage="detect")
+    for value in range(1000):
+        histogram.observe(value / 1000)
+
+    quantiles = histogram.quantiles()
+    assert histogram.count == 1000
+    # Only the last 100 observations (0.900 .. 0.999) are in the window
+    assert 0.94 < quantiles[0.5] < 0.96
+    assert quantiles[0.99] > 0.99
+
+    assert registry.histogram("stage_seconds", stage="detect") is histogram
+    registry.counter("identity_cache_total", result="hit").inc(3)
+    registry.gauge("gallery_size").set(42)
+
+    snapshot = registry.snapshot()
+    assert snapshot['identity_cache_total{result="hit"}'] == 3
+    assert snapshot['gallery_size'] == 42
+    assert 'stage_seconds{stage="detect"}' in registry.summary()
+
+
+def test_disabled_registry_records_nothing():
+    """
+    Tests that a disabled registry ignores updates and times nothing.
+    """
+    registry = MetricsRegistry(enabled=False)
+    histogram = registry.histogram("stage_seconds", stage="match")
+    with histogram.time():
+        pass
+    histogram.observe(1.0)
+    registry.counter("frames_total").inc()
+
+    assert histogram.count == 0 and histogram.quantiles() is None
+    assert registry.counter("frames_total").value == 0
+
+
+def test_prometheus_endpoint():
+    """
+    Tests the Prometheus text served by the metrics endpoint.
+    """
+    registry = MetricsRegistry()
+    with registry.histogram("stage_seconds", "Stage latency", stage="detect").time():
+        pass
+    registry.counter("frames_total", "Frames", stage="captured").inc(5)
+
+    server = MetricsServer(registry).start()
+    try:
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            body = response.read().decode()
+    finally:
+        server.stop()
+
+    assert "# TYPE facerec_stage_seconds summary" in body
+    assert 'facerec_stage_seconds{quantile="0.99",stage="detect"}' in body
+    assert 'facerec_stage_seconds_count{stage="detect"} 1' in body
+    assert 'facerec_frames_total{stage="captured"} 5' in body
@@ -0,0 +1,100 @@
+# test_multi_stream.py
+import time
+import numpy as np
+from core.multi_stream import MultiStreamRunner
+
+
+class _EndlessSource:
+    """Stand-in source that always has a new frame."""
+
+    def read(self):
+        time.sleep(0.001)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+class _RecordingPipeline:
+    """Stand-in FramePipeline that records how frames were batched."""
+
+    def __init__(self):
+        self.batches = []
+
+    def process_many(self, frames, states, nows=None):
+        self.batches.append(len(frames))
+        time.sleep(0.002)
+        return [[] for _ in frames]
+
+
+def test_select_follows_priorities_and_max_fps():
+    """
+    Tests that stride scheduling shares inference by priority and that a
+    rate-limited stream is held back until its interval has passed.
+    """
+    runner = MultiStreamRunner(_RecordingPipeline(), max_batch_frames=1)
+    high = runner.add_stream("high", None, priority=2)
+    low = runner.add_stream("low", None, priority=1)
+    limited = runner.add_stream("limited", None, priority=100, max_fps=1)
+
+    picks = {"high": 0, "low": 0, "limited": 0}
+    for tick in range(300):
+        now = tick * 0.01
+        for stream in runner.streams:
+            stream.latest = (tick, now, None)
+        for stream, *_ in runner._select(now):
+            picks[stream.name] += 1
+
+    assert picks["limited"] == 3  # Once per second over 3 seconds
+    assert abs(picks["high"] / picks["low"] - 2) < 0.1
+
+
+def test_priorities_hold_when_the_batch_has_room():
+    """
+    Tests that at the default batch size, where every ready stream would
+    fit in each batch, a priority-2 stream still gets twice the frames of a
+    priority-1 stream and equal priorities share batches.
+    """
+    runner = MultiStreamRunner(_RecordingPipeline())
+    assert runner.max_batch_frames >= 3
+    runner.add_stream("high", None, priority=2)
+    runner.add_stream("low", None, priority=1)
+    runner.add_stream("low2", None, priority=1)
+
+    picks = {"high": 0, "low": 0, "low2": 0}
+    batch_sizes = []
+    for tick in range(300):
+        for stream in runner.streams:
+            stream.latest = (tick, 0.0, None)
+        selected = runner._select(0.0)
+        batch_sizes.append(len(selected))
+        for stream, *_ in selected:
+            picks[stream.name] += 1
+
+    assert picks["high"] == 300
+    assert picks["low"] == picks["low2"] == 150
+    assert max(batch_sizes) == 3
+
+
+def test_runner_batches_frames_across_streams():
+    """
+    Tests that frames from several streams are processed together and that
+    every stream reports fps and latency.
+    """
+    pipeline = _RecordingPipeline()
+    runner = MultiStreamRunner(pipeline, max_batch_frames=3)
+    for name in ("a", "b", "c"):
+        runner.add_stream(name, _EndlessSource())
+
+    runner.start()
+    time.sleep(0.3)
+    runner.stop()
+
+    assert max(pipeline.batches) > 1
+    for stats in runner.stats().values():
+        assert stats['processed'] > 0
+        assert stats['fps'] > 0
+        assert stats['latency_p95_ms'] >= stats['latency_p50_ms'] > 0
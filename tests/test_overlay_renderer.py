@@ -0,0 +1,32 @@
+# test_overlay_renderer.py
+import numpy as np
+from core.overlay_renderer import OverlayRenderer
+from benchmarks.bench_overlay import legacy_draw_text_with_background
+
+
+def test_renderer_matches_full_frame_blending():
+    """
+    Tests that ROI blending with cached sprites draws the same pixels as the
+    full-frame copy-and-blend, including labels clipped at the frame edges.
+    """
+    frame = np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    labels = [
+        ("Age: 31", (40, 60), (255, 255, 0)),
+        ("Emotion: Happy", (-15, 8), (0, 255, 0)),
+        ("Gender: Male (99.12%)", (250, 236), (255, 255, 0)),
+        ("Age: 31", (40, 120), (255, 255, 0)),
+        ("Off screen", (400, -50), (255, 255, 0)),
+    ]
+
+    expected = frame.copy()
+    for text, position, color in labels:
+        legacy_draw_text_with_background(expected, text, position, color=color)
+
+    renderer = OverlayRenderer()
+    actual = frame.copy()
+    for text, position, color in labels:
+        renderer.add_text(text, position, color=color)
+    renderer.render(actual)
+
+    np.testing.assert_array_equal(actual, expected)
+    assert renderer.cache_hits == 1 and renderer.cache_misses == 4
@@ -0,0 +1,253 @@
+# test_pipeline_stages.py
+import os
+import time
+import queue
+import numpy as np
+import pytest
+from core.pipeline_stages import DropOldestQueue, StagedPipeline
+from core.process_pool import ProcessInferencePool
+from core.stub_models import build_stub_models, build_stub_pipeline
+
+
+class _FakeCapture:
+    """Stand-in camera that numbers its frames."""
+
+    def __init__(self):
+        self.count = 0
+
+    def read(self):
+        time.sleep(0.001)
+        self.count += 1
+        return True, np.full((4, 4, 3), self.count % 256, dtype=np.uint8)
+
+
+class _SlowPipeline:
+    """Stand-in FramePipeline that takes a while per frame."""
+
+    def process(self, frame, now=None):
+        time.sleep(0.02)
+        return [{'value': int(frame[0, 0, 0])}]
+
+
+def test_drop_oldest_queue():
+    """
+    Tests that a full queue discards its oldest item and counts the drop.
+    """
+    q = DropOldestQueue(2, "test")
+    for item in range(5):
+        q.put(item)
+
+    assert q.stats() == {'depth': 2, 'maxsize': 2, 'puts': 5, 'drops': 3}
+    assert q.get() == 3
+    assert q.get() == 4
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.01)
+
+
+def test_staged_pipeline_drops_frames_under_slow_inference():
+    """
+    Tests that capture keeps running while inference lags behind, and that
+    the lag shows up as drops rather than as a growing queue.
+    """
+    stages = StagedPipeline(_FakeCapture(), _SlowPipeline(), analysis_interval=0)
+    stages.start()
+    try:
+        deadline = time.time() + 5
+        while stages.frames_analyzed < 3 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        stages.stop()
+
+    stats = stages.stats()
+    assert stats['frames_analyzed'] >= 3
+    assert stats['frames_captured'] > stats['frames_analyzed']
+    assert stats['queues']['inference']['depth'] <= 1
+    assert stats['queues']['inference']['drops'] > 0
+    assert stats['queues']['render']['depth'] <= 2
+
+    frame_id, _, results = stages.latest_results()
+    assert frame_id > 0 and len(results) == 1
+
+
+class _MeanModels:
+    """Stand-in FaceModels that reports each face's mean pixel value."""
+
+    def infer(self, faces, regions, embed, groups):
+        time.sleep(0.001 * (len(faces) % 3))
+        return [round(float(faces[i].mean()) * 255) for i in embed], groups
+
+
+def _mean_models():
+    return _MeanModels()
+
+
+def _faces(value, count=1):
+    return [np.full((8, 8, 3), value / 255.0, dtype=np.float32)] * count
+
+
+def test_process_pool_returns_results_in_submission_order():
+    """
+    Tests that faces sent through the shared-memory ring come back intact
+    and in submission order from several worker processes.
+    """
+    pool = ProcessInferencePool(workers=2, slots=3, models_factory=_mean_models)
+    values = list(range(10))
+    received = []
+    try:
+        pending = list(values)
+        deadline = time.time() + 60
+        while len(received) < len(values) and time.time() < deadline:
+            while pending:
+                count = pending[0] % 3 + 1
+                groups = [(('emotion',), list(range(count)))]
+                if pool.submit(_faces(pending[0], count), [None] * count, [0], groups) is None:
+                    break
+                pending.pop(0)
+            received.extend(pool.collect(timeout=0.05))
+    finally:
+        pool.close()
+
+    assert [seq for seq, _ in received] == values
+    assert [output[0] for _, output in received] == [[value] for value in values]
+    assert [output[1][0][1] for _, output in received] == [list(range(value % 3 + 1)) for value in values]
+
+
+class _CrashingModels:
+    """Stand-in FaceModels whose worker process dies on a marked face."""
+
+    def infer(self, faces, regions, embed, groups):
+        if faces[0][0, 0, 0] == 1.0:
+            time.sleep(0.5)  # Let the result of the previous request be flushed first
+            os._exit(1)
+        return [round(float(faces[0].mean()) * 255)], []
+
+
+def _crashing_models():
+    return _CrashingModels()
+
+
+def test_process_pool_survives_a_dead_worker():
+    """
+    Tests that when a worker dies mid-request, that request is given up
+    after its deadline, the worker is restarted and later requests are released.
+    """
+    pool = ProcessInferencePool(workers=1, slots=2, models_factory=_crashing_models, task_timeout=3.0)
+    values = [1, 255, 2, 3]
+    received = []
+    try:
+        pending = list(values)
+        deadline = time.time() + 60
+        while len(received) < len(values) and time.time() < deadline:
+            while pending and pool.submit(_faces(pending[0]), [None], [0], []) is not None:
+                pending.pop(0)
+            received.extend(pool.collect(timeout=0.05))
+    finally:
+        pool.close()
+
+    assert [seq for seq, _ in received] == [0, 1, 2, 3]
+    assert received[1][1] is None
+    assert [output[0] for seq, output in received if seq != 1] == [[1], [2], [3]]
+    assert pool.restarts == 1 and pool.timeouts == 1
+
+
+class _MovingCapture:
+    """Stand-in camera whose frames change every time, so stub faces move and stay recognizable."""
+
+    def __init__(self):
+        self.count = 0
+        self.rng = np.random.default_rng(0)
+
+    def read(self):
+        time.sleep(0.002)
+        self.count += 1
+        return True, self.rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+
+
+class _NoModels:
+    """Stand-in for the parent's FaceModels: with a pool, inference must not run here."""
+
+    def infer(self, *args):
+        raise AssertionError("models ran in the parent process")
+
+
+def test_staged_pipeline_runs_models_in_the_pool(tmp_path):
+    """
+    Tests that in process-pool mode the workers run the embedding and
+    attribute models while the parent tracks every analyzed frame and
+    publishes complete results in frame order.
+    """
+    pipeline = build_stub_pipeline(str(tmp_path / "faces.db"), faces_per_frame=2)
+    pipeline.models = _NoModels()
+    pool = ProcessInferencePool(workers=2, slots=3, models_factory=build_stub_models)
+    stages = StagedPipeline(_MovingCapture(), pipeline, analysis_interval=10.0, process_pool=pool)
+    published = []
+    stages.start()
+    try:
+        deadline = time.time() + 60
+        while len(published) < 10 and time.time() < deadline:
+            latest = stages.latest_results()
+            if latest is not None:
+                published.append(latest)
+            time.sleep(0.005)
+    finally:
+        stages.stop()
+        pipeline.recognition_manager.close()
+
+    # Far more frames than one per analysis interval
+    assert len(published) == 10
+    frame_ids = [frame_id for frame_id, _, _ in published]
+    assert frame_ids == sorted(frame_ids)
+    results = published[-1][2]
+    assert len(results) == 2
+    assert all(pipeline._is_complete(result['analysis']) for result in results)
+
+
+class _ResolutionSwitchingCapture(_MovingCapture):
+    """Stand-in camera that alternates between a small and a large resolution every few frames."""
+
+    def read(self):
+        ret, frame = super().read()
+        if self.count // 5 % 2:
+            frame = np.repeat(np.repeat(frame, 4, axis=0), 4, axis=1)
+        return ret, frame
+
+
+def _center_face(frame):
+    """Detector whose one face is the middle quarter of the frame, so crops grow with the frame"""
+    height, width = frame.shape[:2]
+    x, y, w, h = width // 4, height // 4, width // 2, height // 2
+    return [{
+        'face': frame[y:y + h, x:x + w, ::-1].astype(np.float32) / 255.0,
+        'facial_area': {'x': x, 'y': y, 'w': w, 'h': h},
+        'confidence': 1.0,
+    }]
+
+
+def test_staged_pipeline_survives_frame_shape_changes(tmp_path):
+    """
+    Tests that frames of two shapes both get analyzed in process-pool mode,
+    including ones whose crops do not fit in a ring slot, and that the
+    inference thread keeps running.
+    """
+    pipeline = build_stub_pipeline(str(tmp_path / "faces.db"))
+    pipeline.detector = _center_face
+    # Small frames' crops (60x80) fit in a slot, large frames' (240x320) do not
+    pool = ProcessInferencePool(workers=1, slots=2, models_factory=build_stub_models, slot_bytes=20000)
+    stages = StagedPipeline(_ResolutionSwitchingCapture(), pipeline, process_pool=pool)
+    sizes = set()
+    stages.start()
+    try:
+        deadline = time.time() + 60
+        while len(sizes) < 2 and time.time() < deadline:
+            latest = stages.latest_results()
+            if latest is not None and latest[2]:
+                sizes.add(latest[2][0]['facial_area']['w'])
+            time.sleep(0.005)
+        assert all(thread.is_alive() for thread in stages._threads)
+    finally:
+        stages.stop()
+        pipeline.recognition_manager.close()
+
+    assert sizes == {80, 320}
+    assert pool.oversized > 0
+    assert stages.pool_drops == 0
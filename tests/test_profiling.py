@@ -0,0 +1,60 @@
+# test_profiling.py
+import os
+import pstats
+import numpy as np
+from contextlib import nullcontext
+from utils.profiling import Profiler
+
+
+def _work():
+    return sum(np.ones(1000).tolist())
+
+
+def test_disabled_profiler_is_a_no_op(tmp_path):
+    """
+    Tests that a disabled profiler hands out the shared no-op context and
+    writes nothing.
+    """
+    profiler = Profiler(enabled=False, output_dir=str(tmp_path))
+    assert isinstance(profiler.tick(), nullcontext)
+    profiler.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_sampled_ticks_are_dumped_and_rotated(tmp_path):
+    """
+    Tests that every sample_every-th tick is profiled, that dump_every
+    sampled ticks go into one .prof file and that old files are rotated out.
+    """
+    profiler = Profiler(enabled=True, sample_every=3, dump_every=2, snapshot_interval=0,
+                        output_dir=str(tmp_path), max_files=2)
+    for _ in range(24):
+        with profiler.tick():
+            _work()
+    profiler.close()
+
+    profiles = sorted(name for name in os.listdir(tmp_path) if name.endswith(".prof"))
+    # 8 sampled ticks -> 4 dumps, of which the newest 2 are kept
+    assert len(profiles) == 2
+    stats = pstats.Stats(str(tmp_path / profiles[-1]))
+    assert any(function[2] == "_work" for function in stats.stats)
+
+
+def test_tracemalloc_report_lists_growth(tmp_path):
+    """
+    Tests that the second snapshot writes a diff report naming the line
+    that allocated memory in between.
+    """
+    profiler = Profiler(enabled=True, sample_every=1000, snapshot_interval=1e-9, output_dir=str(tmp_path))
+    with profiler.tick():
+        pass
+    kept = [bytearray(100000) for _ in range(20)]
+    with profiler.tick():
+        pass
+    profiler.close()
+
+    reports = [name for name in os.listdir(tmp_path) if name.startswith("tracemalloc_")]
+    assert len(reports) == 1
+    report = (tmp_path / reports[0]).read_text()
+    assert "test_profiling.py" in report
+    assert len(kept) == 20
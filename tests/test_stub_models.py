@@ -0,0 +1,63 @@
+# test_stub_models.py
+import cv2
+import numpy as np
+from core.stub_models import StubDetector, StubEmbedder, StubAttributeAnalyzer, build_stub_pipeline
+from benchmarks.bench_replay import enroll, run_replay
+
+
+def _frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=(240, 320, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def test_stub_models_are_deterministic():
+    """
+    Tests that the stub models give identical output for identical input
+    and produce results in the layout of the real models.
+    """
+    frame = _frames(1)[0]
+    detector = StubDetector(faces_per_frame=3)
+    faces = detector(frame)
+    assert len(faces) == 3
+    assert faces[0]['face'].dtype == np.float32 and faces[0]['face'].max() <= 1.0
+    assert [face['facial_area'] for face in faces] == [face['facial_area'] for face in detector(frame.copy())]
+
+    embeddings = StubEmbedder().embed([face['face'] for face in faces])
+    assert embeddings.shape == (3, 128)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(embeddings, StubEmbedder().embed([face['face'] for face in faces]))
+
+    analysis = StubAttributeAnalyzer().analyze([faces[0]['face']])[0]
+    assert analysis['dominant_gender'] in StubAttributeAnalyzer.GENDER_LABELS
+    assert abs(sum(analysis['emotion'].values()) - 100) < 1e-6
+    assert analysis == StubAttributeAnalyzer().analyze([faces[0]['face']])[0]
+
+
+def test_stub_pipeline_recognizes_enrolled_faces(tmp_path):
+    """
+    Tests the full FramePipeline on stub models: enrolled faces are
+    recognized and every face gets a complete analysis.
+    """
+    pipeline = build_stub_pipeline(str(tmp_path / "faces.db"), faces_per_frame=2)
+    frames = _frames(3)
+    assert enroll(pipeline, frames) == 3
+
+    results = pipeline.process(frames[1], now=1.0)
+    assert [result['name'] for result in results] == ["person_1", "Unknown"]
+    assert all(pipeline._is_complete(result['analysis']) for result in results)
+    pipeline.recognition_manager.close()
+
+
+def test_replay_reports_stages(tmp_path):
+    """
+    Tests a short hermetic replay over an image directory.
+    """
+    for i, frame in enumerate(_frames(5)):
+        cv2.imwrite(str(tmp_path / f"{i:03d}.png"), frame)
+
+    result = run_replay("stub", str(tmp_path), frames=20, fps=30.0, enroll_frames=2, faces_per_frame=2)
+
+    assert result['frames'] == 20
+    assert result['fps'] > 0 and result['peak_rss_bytes'] > 0
+    assert result['recognized'] > 0
+    assert {"detect", "embed", "match", "analyze", "overlay", "frame"} <= set(result['stages'])
@@ -1 +1,57 @@
-# not used yet
\ No newline at end of file
+# test_utils.py
+import sqlite3
+import numpy as np
+from utils import serialize_embedding, serialize_embedding_blob, load_embedding
+from utils.database_utils import migrate_embeddings_to_blob, get_embedding_metadata
+from core.gallery import EmbeddingGallery
+
+
+def test_embedding_formats_round_trip():
+    """
+    Tests that both storage formats decode to the same float32 vector.
+    """
+    embedding = np.random.default_rng(0).normal(size=128)
+
+    blob = serialize_embedding_blob(embedding)
+    assert len(blob) == 128 * 4
+    np.testing.assert_array_equal(load_embedding(blob), embedding.astype(np.float32))
+
+    legacy = serialize_embedding(embedding)
+    np.testing.assert_allclose(load_embedding(legacy), embedding)
+
+
+def test_migrate_embeddings_to_blob(tmp_path):
+    """
+    Tests that the migration rewrites legacy rows in place and is resumable.
+    """
+    db_path = str(tmp_path / "faces.db")
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(7, 128))
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, embedding TEXT NOT NULL)")
+        conn.executemany(
+            "INSERT INTO faces (name, embedding) VALUES (?, ?)",
+            [(f"person_{i}", serialize_embedding(e)) for i, e in enumerate(embeddings)]
+        )
+        # A row already in the new format, as if a previous run was interrupted
+        conn.execute("UPDATE faces SET embedding = ? WHERE id = 1", (serialize_embedding_blob(embeddings[0]),))
+
+    # Both formats are readable mid-migration
+    assert len(EmbeddingGallery.from_database(db_path)) == 7
+
+    assert migrate_embeddings_to_blob(db_path, batch_size=2) == 6
+    assert migrate_embeddings_to_blob(db_path) == 0
+
+    with sqlite3.connect(db_path) as conn:
+        types = {row[0] for row in conn.execute("SELECT typeof(embedding) FROM faces")}
+        assert types == {"blob"}
+        assert get_embedding_metadata(conn)['dim'] == 128
+
+    gallery = EmbeddingGallery.from_database(db_path)
+    name, distance = gallery.search(embeddings[4], k=1)[0]
+    assert name == "person_4" and distance < 1e-5
+
+
+if __name__ == "__main__":
+    test_embedding_formats_round_trip()
@@ -2,6 +2,7 @@
 import cv2
 import logging
 from core.recognition_manager import RecognitionManager
+from core.frame_source import open_frame_source
 import tkinter as tk
 from tkinter import ttk
 
@@ -18,7 +19,7 @@ class AddFaceUI:
         Initializes the AddFaceUI.
         """
         self.recognition_manager = RecognitionManager()
-        self.video_capture = cv2.VideoCapture(0)  # Use webcam
+        self.video_capture = open_frame_source()  # Config.FRAME_SOURCE, by default the webcam
         logging.info("AddFaceUI initialized.")
 
     def capture_face(self, name, gender, race):
@@ -1,14 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import cv2
 import os
-import numpy as np
 from datetime import datetime
-from PIL import Image, ImageTk
-from core.main_application import MainApplication
-from core.recognition_manager import RecognitionManager
 import logging
 
+# OpenCV, PIL and the recognition stack (DeepFace/TensorFlow) are imported in
+# the methods that use them, so the main menu opens without loading them
+
 class FaceRecognitionUI:
     def __init__(self):
         """Initialize the main UI window"""
@@ -71,6 +69,8 @@ class FaceRecognitionUI:
 
     def start_recognition(self):
         """Start the recognition system"""
+        from core.main_application import MainApplication
+
         self.root.withdraw()  # Hide main window
         app = MainApplication()
         app.run()
@@ -213,6 +213,9 @@ class AddPersonWindow:
 
     def start_camera(self):
         """Validate inputs and start the camera"""
+        import cv2
+        from core.frame_source import open_frame_source
+
         # Validate required fields
         if not self.name_entry.get():
             messagebox.showerror("Error", "Please enter a name")
@@ -231,17 +234,21 @@ class AddPersonWindow:
             return
 
         self.window.withdraw()
-        self.capture = cv2.VideoCapture(0)
-        
-        # Set camera properties for better color
-        self.capture.set(cv2.CAP_PROP_AUTO_WB, 0.5)  # Adjust white balance
-        self.capture.set(cv2.CAP_PROP_BRIGHTNESS, 150)  # Adjust brightness
-        self.capture.set(cv2.CAP_PROP_CONTRAST, 150)  # Adjust contrast
+        # Camera properties for better color, applied before the decode thread starts reading
+        self.capture = open_frame_source(camera_properties={
+            cv2.CAP_PROP_AUTO_WB: 0.5,  # Adjust white balance
+            cv2.CAP_PROP_BRIGHTNESS: 150,  # Adjust brightness
+            cv2.CAP_PROP_CONTRAST: 150,  # Adjust contrast
+        })
         
         self.show_camera_window()
 
     def show_camera_window(self):
         """Show the camera window with capture button"""
+        import cv2
+        import numpy as np
+        from PIL import Image, ImageTk
+
         camera_window = tk.Toplevel()
         camera_window.title("Capture Photo")
         camera_window.geometry("800x700")  # Made taller for the button
@@ -269,7 +276,8 @@ class AddPersonWindow:
         capture_button.pack(pady=20)
 
         def update_frame():
-            ret, frame = self.capture.read()
+            # Never wait on the Tk thread; without a new frame the last one stays up
+            ret, frame = self.capture.read(timeout=0)
             if ret:
                 # Apply color corrections
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -298,6 +306,9 @@ class AddPersonWindow:
 
     def capture_photo(self, camera_window):
         """Capture and save the photo"""
+        import cv2
+        from core.recognition_manager import RecognitionManager
+
         ret, frame = self.capture.read()
         if ret:
             # Create directory if it doesn't exist
@@ -334,6 +345,8 @@ class AddPersonWindow:
     def cleanup_camera(self):
         """Clean up camera resources"""
         if self.capture is not None:
+            import cv2
+
             self.capture.release()
             cv2.destroyAllWindows()
 
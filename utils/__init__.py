@@ -1,12 +1,22 @@
 # This makes the utils directory a Python package
 # Import and expose utility functions
-from .utils import serialize_embedding, deserialize_embedding, calculate_embedding_distance
+from .utils import (
+    serialize_embedding,
+    deserialize_embedding,
+    serialize_embedding_blob,
+    deserialize_embedding_blob,
+    load_embedding,
+    calculate_embedding_distance
+)
 from .logging_utils import setup_logging
 
 # List all public exports from this package
 __all__ = [
     'serialize_embedding',
     'deserialize_embedding',
+    'serialize_embedding_blob',
+    'deserialize_embedding_blob',
+    'load_embedding',
     'calculate_embedding_distance',
     'setup_logging'
 ]
\ No newline at end of file
@@ -1,10 +1,11 @@
 # database_utils.py
+import sys
 import sqlite3
 import logging
-from utils import serialize_embedding, deserialize_embedding
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+import weakref
+import threading
+from contextlib import contextmanager
+from utils.utils import serialize_embedding_blob, load_embedding, EMBEDDING_DTYPE
 
 def initialize_database(db_path):
     """
@@ -21,7 +22,7 @@ def initialize_database(db_path):
             CREATE TABLE IF NOT EXISTS faces (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
-                embedding TEXT NOT NULL
+                embedding BLOB NOT NULL
             )
             """
         )
@@ -43,8 +44,8 @@ def add_face_to_database(db_path, name, embedding):
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
-        embedding_str = serialize_embedding(embedding)
-        cursor.execute("INSERT INTO faces (name, embedding) VALUES (?, ?)", (name, embedding_str))
+        embedding_blob = serialize_embedding_blob(embedding)
+        cursor.execute("INSERT INTO faces (name, embedding) VALUES (?, ?)", (name, embedding_blob))
         conn.commit()
         conn.close()
         logging.info(f"Added {name} to the database.")
@@ -69,7 +70,7 @@ def fetch_all_faces(db_path):
         conn.close()
 
         # Deserialize embeddings
-        faces = [(name, deserialize_embedding(embedding)) for name, embedding in rows]
+        faces = [(name, load_embedding(embedding)) for name, embedding in rows]
         return faces
     except Exception as e:
         logging.error(f"Error fetching faces from database: {e}")
@@ -102,3 +103,329 @@ def find_closest_match(db_path, embedding):
     except Exception as e:
         logging.error(f"Error finding closest match: {e}")
         return "Unknown", None
+
+def ensure_metadata_table(conn):
+    """
+    Creates the table that records the embedding model, dimension and dtype
+    once per embeddings table.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS embedding_meta (
+            table_name TEXT PRIMARY KEY,
+            model_name TEXT NOT NULL,
+            dim INTEGER NOT NULL,
+            dtype TEXT NOT NULL
+        )
+        """
+    )
+
+def get_embedding_metadata(conn, table_name="faces"):
+    """
+    Reads the embedding metadata recorded for a table.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        table_name (str): Table holding the embeddings.
+
+    Returns:
+        dict: model_name, dim and dtype, or None if nothing is recorded yet.
+    """
+    row = conn.execute(
+        "SELECT model_name, dim, dtype FROM embedding_meta WHERE table_name = ?",
+        (table_name,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {'model_name': row[0], 'dim': row[1], 'dtype': row[2]}
+
+def set_embedding_metadata(conn, model_name, dim, table_name="faces"):
+    """
+    Records the embedding model and dimension for a table. The first writer
+    wins; later calls with a different model or dimension are logged.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        model_name (str): Name of the model that produced the embeddings.
+        dim (int): Embedding dimension.
+        table_name (str): Table holding the embeddings.
+    """
+    conn.execute(
+        "INSERT OR IGNORE INTO embedding_meta (table_name, model_name, dim, dtype) VALUES (?, ?, ?, ?)",
+        (table_name, model_name, int(dim), EMBEDDING_DTYPE.str)
+    )
+    metadata = get_embedding_metadata(conn, table_name)
+    if metadata['model_name'] != model_name or metadata['dim'] != int(dim):
+        logging.warning(
+            f"Embedding metadata mismatch for {table_name}: stored {metadata['model_name']}/{metadata['dim']}, "
+            f"got {model_name}/{dim}"
+        )
+
+def migrate_embeddings_to_blob(db_path, model_name="Facenet", batch_size=500):
+    """
+    Rewrites legacy JSON/base64 TEXT embeddings as raw float32 BLOBs in place.
+
+    Each batch is committed separately and only rows still stored as text are
+    selected, so an interrupted migration simply resumes where it stopped.
+    Readers keep working throughout because load_embedding accepts both formats.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+        model_name (str): Model recorded in the metadata table.
+        batch_size (int): Number of rows rewritten per transaction.
+
+    Returns:
+        int: Number of rows migrated.
+    """
+    migrated = 0
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_metadata_table(conn)
+        conn.commit()
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, embedding FROM faces WHERE id > ? AND typeof(embedding) = 'text' ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for face_id, embedding_str in rows:
+                embedding = load_embedding(embedding_str)
+                if embedding is None:
+                    logging.error(f"Skipping undecodable embedding for face id {face_id}")
+                    continue
+                updates.append((serialize_embedding_blob(embedding), face_id))
+                if migrated == 0 and len(updates) == 1:
+                    set_embedding_metadata(conn, model_name, embedding.size)
+
+            conn.executemany("UPDATE faces SET embedding = ? WHERE id = ?", updates)
+            conn.commit()
+            migrated += len(updates)
+            last_id = rows[-1][0]
+
+        if migrated:
+            logging.info(f"Migrated {migrated} embeddings to BLOB storage")
+        return migrated
+    finally:
+        conn.close()
+
+def ensure_change_tracking(conn):
+    """
+    Installs a change-log table and triggers that record every insert,
+    delete and update on the faces table with a monotonically increasing
+    revision, so readers can apply just the rows that changed.
+
+    Updates that only convert an embedding from the legacy TEXT format to a
+    BLOB (see migrate_embeddings_to_blob) are not logged; they do not change
+    the stored vector.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+    """
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS faces_changelog (
+            revision INTEGER PRIMARY KEY AUTOINCREMENT,
+            face_id INTEGER NOT NULL,
+            operation TEXT NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS faces_changelog_insert AFTER INSERT ON faces
+        BEGIN
+            INSERT INTO faces_changelog (face_id, operation) VALUES (NEW.id, 'insert');
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS faces_changelog_delete AFTER DELETE ON faces
+        BEGIN
+            INSERT INTO faces_changelog (face_id, operation) VALUES (OLD.id, 'delete');
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS faces_changelog_update AFTER UPDATE OF id, name, embedding ON faces
+        WHEN NOT (typeof(OLD.embedding) = 'text' AND typeof(NEW.embedding) = 'blob')
+        BEGIN
+            INSERT INTO faces_changelog (face_id, operation) VALUES (OLD.id, 'delete');
+            INSERT INTO faces_changelog (face_id, operation) VALUES (NEW.id, 'insert');
+        END;
+        """
+    )
+
+def get_current_revision(conn):
+    """
+    Returns the latest change-log revision of the faces table.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+
+    Returns:
+        int: The latest revision, or 0 if nothing has been logged.
+    """
+    row = conn.execute("SELECT MAX(revision) FROM faces_changelog").fetchone()
+    return row[0] or 0
+
+def fetch_changes(conn, since_revision):
+    """
+    Fetches the changes logged after a revision.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        since_revision (int): Last revision the caller has applied.
+
+    Returns:
+        list: (revision, face_id, operation) tuples in revision order.
+    """
+    return conn.execute(
+        "SELECT revision, face_id, operation FROM faces_changelog WHERE revision > ? ORDER BY revision",
+        (since_revision,)
+    ).fetchall()
+
+def fetch_faces_by_id(conn, face_ids, batch_size=500):
+    """
+    Fetches the current (id, name, embedding) rows for the given ids.
+    Ids that no longer exist are simply absent from the result.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        face_ids (list): Ids to fetch.
+        batch_size (int): Ids per query, kept below SQLite's variable limit.
+
+    Returns:
+        list: (id, name, embedding) tuples ordered by id.
+    """
+    face_ids = sorted(face_ids)
+    rows = []
+    for start in range(0, len(face_ids), batch_size):
+        batch = face_ids[start:start + batch_size]
+        placeholders = ", ".join("?" * len(batch))
+        rows.extend(conn.execute(
+            f"SELECT id, name, embedding FROM faces WHERE id IN ({placeholders}) ORDER BY id",
+            batch
+        ).fetchall())
+    return rows
+
+class ConnectionManager:
+    """
+    Long-lived SQLite connections for one database file, one per thread.
+
+    Connections are opened once per thread and reused, with WAL journaling
+    so readers (the recognition loop) never block behind an enrollment
+    write, and tuned synchronous/cache pragmas. sqlite3 keeps a per-connection
+    cache of compiled statements keyed by SQL text, so callers that reuse the
+    same SQL strings skip re-preparing them on every call.
+
+    A thread's connection is closed when the thread ends, so short-lived
+    threads (e.g. one per enrollment request) do not accumulate open
+    connections; close_all() closes the rest.
+    """
+
+    PRAGMAS = (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),  # Safe with WAL; fsync only at checkpoints
+        ("cache_size", -16000),  # 16 MB page cache per connection
+        ("temp_store", "MEMORY"),
+        ("mmap_size", 268435456),  # Let SQLite read pages through a 256 MB mapping
+        ("busy_timeout", 5000),  # Wait up to 5 s for a concurrent writer
+    )
+
+    def __init__(self, db_path, cached_statements=256):
+        """
+        Args:
+            db_path (str): Path to the SQLite database file.
+            cached_statements (int): Compiled statements kept per connection.
+        """
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._registry_lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        """
+        Returns the calling thread's connection, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: The thread's connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread is off only so close_all() can close every thread's connection
+            conn = sqlite3.connect(self.db_path, cached_statements=self.cached_statements, check_same_thread=False)
+            for pragma, value in self.PRAGMAS:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            self._local.conn = conn
+            # The thread's local storage, and with it this owner, is dropped when the thread ends
+            self._local.owner = _ThreadConnection()
+            weakref.finalize(self._local.owner, _close_connection, conn, self._connections, self._registry_lock)
+            with self._registry_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def write(self):
+        """
+        Runs a block of writes as one immediate transaction. Writers within
+        the process are serialized; readers keep reading the last committed
+        snapshot meanwhile.
+
+        Yields:
+            sqlite3.Connection: The calling thread's connection.
+        """
+        with self._write_lock:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def data_version(self):
+        """
+        Returns SQLite's data_version for the calling thread's connection,
+        which changes whenever another connection commits to the database.
+
+        Returns:
+            int: The current data version.
+        """
+        return self.connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def close_all(self):
+        """
+        Closes every connection opened by this manager.
+        """
+        with self._registry_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logging.error(f"Error closing database connection: {e}")
+        self._local = threading.local()
+
+
+class _ThreadConnection:
+    """Placeholder kept in a thread's local storage; its finalizer closes the thread's connection"""
+
+
+def _close_connection(conn, connections, lock):
+    """Closes a connection of a thread that has ended and forgets it"""
+    with lock:
+        if conn not in connections:
+            return  # Already closed by close_all()
+        connections.remove(conn)
+    try:
+        conn.close()
+    except Exception as e:
+        logging.error(f"Error closing database connection: {e}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    migrate_embeddings_to_blob(sys.argv[1] if len(sys.argv) > 1 else "facial_db/facial_data.db")
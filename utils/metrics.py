@@ -0,0 +1,351 @@
+"""
+In-process metrics for the recognition loop: rolling latency histograms,
+counters and gauges, summarized periodically in the log and served as
+Prometheus text on a local HTTP endpoint.
+
+Metrics are created once (usually at import time) and updated on the hot
+path:
+
+    DETECT_SECONDS = stage_histogram("detect")
+
+    with DETECT_SECONDS.time():
+        faces = detect(frame)
+
+Each update takes one lock and a deque append. When Config.METRICS_ENABLED
+is False, time() returns a shared no-op context and updates return
+immediately.
+
+Metrics live in the process that records them; with Config.INFERENCE_WORKERS
+the workers' embedding and attribute timings are not visible here.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import nullcontext
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from config import Config
+
+_NULL_CONTEXT = nullcontext()
+
+
+class _Metric:
+    """A metric with fixed labels, registered under a name shared by all its label sets"""
+
+    kind = None
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """A monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, registry, name, labels):
+        super().__init__(registry, name, labels)
+        self.value = 0
+
+    def inc(self, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(_Metric):
+    """A value that is set rather than accumulated, e.g. gallery size"""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name, labels):
+        super().__init__(registry, name, labels)
+        self.value = 0.0
+
+    def set(self, value):
+        if self.registry.enabled:
+            self.value = value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram(_Metric):
+    """
+    Keeps the most recent `window` observations for percentiles, plus the
+    all-time count and sum. Percentiles are computed only when read.
+    """
+
+    kind = "summary"
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, registry, name, labels, window=1024):
+        super().__init__(registry, name, labels)
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.samples.append(value)
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        """
+        Returns:
+            Context manager that records the seconds spent inside it
+        """
+        return _Timer(self) if self.registry.enabled else _NULL_CONTEXT
+
+    def quantiles(self):
+        """
+        Returns:
+            dict: {0.5: p50, 0.95: p95, 0.99: p99} over the rolling window, or None if empty
+        """
+        with self._lock:
+            samples = np.array(self.samples)
+        if len(samples) == 0:
+            return None
+        values = np.percentile(samples, [q * 100 for q in self.QUANTILES])
+        return dict(zip(self.QUANTILES, (float(value) for value in values)))
+
+
+class MetricsRegistry:
+    """
+    Holds all metrics of the process, keyed by name and labels, and renders
+    them as a log summary or Prometheus text.
+    """
+
+    def __init__(self, namespace="facerec", enabled=True, window=1024):
+        """
+        Args:
+            namespace (str): Prefix of every exported metric name
+            enabled (bool): False turns every update into a no-op
+            window (int): Observations kept per histogram for percentiles
+        """
+        self.namespace = namespace
+        self.enabled = enabled
+        self.window = window
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(self, name, dict(labels), **kwargs)
+                if help_text:
+                    self._help.setdefault(name, help_text)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", **labels):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", **labels):
+        return self._get(Histogram, name, help_text, labels, window=self.window)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {"name{label=value}": value}, with a dict of count, sum and
+                  p50/p95/p99 for histograms
+        """
+        snapshot = {}
+        for metric in self.metrics():
+            key = metric.name + _format_labels(metric.labels)
+            if isinstance(metric, Histogram):
+                quantiles = metric.quantiles() or {}
+                snapshot[key] = {
+                    'count': metric.count,
+                    'sum': metric.sum,
+                    **{f"p{int(q * 100)}": value for q, value in quantiles.items()},
+                }
+            else:
+                snapshot[key] = metric.value
+        return snapshot
+
+    def summary(self):
+        """
+        Returns:
+            str: One line per histogram with count and percentiles in ms (for
+                 names ending in _seconds), then the counters and gauges
+        """
+        lines = ["Metrics:"]
+        scalars = []
+        for metric in sorted(self.metrics(), key=lambda m: (m.name, sorted(m.labels.items()))):
+            label = metric.name + _format_labels(metric.labels)
+            if not isinstance(metric, Histogram):
+                scalars.append(f"{label}={metric.value:g}")
+                continue
+            quantiles = metric.quantiles()
+            if quantiles is None:
+                continue
+            scale, unit = (1000, "ms") if metric.name.endswith("_seconds") else (1, "")
+            lines.append(
+                f"  {label:<40} n={metric.count:<7} p50 {quantiles[0.5] * scale:8.2f}{unit}  "
+                f"p95 {quantiles[0.95] * scale:8.2f}{unit}  p99 {quantiles[0.99] * scale:8.2f}{unit}"
+            )
+        if scalars:
+            lines.append("  " + ", ".join(scalars))
+        return "\n".join(lines)
+
+    def log_summary(self):
+        """
+        Logs summary() if metrics are enabled.
+        """
+        if self.enabled:
+            logging.info(self.summary())
+
+    def prometheus_text(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format;
+                 histograms are exported as summaries over the rolling window
+        """
+        by_name = {}
+        for metric in self.metrics():
+            by_name.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name in sorted(by_name):
+            group = by_name[name]
+            full_name = f"{self.namespace}_{name}" if self.namespace else name
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} {group[0].kind}")
+            for metric in group:
+                if isinstance(metric, Histogram):
+                    for q, value in (metric.quantiles() or {}).items():
+                        labels = _format_labels({**metric.labels, 'quantile': str(q)})
+                        lines.append(f"{full_name}{labels} {value!r}")
+                    labels = _format_labels(metric.labels)
+                    lines.append(f"{full_name}_sum{labels} {metric.sum!r}")
+                    lines.append(f"{full_name}_count{labels} {metric.count}")
+                else:
+                    lines.append(f"{full_name}{_format_labels(metric.labels)} {metric.value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for key, value in sorted(labels.items())
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class MetricsServer:
+    """
+    Serves a registry's prometheus_text() at /metrics from a daemon thread.
+    Binds to localhost by default; the endpoint has no authentication.
+    """
+
+    def __init__(self, registry, port=0, host="127.0.0.1"):
+        """
+        Args:
+            registry (MetricsRegistry): Metrics to serve
+            port (int): Port to listen on (0 picks a free port)
+            host (str): Interface to listen on
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        self._thread.start()
+        logging.info(f"Serving metrics at {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(2.0)
+
+
+# The process-wide registry used by the application
+metrics = MetricsRegistry(enabled=Config.METRICS_ENABLED, window=Config.METRICS_WINDOW)
+
+_server = None
+
+
+def stage_histogram(stage):
+    """
+    Returns:
+        Histogram: The process-wide latency histogram of one recognition loop stage
+    """
+    return metrics.histogram("stage_seconds", "Seconds spent in each stage of the recognition loop", stage=stage)
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """
+    Starts serving the process-wide registry, once per process.
+
+    Args:
+        port (int, optional): Port to listen on; defaults to Config.METRICS_PORT
+
+    Returns:
+        MetricsServer: The running server, or None if metrics are disabled,
+                       no port is configured or the port is unavailable
+    """
+    global _server
+    port = Config.METRICS_PORT if port is None else port
+    if _server is not None or port is None or not metrics.enabled:
+        return _server
+    try:
+        _server = MetricsServer(metrics, port, host).start()
+    except OSError as e:
+        logging.error(f"Could not start metrics endpoint on {host}:{port}: {e}")
+    return _server
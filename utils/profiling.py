@@ -0,0 +1,230 @@
+"""
+Opt-in profiling of the running application.
+
+Enabled by Config.PROFILING_ENABLED or the FACEREC_PROFILE=1 environment
+variable. While enabled:
+
+- every Config.PROFILE_SAMPLE_EVERY-th analysis tick runs under cProfile;
+  the stats of Config.PROFILE_DUMP_EVERY sampled ticks are aggregated into
+  one logs/profile_<time>.prof file (open with `python -m pstats` or snakeviz)
+- every Config.PROFILE_SNAPSHOT_INTERVAL seconds a tracemalloc snapshot is
+  compared with the previous one, and the lines whose allocations grew the
+  most are written to logs/tracemalloc_<time>.txt
+
+Only the newest Config.PROFILE_MAX_FILES files of each kind are kept.
+Overhead is bounded by the sampling rate and by tracing only
+Config.PROFILE_TRACEMALLOC_FRAMES frames per allocation. When profiling is
+disabled, tick() returns a shared no-op context and nothing else runs.
+
+Usage:
+    with profiler.tick():
+        results = frame_pipeline.process(frame)
+"""
+import os
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+from config import Config
+
+_NULL_CONTEXT = nullcontext()
+LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+
+
+def profiling_enabled():
+    """
+    Returns:
+        bool: True if Config.PROFILING_ENABLED or FACEREC_PROFILE is set
+    """
+    return Config.PROFILING_ENABLED or os.environ.get("FACEREC_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+
+class _ProfiledTick:
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiler is active (only one can run at a time)
+            self.profile = None
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+            self.profiler._add(self.profile)
+        return False
+
+
+class Profiler:
+    """
+    Samples analysis ticks with cProfile and tracks allocation growth with
+    tracemalloc, writing rotated reports into a directory.
+    """
+
+    def __init__(self, enabled=False, sample_every=50, dump_every=10, snapshot_interval=60.0,
+                 tracemalloc_frames=1, output_dir=LOGS_DIR, max_files=20, top_lines=25):
+        """
+        Args:
+            enabled (bool): False makes tick() a no-op
+            sample_every (int): Profile one tick in this many
+            dump_every (int): Sampled ticks aggregated into each .prof file
+            snapshot_interval (float): Seconds between tracemalloc snapshots (0 disables tracemalloc)
+            tracemalloc_frames (int): Stack frames recorded per allocation
+            output_dir (str): Where reports are written
+            max_files (int): Reports of each kind kept; older ones are deleted
+            top_lines (int): Allocation sites listed per tracemalloc report
+        """
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self.dump_every = max(1, dump_every)
+        self.snapshot_interval = snapshot_interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.top_lines = top_lines
+
+        self._lock = threading.Lock()
+        self._ticks = 0
+        self._sampled = 0
+        self._stats = None
+        self._snapshot = None
+        self._next_snapshot = 0.0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            enabled=profiling_enabled(),
+            sample_every=Config.PROFILE_SAMPLE_EVERY,
+            dump_every=Config.PROFILE_DUMP_EVERY,
+            snapshot_interval=Config.PROFILE_SNAPSHOT_INTERVAL,
+            tracemalloc_frames=Config.PROFILE_TRACEMALLOC_FRAMES,
+            max_files=Config.PROFILE_MAX_FILES
+        )
+
+    def tick(self):
+        """
+        Wraps one analysis tick.
+
+        Returns:
+            Context manager that profiles the tick if it is sampled
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        with self._lock:
+            self._ticks += 1
+            sampled = self._ticks % self.sample_every == 0
+        self._maybe_snapshot()
+        return _ProfiledTick(self) if sampled else _NULL_CONTEXT
+
+    def _add(self, profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self._sampled += 1
+            if self._sampled % self.dump_every == 0:
+                self._dump_profile()
+
+    def _path(self, prefix, extension):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        # The pid keeps inference worker processes from overwriting each other's reports
+        return os.path.join(self.output_dir, f"{prefix}_{stamp}_{os.getpid()}.{extension}")
+
+    def _rotate(self, prefix):
+        files = sorted(name for name in os.listdir(self.output_dir) if name.startswith(prefix + "_"))
+        for name in files[:-self.max_files] if self.max_files else []:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
+
+    def _dump_profile(self):
+        """Writes the aggregated stats; called with self._lock held"""
+        if self._stats is None:
+            return
+        path = self._path("profile", "prof")
+        try:
+            self._stats.dump_stats(path)
+            self._rotate("profile")
+            logging.info(f"Wrote cProfile stats of {self._sampled} sampled ticks to {path}")
+        except OSError as e:
+            logging.error(f"Could not write profile {path}: {e}")
+        self._stats = None
+
+    def _maybe_snapshot(self):
+        if not self.snapshot_interval:
+            return
+        now = time.monotonic()
+        if now < self._next_snapshot:
+            return
+        with self._lock:
+            if now < self._next_snapshot:
+                return
+            self._next_snapshot = now + self.snapshot_interval
+        if not tracemalloc.is_tracing():
+            # The first snapshot becomes meaningful from the next interval on
+            tracemalloc.start(self.tracemalloc_frames)
+        self.snapshot()
+
+    def snapshot(self):
+        """
+        Takes a tracemalloc snapshot and writes its growth since the previous one.
+
+        Returns:
+            str: Path of the report, or None for the first snapshot
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None:
+            return None
+
+        differences = snapshot.compare_to(previous, 'lineno')
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"tracemalloc: {current / 2**20:.1f} MiB traced, peak {peak / 2**20:.1f} MiB",
+            "",
+            f"Top {self.top_lines} allocation sites by growth since the previous snapshot:",
+        ]
+        lines.extend(str(difference) for difference in differences[:self.top_lines])
+        # Short-lived per-frame buffers (e.g. frame copies) show up here rather than as growth
+        lines.extend(["", f"Top {self.top_lines} allocation sites by live size:"])
+        lines.extend(str(stat) for stat in snapshot.statistics('lineno')[:self.top_lines])
+        path = self._path("tracemalloc", "txt")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self._rotate("tracemalloc")
+        except OSError as e:
+            logging.error(f"Could not write allocation report {path}: {e}")
+            return None
+        return path
+
+    def close(self):
+        """
+        Writes any profiled ticks not yet dumped and stops tracemalloc.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dump_profile()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._snapshot = None
+
+
+# The process-wide profiler used by the inference loops
+profiler = Profiler.from_config()
@@ -3,6 +3,9 @@ import numpy as np
 import base64
 import logging
 
+# On-disk dtype of BLOB embeddings: raw little-endian float32
+EMBEDDING_DTYPE = np.dtype('<f4')
+
 def serialize_embedding(embedding):
     """
     Serializes a numpy array embedding into a string for database storage.
@@ -61,6 +64,48 @@ def deserialize_embedding(embedding_str):
         logging.error(f"Error deserializing embedding: {e}")
         return None
 
+def serialize_embedding_blob(embedding):
+    """
+    Serializes an embedding into raw little-endian float32 bytes for storage
+    in a BLOB column. The dimension is recorded once per table rather than
+    per row (see utils.database_utils.set_embedding_metadata).
+    
+    Args:
+        embedding (numpy.ndarray): The facial embedding to serialize
+        
+    Returns:
+        bytes: The packed embedding
+    """
+    return np.ascontiguousarray(np.ravel(embedding), dtype=EMBEDDING_DTYPE).tobytes()
+
+def deserialize_embedding_blob(embedding_blob):
+    """
+    Deserializes a BLOB embedding without copying it.
+    
+    Args:
+        embedding_blob (bytes): Raw little-endian float32 bytes
+        
+    Returns:
+        numpy.ndarray: Read-only float32 view over the blob
+    """
+    return np.frombuffer(embedding_blob, dtype=EMBEDDING_DTYPE)
+
+def load_embedding(stored_value):
+    """
+    Decodes an embedding column value in either storage format: a BLOB
+    written by serialize_embedding_blob or a legacy JSON/base64 string
+    written by serialize_embedding.
+    
+    Args:
+        stored_value (bytes or str): Value read from the embedding column
+        
+    Returns:
+        numpy.ndarray: The embedding, or None if it cannot be decoded
+    """
+    if isinstance(stored_value, (bytes, memoryview)):
+        return deserialize_embedding_blob(stored_value)
+    return deserialize_embedding(stored_value)
+
 def calculate_embedding_distance(embedding1, embedding2):
     """
     Calculates the Euclidean distance between two facial embeddings.